@@ -0,0 +1,190 @@
+"""offline benchmarks of the text-to-solution pipeline, recorded llm
+responses and generated models are replayed without calling the llm
+
+    pytest benchmarks --benchmark-autosave
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:15%
+
+the generated models scale up to `--max-set-size` members (10 to 100k)"""
+
+import json
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+from unittest.mock import patch
+
+import pytest
+
+import llm_optimizer.calculations.lin_optimization_logic as lin_optimization_logic
+import llm_optimizer.calculations.rule_compiler as rule_compiler
+from llm_optimizer.models.llm import LinearOptimizationModel
+
+
+SET_SIZES = [10, 100, 1_000, 10_000, 100_000]
+RECORDED_RESPONSES = sorted(
+    (Path(__file__).parent.parent / "tests").glob("mock_llm_response*.json")
+)
+# rows of the coefficient matrix in the generated production models
+RESOURCES = 5
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--max-set-size",
+        type=int,
+        default=10_000,
+        help="largest set size of the generated benchmark models",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "set_size" in metafunc.fixturenames:
+        max_set_size = metafunc.config.getoption("--max-set-size")
+        metafunc.parametrize(
+            "set_size", [size for size in SET_SIZES if size <= max_set_size]
+        )
+    if "recorded_response" in metafunc.fixturenames:
+        metafunc.parametrize(
+            "recorded_response",
+            RECORDED_RESPONSES,
+            ids=[path.stem for path in RECORDED_RESPONSES],
+            indirect=True,
+        )
+
+
+@pytest.fixture
+def recorded_response(request) -> LinearOptimizationModel:
+    with open(request.param, "r") as file:
+        return LinearOptimizationModel(**json.load(file))
+
+
+def production_model(set_size: int) -> LinearOptimizationModel:
+    """production planning with `set_size` products sharing a few resources,
+    `set_size` variables and `set_size + RESOURCES` constraints"""
+    products = range(1, set_size + 1)
+    resources = range(1, RESOURCES + 1)
+    return LinearOptimizationModel(
+        mathematical_formulation="",
+        objective={
+            "expr": "sum(model.p[i] * model.x[i] for i in model.I)",
+            "optimization_sense": "maximize",
+            "doc": "profit",
+        },
+        sets=[
+            {"name": "I", "initialize": list(products), "doc": "products"},
+            {"name": "R", "initialize": list(resources), "doc": "resources"},
+        ],
+        parameters=[
+            {
+                "name": "p",
+                "indexes": ["I"],
+                "initialize": {i: 1 + i % 7 for i in products},
+                "within": "NonNegativeReals",
+                "doc": "profit per unit",
+            },
+            {
+                "name": "u",
+                "indexes": ["I"],
+                "initialize": {i: 10 + i % 13 for i in products},
+                "within": "NonNegativeReals",
+                "doc": "demand",
+            },
+            {
+                "name": "a",
+                "indexes": ["R", "I"],
+                "initialize": {
+                    (r, i): 1 + (r * i) % 5 for r in resources for i in products
+                },
+                "within": "NonNegativeReals",
+                "doc": "resource usage per unit",
+            },
+            {
+                "name": "b",
+                "indexes": ["R"],
+                "initialize": {r: 4 * set_size for r in resources},
+                "within": "NonNegativeReals",
+                "doc": "resource capacity",
+            },
+        ],
+        variables=[
+            {"name": "x", "indexes": ["I"], "domain": "NonNegativeReals", "doc": ""}
+        ],
+        constraints=[
+            {
+                "name": "capacity",
+                "idxs": ["R"],
+                "rule": {
+                    "lambda_arguments": ["model", "r"],
+                    "lambda_body": "sum(model.a[r, i] * model.x[i] for i in model.I) "
+                    "<= model.b[r]",
+                },
+                "doc": "",
+            },
+            {
+                "name": "demand",
+                "idxs": ["I"],
+                "rule": {
+                    "lambda_arguments": ["model", "i"],
+                    "lambda_body": "model.x[i] <= model.u[i]",
+                },
+                "doc": "",
+            },
+        ],
+    )
+
+
+@pytest.fixture
+def generated_response(set_size) -> LinearOptimizationModel:
+    return production_model(set_size)
+
+
+def rounds_for(set_size: int) -> int:
+    return 20 if set_size <= 1_000 else 3
+
+
+def profile_stage(func: Callable, *args) -> dict[str, Any]:
+    """one extra run of a stage for its peak memory and the number of rule
+    evaluations, of lambda rules and of rows of compiled rules, kept out of
+    the timed runs"""
+    evaluations = 0
+    parse_rule = lin_optimization_logic.parse_rule
+    compile_constraint = rule_compiler.compile_constraint
+
+    def counting_parse_rule(*parse_args):
+        rule = parse_rule(*parse_args)
+        func = rule["func"]
+
+        def count(*rule_args):
+            nonlocal evaluations
+            evaluations += 1
+            return func(*rule_args)
+
+        # pyomo passes the index depending on the rule's number of arguments
+        arg_names = ", ".join(f"arg{n}" for n in range(func.__code__.co_argcount))
+        counted = eval(f"lambda {arg_names}: count({arg_names})", {"count": count})
+        return {**rule, "func": counted}
+
+    def counting_compile_constraint(*compile_args):
+        row = compile_constraint(*compile_args)
+
+        def counted(index):
+            nonlocal evaluations
+            evaluations += 1
+            return row(index)
+
+        return counted
+
+    with (
+        patch.object(lin_optimization_logic, "parse_rule", counting_parse_rule),
+        # the pyomo build imports it, the matrix build calls it in its module
+        patch.object(
+            lin_optimization_logic, "compile_constraint", counting_compile_constraint
+        ),
+        patch.object(rule_compiler, "compile_constraint", counting_compile_constraint),
+    ):
+        tracemalloc.start()
+        try:
+            func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {"peak_memory_mib": round(peak / 2**20, 3), "rule_evaluations": evaluations}
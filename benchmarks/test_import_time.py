@@ -0,0 +1,25 @@
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        # the interpreter start, included in every other measurement
+        "sys",
+        "llm_optimizer.app",
+        "llm_optimizer.llm.communication_instructor",
+        "llm_optimizer.calculations.lin_optimization_logic",
+        "llm_optimizer.batch",
+    ],
+)
+def test_import_time(benchmark, module):
+    """cold import in a fresh interpreter, as on a streamlit or worker start"""
+    benchmark.pedantic(
+        subprocess.run,
+        ([sys.executable, "-c", f"import {module}"],),
+        {"check": True},
+        rounds=10,
+    )
@@ -0,0 +1,120 @@
+import pyomo.environ as pyo
+from conftest import profile_stage, rounds_for
+
+from llm_optimizer.calculations.highs_backend import solve_matrix_model
+from llm_optimizer.calculations.lin_optimization_logic import (
+    construct_pyomo_model,
+    create_components,
+    create_concrete_model,
+    solve,
+)
+from llm_optimizer.calculations.matrix_builder import build_matrix_model
+from llm_optimizer.models.llm import LinearOptimizationModel
+from llm_optimizer.utils.helpers import (
+    check_if_expression_is_safe,
+    compile_rule,
+    parse_rule,
+)
+
+
+def rule_strings(llm_pyomo_model: LinearOptimizationModel) -> list[str]:
+    """the rules as `add_constraint` passes them to `parse_rule`"""
+    return [
+        "lambda "
+        + ", ".join(pyo_constr.rule.lambda_arguments)
+        + ": "
+        + pyo_constr.rule.lambda_body
+        for pyo_constr in llm_pyomo_model.constraints
+    ]
+
+
+def allowed_names(llm_pyomo_model: LinearOptimizationModel) -> frozenset:
+    return create_components(create_concrete_model(), llm_pyomo_model)
+
+
+def test_check_if_expression_is_safe(benchmark, recorded_response):
+    allowed_vars = allowed_names(recorded_response)
+    expressions = [
+        (pyo_constr.rule.lambda_body.strip(), pyo_constr.rule.lambda_arguments)
+        for pyo_constr in recorded_response.constraints
+    ]
+
+    def check_all():
+        return all(
+            check_if_expression_is_safe(expression, allowed_vars, extra_vars=args)
+            for expression, args in expressions
+        )
+
+    assert benchmark(check_all)
+
+
+def test_parse_rule_uncached(benchmark, recorded_response):
+    allowed_vars = allowed_names(recorded_response)
+    rules = rule_strings(recorded_response)
+
+    benchmark.pedantic(
+        lambda: [parse_rule(rule, allowed_vars) for rule in rules],
+        setup=compile_rule.cache_clear,
+        rounds=100,
+    )
+
+
+def test_parse_rule_cached(benchmark, recorded_response):
+    allowed_vars = allowed_names(recorded_response)
+    rules = rule_strings(recorded_response)
+
+    benchmark(lambda: [parse_rule(rule, allowed_vars) for rule in rules])
+
+
+def test_construct_pyomo_model_recorded(benchmark, recorded_response):
+    benchmark.extra_info.update(profile_stage(construct_pyomo_model, recorded_response))
+
+    benchmark(construct_pyomo_model, recorded_response)
+
+
+def test_solve_recorded(benchmark, recorded_response):
+    results, _ = benchmark.pedantic(
+        solve,
+        setup=lambda: ((construct_pyomo_model(recorded_response),), {}),
+        rounds=20,
+    )
+
+    assert results.solver.termination_condition == pyo.TerminationCondition.optimal
+
+
+def test_construct_pyomo_model(benchmark, generated_response, set_size):
+    benchmark.extra_info.update(
+        profile_stage(construct_pyomo_model, generated_response)
+    )
+
+    benchmark.pedantic(
+        construct_pyomo_model, (generated_response,), rounds=rounds_for(set_size)
+    )
+
+
+def test_solve(benchmark, generated_response, set_size):
+    results, _ = benchmark.pedantic(
+        solve,
+        setup=lambda: ((construct_pyomo_model(generated_response),), {}),
+        rounds=rounds_for(set_size),
+    )
+
+    assert results.solver.termination_condition == pyo.TerminationCondition.optimal
+
+
+def test_build_matrix_model(benchmark, generated_response, set_size):
+    benchmark.extra_info.update(profile_stage(build_matrix_model, generated_response))
+
+    benchmark.pedantic(
+        build_matrix_model, (generated_response,), rounds=rounds_for(set_size)
+    )
+
+
+def test_solve_matrix_model(benchmark, generated_response, set_size):
+    matrix_model = build_matrix_model(generated_response)
+
+    results, _ = benchmark.pedantic(
+        solve_matrix_model, (matrix_model,), rounds=rounds_for(set_size)
+    )
+
+    assert results.solver.termination_condition == pyo.TerminationCondition.optimal
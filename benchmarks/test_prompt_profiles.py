@@ -0,0 +1,36 @@
+from llm_optimizer.llm.communication_instructor import (
+    PROMPT_PROFILES,
+    request_characters,
+)
+from llm_optimizer.models.lean import LeanLinearOptimizationModel
+
+# a rough rule for english text and json with the openai tokenizers
+CHARACTERS_PER_TOKEN = 4
+
+
+def test_lean_profile_sizes(benchmark, recorded_response):
+    """the request and response sizes of the prompt profiles for a recorded
+    response, the lean response is converted back on every run"""
+    lean_response = LeanLinearOptimizationModel.from_model(recorded_response)
+    problem = recorded_response.problem_str or "optimization task"
+    sizes = {
+        "full_response_characters": len(
+            recorded_response.model_dump_json(exclude={"problem_str", "error_message"})
+        ),
+        "lean_response_characters": len(lean_response.model_dump_json()),
+        **{
+            f"{profile}_request_characters": request_characters(problem, profile)
+            for profile in PROMPT_PROFILES
+        },
+    }
+    sizes["estimated_output_tokens_saved"] = (
+        sizes["full_response_characters"] - sizes["lean_response_characters"]
+    ) // CHARACTERS_PER_TOKEN
+    sizes["estimated_input_tokens_saved"] = (
+        sizes["full_request_characters"] - sizes["lean_request_characters"]
+    ) // CHARACTERS_PER_TOKEN
+    benchmark.extra_info.update(sizes)
+
+    benchmark(lean_response.to_model)
+
+    assert sizes["lean_response_characters"] < sizes["full_response_characters"]
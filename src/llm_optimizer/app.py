@@ -1,67 +1,534 @@
 #  start streamlit: streamlit run llm_optimizer/app.py
 
+import functools
+import hashlib
 import io
+import json
+import logging
+import math
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable
+
 import streamlit as st
-from pyomo.environ import Var, SolverStatus, TerminationCondition
 
 
+from llm_optimizer.calculations.data_files import (
+    DATA_FILE_SUFFIXES,
+    attach_data_files,
+    with_data_files,
+)
+from llm_optimizer.calculations.model_analysis import (
+    ModelTooLargeError,
+    analyze_model,
+    route_backend,
+)
+from llm_optimizer.calculations.solver_options import (
+    DEFAULT_TIME_LIMIT,
+    HIGHS_METHODS,
+    SolverOptions,
+)
+from llm_optimizer.models.base import SOLVER_BACKENDS, get_settings
 from llm_optimizer.models.llm import LinearOptimizationModel
+from llm_optimizer.llm.cache import ResponseCache, normalize_problem_text
+from llm_optimizer.llm.similarity import SimilarityIndex
 from llm_optimizer.llm.communication_instructor import ask_llm_for_pyomo_model
-from llm_optimizer.calculations.lin_optimization_logic import (
-    construct_pyomo_model,
-    solve,
-)
+from llm_optimizer.utils import instrumentation
+from llm_optimizer.utils.instrumentation import Recorder, recording
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from llm_optimizer.jobs import SolverQueue
+
+
+# rows of a variable shown at once
+PAGE_SIZE = 1_000
+
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    return ResponseCache()
+
+
+@st.cache_resource
+def get_similarity_index() -> SimilarityIndex:
+    return SimilarityIndex()
+
+
+@st.cache_resource
+def get_solver_queue() -> "SolverQueue":
+    """the worker processes shared by all sessions of the app"""
+    from llm_optimizer.jobs import SolverQueue
+
+    queue = SolverQueue()
+    queue.start()
+    return queue
+
+
+def show_partial_response(partial_model, placeholder) -> None:
+    """show the parts of the streamed response that arrived so far"""
+    with placeholder.container():
+        st.caption("generating the model ...")
+        if partial_model.mathematical_formulation:
+            # incomplete latex does not render, so it is shown as code
+            st.code(partial_model.mathematical_formulation, language="latex")
+        for field in ("sets", "parameters", "variables", "constraints"):
+            if names := [
+                component.name
+                for component in getattr(partial_model, field, None) or []
+                if component.name
+            ]:
+                st.markdown(f"**{field.capitalize()}:** {', '.join(names)}")
+
+
+def show_timings(recorder: Recorder) -> None:
+    """timing breakdown of the pipeline stages of the last run"""
+    with st.expander("Timings"):
+        st.dataframe(recorder.timings())
+        st.caption(
+            f"tokens: {recorder.counter_total('llm_prompt_tokens'):g} prompt, "
+            f"{recorder.counter_total('llm_completion_tokens'):g} completion"
+        )
+        st.download_button(
+            "Prometheus metrics", recorder.to_prometheus(), file_name="metrics.prom"
+        )
+        st.download_button(
+            "OpenTelemetry trace",
+            json.dumps(recorder.to_otlp(), indent=2),
+            file_name="trace.json",
+        )
+
+
+@dataclass
+class SolvedTask:
+    """everything shown for a solved task, kept in the session state so the
+    reruns of widget interactions only render it again"""
+
+    task: str
+    backend: str
+    llm_response: LinearOptimizationModel
+    results: Any
+    solution: Any
+    optimal: bool
+    objective: float | None
+    # (name, doc, frame with the index columns and the values) per variable
+    variables: list[tuple[str, str, "pd.DataFrame"]]
+    model_text: str
+    recorder: Recorder
+    # see `solve_key`, set by `main`
+    key: tuple = ()
+
+
+def solve_key(
+    task: str,
+    backend: str,
+    use_workers: bool,
+    options: SolverOptions,
+    data_files: list[Path],
+    race_solvers: bool,
+) -> tuple:
+    """everything a solve depends on, a submit with another key solves again;
+    the data files by their content, they are written again on every submit"""
+    data_digests = tuple(
+        (path.name, hashlib.sha256(path.read_bytes()).hexdigest())
+        for path in data_files
+    )
+    return (task, backend, use_workers, options, data_digests, race_solvers)
+
+
+def get_llm_response(task: str, on_partial) -> LinearOptimizationModel:
+    """the response for a task text, asked once per session"""
+    responses = st.session_state.setdefault("llm_responses", {})
+    key = normalize_problem_text(task)
+    if key in responses:
+        return responses[key]
+    llm_response = ask_llm_for_pyomo_model(
+        task,
+        validate_input=False,
+        max_retries=1,
+        mock=False,
+        cache=get_response_cache(),
+        on_partial=on_partial,
+        similar=get_similarity_index(),
+    )
+    if not llm_response.error_message:
+        responses[key] = llm_response
+    return llm_response
+
+
+def save_data_files(uploaded_files: Iterable[Any]) -> list[Path]:
+    """write the uploaded files to a directory of the session, the models are
+    built from there, also in the worker processes"""
+    if not uploaded_files:
+        return []
+    if "data_dir" not in st.session_state:
+        st.session_state["data_dir"] = tempfile.mkdtemp(prefix="llm_optimizer_")
+    data_dir = Path(st.session_state["data_dir"])
+    paths = []
+    for uploaded_file in uploaded_files:
+        path = data_dir / Path(uploaded_file.name).name
+        path.write_bytes(uploaded_file.getvalue())
+        paths.append(path)
+    return paths
+
+
+def solve_in_worker(
+    llm_response: LinearOptimizationModel, backend: str, options: SolverOptions
+) -> dict[str, Any] | None:
+    """solve in a worker process, the script only polls the job, so the
+    session can still cancel it"""
+    from llm_optimizer.jobs import FINISHED
+
+    queue = get_solver_queue()
+    job_id = queue.submit(llm_response, backend=backend, options=options)
+    job_placeholder = st.empty()
+    with job_placeholder.container():
+        status_text = st.empty()
+        # the callback runs before the rerun the click starts
+        st.button("Cancel", on_click=queue.cancel, args=(job_id,))
+    with instrumentation.span("solver_job", backend=backend, job_id=job_id):
+        while not (job := queue.job(job_id)).done:
+            status_text.caption(f"solver job {job_id[:8]}: {job.status} ...")
+            time.sleep(0.2)
+    job_placeholder.empty()
+
+    if job.status != FINISHED:
+        st.error(f"solver job {job.status}: {job.error}")
+        return None
+    if job.result["status"] != "solved":
+        st.error(job.result["error"])
+        return None
+    return job.result
+
+
+def solve_race(
+    llm_response: LinearOptimizationModel, backend: str, options: SolverOptions
+) -> dict[str, Any] | None:
+    """race the solver configurations of `default_portfolio`, with `options`
+    for what a configuration leaves unset"""
+    from llm_optimizer.calculations.portfolio import race
+
+    with st.spinner("racing solver configurations ..."):
+        with instrumentation.span("solver_race", backend=backend):
+            result = race(
+                llm_response.model_dump_json(),
+                backend=backend,
+                base_options=options,
+            )
+    if result["status"] != "solved":
+        st.error(result["error"])
+        return None
+    winner = ", ".join(
+        f"{name}={value}" for name, value in result["options"].items() if value
+    )
+    st.info(f"solved first with {winner}")
+    return result
+
+
+def solve_task(
+    task: str,
+    backend: str,
+    use_workers: bool = False,
+    options: SolverOptions | None = None,
+    data_files: list[Path] | None = None,
+    race_solvers: bool = False,
+) -> SolvedTask | None:
+    """`task` already describes the `data_files`, see `with_data_files`; with
+    `race_solvers` several solver configurations race in processes"""
+    # pyomo is imported on the first solve, not on every app start
+    from llm_optimizer.calculations.incremental_builder import (
+        IncrementalModelBuilder,
+    )
+    from llm_optimizer.calculations.lin_optimization_logic import (
+        check_model,
+        construct_and_solve,
+        is_optimal,
+    )
+    from llm_optimizer.calculations.model_store import ModelStore
+    from llm_optimizer.calculations.solution_frames import (
+        solution_frames,
+        summary_frames,
+    )
+    from llm_optimizer.repair import with_repairs
+
+    # pyomo components are built while the response is still streamed
+    builder = IncrementalModelBuilder(mutable_params=True)
+    partial_placeholder = st.empty()
+
+    def on_partial(partial_model) -> None:
+        show_partial_response(partial_model, partial_placeholder)
+        if backend == "pyomo" and not use_workers:
+            builder.feed(partial_model)
+
+    recorder = Recorder()
+    with recording(recorder):
+        structured_llm_response = get_llm_response(task, on_partial)
+    partial_placeholder.empty()
+
+    if structured_llm_response.error_message:
+        st.error(structured_llm_response.error_message, icon="🚨")
+        return None
+    if data_files:
+        structured_llm_response = attach_data_files(structured_llm_response, data_files)
+
+    # too large models are not built, nonlinear rules are repaired below
+    analysis = analyze_model(structured_llm_response)
+    st.caption(f"model: {analysis.summary()}")
+    try:
+        analysis.check_size()
+    except ModelTooLargeError as e:
+        st.error(str(e))
+        return None
+    solve_backend = route_backend(analysis, backend)
+    if solve_backend != backend:
+        st.info(f"a large model, it is built with the {solve_backend} backend")
+
+    options = options or SolverOptions()
+    if use_workers or race_solvers:
+        solve_summary = solve_race if race_solvers else solve_in_worker
+        with recording(recorder):
+            summary = solve_summary(structured_llm_response, solve_backend, options)
+        if summary is None:
+            return None
+        docs = {
+            pyo_var.name: pyo_var.doc for pyo_var in structured_llm_response.variables
+        }
+        return SolvedTask(
+            task=task,
+            backend=backend,
+            llm_response=structured_llm_response,
+            results=None,
+            solution=None,
+            optimal=summary["optimal"],
+            objective=summary["objective"],
+            variables=[
+                (name, docs.get(name, ""), frame)
+                for name, frame in summary_frames(
+                    summary, structured_llm_response
+                ).items()
+            ],
+            # the pyomo model stays in the solver process
+            model_text="",
+            recorder=recorder,
+        )
+
+    def build_and_solve(llm_response: LinearOptimizationModel) -> tuple:
+        # the response is analyzed above, a repaired one again
+        check_model(
+            llm_response,
+            analysis=analysis if llm_response is structured_llm_response else None,
+        )
+        if solve_backend != "pyomo":
+            return construct_and_solve(
+                llm_response, backend=solve_backend, options=options
+            )
+        # resubmitted edits of the last model only update what changed
+        model_store = st.session_state.setdefault("model_store", ModelStore())
+        # cached responses are not streamed, the store builds them itself, as
+        # well as repaired responses
+        prebuilt = None
+        if builder.started and llm_response is structured_llm_response:
+            prebuilt = builder.finish(llm_response)
+        model_store.update(llm_response, prebuilt=prebuilt)
+        return model_store.solve(options)
+
+    with recording(recorder):
+        # a component that fails to build is asked for again on its own
+        (results, solution), repaired_llm_response, repairs = with_repairs(
+            build_and_solve, structured_llm_response
+        )
+        for repair in repairs:
+            st.info(f"repaired the {repair.kind} `{repair.name}`: {repair.error}")
+        if repairs:
+            st.session_state["llm_responses"][normalize_problem_text(task)] = (
+                repaired_llm_response
+            )
+            structured_llm_response = repaired_llm_response
+
+        with instrumentation.span("render"):
+            optimal = is_optimal(results)
+            variables = [
+                (name, getattr(solution, name).doc, frame)
+                for name, frame in solution_frames(
+                    solution, structured_llm_response
+                ).items()
+            ]
+            with (outstream := io.StringIO()):
+                solution.pprint(ostream=outstream)
+                model_text = outstream.getvalue()
+
+    return SolvedTask(
+        task=task,
+        backend=backend,
+        llm_response=structured_llm_response,
+        results=results,
+        solution=solution,
+        optimal=optimal,
+        objective=solution.my_objective() if optimal else None,
+        variables=variables if optimal else [],
+        model_text=model_text,
+        recorder=recorder,
+    )
+
+
+def show_variable_frame(name: str, frame: "pd.DataFrame") -> None:
+    """one page of the values as a table and the download of all values"""
+    # imported with pandas, which is loaded by the solve anyway
+    from llm_optimizer.calculations.solution_frames import (
+        frame_to_csv,
+        frame_to_parquet,
+    )
+
+    pages = max(1, math.ceil(len(frame) / PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        page = st.number_input(
+            f"{name}: page (of {pages})", 1, pages, key=f"page_{name}"
+        )
+    st.dataframe(frame.iloc[(page - 1) * PAGE_SIZE : page * PAGE_SIZE], hide_index=True)
+
+    # the files are only written when a button is clicked
+    csv_column, parquet_column = st.columns(2)
+    csv_column.download_button(
+        "CSV",
+        functools.partial(frame_to_csv, frame),
+        file_name=f"{name}.csv",
+        mime="text/csv",
+        key=f"csv_{name}",
+        on_click="ignore",
+    )
+    parquet_column.download_button(
+        "Parquet",
+        functools.partial(frame_to_parquet, frame),
+        file_name=f"{name}.parquet",
+        mime="application/vnd.apache.parquet",
+        key=f"parquet_{name}",
+        on_click="ignore",
+    )
+
+
+def show_solved_task(solved_task: SolvedTask) -> None:
+    structured_llm_response = solved_task.llm_response
+    st.markdown("## Problem Formulation:")
+    st.markdown(structured_llm_response.problem_str)
+    st.markdown("## Mathematical Formulation:")
+    st.latex(structured_llm_response.mathematical_formulation)
+    if solved_task.optimal:
+        st.success("Found an optimal solution!")
+        st.markdown("## Solution:")
+        st.write(f"{structured_llm_response.objective.doc}: {solved_task.objective}")
+        st.markdown("## Optimized Variables:")
+        for name, doc, frame in solved_task.variables:
+            st.write(doc)
+            if list(frame.columns) == ["value"] and len(frame) == 1:
+                st.write(f"{name}: {frame['value'].iloc[0]}")
+            else:
+                show_variable_frame(name, frame)
+        # the same model with other data is solved without the llm, see
+        # `llm_optimizer.templates`
+        from llm_optimizer.templates import freeze_model
+
+        st.download_button(
+            "Download as template",
+            freeze_model(structured_llm_response).model_dump_json(indent=2),
+            file_name="template.json",
+            mime="application/json",
+        )
+    else:
+        st.error("No optimal solution found.")
+    if solved_task.model_text:
+        st.markdown("## Pyomo Model:")
+        st.text_area("model.pprint()", solved_task.model_text, height=400)
+    show_timings(solved_task.recorder)
+
+
+def solver_options_sidebar() -> SolverOptions:
+    with st.sidebar.expander("Solver options"):
+        time_limit = st.number_input(
+            "Time limit (s)",
+            min_value=0.0,
+            value=DEFAULT_TIME_LIMIT,
+            help="0: no time limit, at the limit the best solution so far is shown",
+        )
+        threads = st.number_input("Threads", min_value=0, value=0, help="0: default")
+        presolve = st.selectbox("Presolve", ["default", "on", "off"])
+        mip_gap = st.number_input(
+            "Relative MIP gap",
+            min_value=0.0,
+            max_value=1.0,
+            value=None,
+            format="%.4f",
+            help="empty: the HiGHS default",
+        )
+        method = st.selectbox(
+            "HiGHS method",
+            [None, *HIGHS_METHODS],
+            format_func=lambda method: method or "default",
+        )
+    return SolverOptions(
+        time_limit=time_limit or None,
+        threads=threads or None,
+        presolve=None if presolve == "default" else presolve == "on",
+        mip_gap=mip_gap,
+        method=method,
+    )
 
 
 def main():
+    logging.basicConfig(level=get_settings().LOG_LEVEL)
     st.title("Linear Optimization Assistant")
+    backend = st.sidebar.radio(
+        "Solver backend",
+        SOLVER_BACKENDS,
+        help="`highs` compiles the model straight into HiGHS, skipping pyomo",
+    )
+    use_workers = st.sidebar.toggle(
+        "Solve in worker processes",
+        help="long solves run in a pool of processes and can be cancelled",
+    )
+    options = solver_options_sidebar()
+    race_solvers = st.sidebar.toggle(
+        "Race solver configurations",
+        help="several configurations solve at once in processes, the first "
+        "proven optimal result is kept",
+    )
 
     with st.form("Task"):
         task = st.text_area("Insert a problem formulation in natural language:")
+        uploaded_files = st.file_uploader(
+            "Data files",
+            type=[suffix.lstrip(".") for suffix in DATA_FILE_SUFFIXES],
+            accept_multiple_files=True,
+            help="large sets and parameters are read from these files instead "
+            "of written into the response",
+        )
         submit_button = st.form_submit_button("Solve")
 
+    solved_task: SolvedTask | None = st.session_state.get("solved_task")
     if submit_button:
         if not task:
             st.error("no input given")
             return
-
-        structured_llm_response: LinearOptimizationModel = ask_llm_for_pyomo_model(
-            task, validate_input=False, max_retries=1, mock=False
-        )
-
-        if structured_llm_response.error_message:
-            st.error(structured_llm_response.error_message, icon="🚨")
+        data_files = save_data_files(uploaded_files)
+        try:
+            task = with_data_files(task, data_files)
+        except (OSError, ValueError) as e:
+            st.error(f"data file not readable: {e}")
             return
 
-        pyomo_model = construct_pyomo_model(structured_llm_response)
-        results, solution = solve(pyomo_model)
-
-        st.markdown("## Problem Formulation:")
-        st.markdown(structured_llm_response.problem_str)
-        st.markdown("## Mathematical Formulation:")
-        st.latex(structured_llm_response.mathematical_formulation)
-        if (
-            results.solver.status == SolverStatus.ok
-            and results.solver.termination_condition == TerminationCondition.optimal
-        ):
-            st.success("Found an optimal solution!")
-            st.markdown("## Solution:")
-            st.write(
-                f"{structured_llm_response.objective.doc}: {solution.my_objective()}"
+        key = solve_key(task, backend, use_workers, options, data_files, race_solvers)
+        if solved_task is None or solved_task.key != key:
+            solved_task = solve_task(
+                task, backend, use_workers, options, data_files, race_solvers
             )
-            st.markdown("## Optimized Variables:")
-            for model_var in solution.component_objects(Var, active=True):
-                st.write(model_var.doc)
-                pyomo_var = getattr(solution, str(model_var))
-                for idx in pyomo_var:
-                    index = f"[{idx}]" if idx else ""
-                    st.write(f"{model_var} {index}: {pyomo_var[idx]()}")
-        else:
-            st.error("No optimal solution found.")
-        st.markdown("## Pyomo Model:")
-        with (outstream := io.StringIO()):
-            solution.pprint(ostream=outstream)
-            st.text_area("model.pprint()", outstream.getvalue(), height=400)
+            if solved_task is not None:
+                solved_task.key = key
+            st.session_state["solved_task"] = solved_task
+    if solved_task is not None:
+        show_solved_task(solved_task)
 
 
 if __name__ == "__main__":
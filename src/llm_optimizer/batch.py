@@ -0,0 +1,380 @@
+#  run a batch: llm-optimizer-batch problems.jsonl results.jsonl
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Iterator, TextIO
+
+from llm_optimizer.calculations.data_files import attach_data_files, with_data_files
+from llm_optimizer.calculations.lin_optimization_logic import (
+    SOLVER_BACKENDS,
+    build_and_solve,
+)
+from llm_optimizer.candidates import solve_candidates_async
+from llm_optimizer.llm.cache import ResponseCache
+from llm_optimizer.llm.similarity import SimilarityIndex
+from llm_optimizer.llm.communication_async import (
+    ask_llm_for_pyomo_model_async,
+    get_async_client,
+    repair_component_async,
+)
+from llm_optimizer.llm.communication_instructor import (
+    PROMPT_PROFILES,
+    ask_llm_for_pyomo_model,
+    llm_errors,
+)
+from llm_optimizer.models.base import InvalidInputError, get_log_level
+from llm_optimizer.repair import MAX_REPAIRS
+
+
+def available_cpu_count() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def read_problems(
+    lines: Iterable[str], data_dir: Path | str = "."
+) -> Iterator[dict[str, Any]]:
+    """read problems from jsonl lines, each line holds either a json string or
+    an object with a `problem`, an optional `id` and optional `data_files`,
+    paths relative to `data_dir`"""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        if isinstance(entry, str):
+            entry = {"problem": entry}
+        if not isinstance(entry, dict) or "problem" not in entry:
+            raise ValueError(f"line {line_number}: expected a `problem` entry")
+        entry.setdefault("id", line_number)
+        if "data_files" in entry:
+            entry["data_files"] = [
+                str(Path(data_dir) / path) for path in entry["data_files"]
+            ]
+        yield entry
+
+
+async def _process_problem(
+    entry: dict[str, Any],
+    semaphore: asyncio.Semaphore,
+    executor: Executor,
+    validate_input: bool,
+    max_retries: int,
+    cache: ResponseCache | None,
+    mock: bool,
+    backend: str,
+    candidates: int = 1,
+    max_repairs: int = 0,
+    profile: str = "full",
+    similar: SimilarityIndex | None = None,
+) -> dict[str, Any]:
+    if candidates > 1 and not mock:
+        return await _process_problem_candidates(
+            entry, semaphore, executor, validate_input, backend, candidates, profile
+        )
+
+    result = {"id": entry["id"], "problem": entry["problem"]}
+    data_files = entry.get("data_files", [])
+    try:
+        problem_formulation = with_data_files(entry["problem"], data_files)
+    except (OSError, ValueError) as e:
+        return {**result, "status": "input_error", "error": str(e)}
+
+    async with semaphore:
+        if mock:
+            llm_pyomo_model = ask_llm_for_pyomo_model(problem_formulation, mock=True)
+        else:
+            llm_pyomo_model = await ask_llm_for_pyomo_model_async(
+                problem_formulation,
+                validate_input=validate_input,
+                max_retries=max_retries,
+                cache=cache,
+                profile=profile,
+                similar=similar,
+            )
+
+    if llm_pyomo_model.error_message:
+        return {**result, "status": "llm_error", "error": llm_pyomo_model.error_message}
+    llm_pyomo_model = attach_data_files(llm_pyomo_model, data_files)
+
+    loop = asyncio.get_running_loop()
+    repairs = 0
+    while True:
+        solved = await loop.run_in_executor(
+            executor,
+            functools.partial(build_and_solve, backend=backend),
+            llm_pyomo_model.model_dump_json(),
+        )
+        component = solved.get("component")
+        if component is None or repairs >= max_repairs:
+            break
+        # only the failing component is asked for again
+        async with semaphore:
+            try:
+                repaired = await repair_component_async(
+                    get_async_client(),
+                    llm_pyomo_model,
+                    component["kind"],
+                    component["name"],
+                    solved["error"],
+                )
+            except llm_errors() as e:
+                logging.debug(f"repair of {component} failed: {e}")
+                break
+        llm_pyomo_model = llm_pyomo_model.replace_component(
+            component["kind"], component["name"], repaired
+        )
+        repairs += 1
+    if repairs:
+        solved["repairs"] = repairs
+    return {**result, **solved}
+
+
+async def _process_problem_candidates(
+    entry: dict[str, Any],
+    semaphore: asyncio.Semaphore,
+    executor: Executor,
+    validate_input: bool,
+    backend: str,
+    candidates: int,
+    profile: str,
+) -> dict[str, Any]:
+    result = {"id": entry["id"], "problem": entry["problem"]}
+    async with semaphore:
+        try:
+            selection = await solve_candidates_async(
+                entry["problem"],
+                n=candidates,
+                validate_input=validate_input,
+                backend=backend,
+                executor=executor,
+                profile=profile,
+                data_files=entry.get("data_files", []),
+            )
+        except (OSError, ValueError) as e:
+            return {**result, "status": "input_error", "error": str(e)}
+        except (*llm_errors(), InvalidInputError) as e:
+            return {**result, "status": "llm_error", "error": str(e)}
+
+    # without an optimal candidate the first one tells why
+    best = selection.best or selection.candidates[0]
+    return {
+        **result,
+        **best.result,
+        "candidates": len(selection.candidates),
+        "agreement": selection.agreement,
+    }
+
+
+async def run_batch_async(
+    problems: Iterable[dict[str, Any]],
+    output: TextIO,
+    concurrency: int = 8,
+    workers: int | None = None,
+    validate_input: bool = False,
+    max_retries: int = 1,
+    cache: ResponseCache | None = None,
+    mock: bool = False,
+    backend: str = "pyomo",
+    candidates: int = 1,
+    max_repairs: int = MAX_REPAIRS,
+    profile: str = "full",
+    similar: SimilarityIndex | None = None,
+) -> dict[str, int]:
+    """stream problems through llm -> model construction -> solve and write one
+    json line per problem to `output` as soon as it is finished, the order of
+    the results follows completion, not input
+
+    with `candidates` > 1 each problem is solved from that many concurrently
+    requested models, the result is the one most of them agree on, otherwise
+    a component that fails to build is repaired up to `max_repairs` times
+
+    with a `similar` index the model of a similar solved problem is reused
+    with the data of the new one, see `ask_llm_for_pyomo_model`"""
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if candidates < 1:
+        raise ValueError("candidates must be at least 1")
+    if backend not in SOLVER_BACKENDS:
+        raise ValueError(f"unknown solver backend `{backend}`")
+    if profile not in PROMPT_PROFILES:
+        raise ValueError(f"unknown prompt profile `{profile}`")
+
+    workers = workers or available_cpu_count()
+    semaphore = asyncio.Semaphore(concurrency)
+    # bound the number of problems read ahead of the llm and solver capacity
+    max_in_flight = concurrency + 2 * workers
+    counts: dict[str, int] = {}
+
+    entries: dict[asyncio.Task, dict[str, Any]] = {}
+
+    def write_result(task: asyncio.Task) -> None:
+        entry = entries.pop(task)
+        try:
+            result = task.result()
+        except Exception as e:
+            # e.g. a broken process pool or a connection error, the other
+            # problems are still written
+            logging.warning(f"problem {entry['id']} failed: {e!r}")
+            result = {
+                "id": entry["id"],
+                "problem": entry["problem"],
+                "status": "error",
+                "error": f"{type(e).__name__}: {e}",
+            }
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: set[asyncio.Task] = set()
+        for entry in problems:
+            if len(pending) >= max_in_flight:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    write_result(task)
+            task = asyncio.create_task(
+                _process_problem(
+                    entry,
+                    semaphore,
+                    executor,
+                    validate_input,
+                    max_retries,
+                    cache,
+                    mock,
+                    backend,
+                    candidates,
+                    max_repairs,
+                    profile,
+                    similar,
+                )
+            )
+            entries[task] = entry
+            pending.add(task)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                write_result(task)
+
+    logging.debug(f"batch finished: {counts}")
+    return counts
+
+
+def run_batch(
+    input_path: Path | str,
+    output_path: Path | str,
+    concurrency: int = 8,
+    workers: int | None = None,
+    validate_input: bool = False,
+    max_retries: int = 1,
+    cache: ResponseCache | None = None,
+    mock: bool = False,
+    backend: str = "pyomo",
+    candidates: int = 1,
+    max_repairs: int = MAX_REPAIRS,
+    profile: str = "full",
+    similar: SimilarityIndex | None = None,
+) -> dict[str, int]:
+    with open(input_path, "r") as input_file, open(output_path, "w") as output_file:
+        return asyncio.run(
+            run_batch_async(
+                read_problems(input_file, data_dir=Path(input_path).parent),
+                output_file,
+                concurrency=concurrency,
+                workers=workers,
+                validate_input=validate_input,
+                max_retries=max_retries,
+                cache=cache,
+                mock=mock,
+                backend=backend,
+                candidates=candidates,
+                max_repairs=max_repairs,
+                profile=profile,
+                similar=similar,
+            )
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Solve a jsonl file of natural language optimization problems."
+    )
+    parser.add_argument("input", type=Path, help="jsonl file with the problems")
+    parser.add_argument("output", type=Path, help="jsonl file for the results")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="max. concurrent llm requests"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="solver processes (default: cores)"
+    )
+    parser.add_argument("--max-retries", type=int, default=1)
+    parser.add_argument("--validate-input", action="store_true")
+    parser.add_argument(
+        "--cache", type=Path, default=None, help="sqlite file for cached llm responses"
+    )
+    parser.add_argument("--mock", action="store_true", help="use the mocked response")
+    parser.add_argument(
+        "--backend",
+        choices=SOLVER_BACKENDS,
+        default="pyomo",
+        help="solve via pyomo/ appsi_highs or compile straight into highspy",
+    )
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        default=1,
+        help="models requested per problem, the solution most of them agree on wins",
+    )
+    parser.add_argument(
+        "--max-repairs",
+        type=int,
+        default=MAX_REPAIRS,
+        help="repair requests for components that fail to build",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROMPT_PROFILES,
+        default="full",
+        help="lean: a compact response format without the latex formulation",
+    )
+    parser.add_argument(
+        "--similar",
+        type=Path,
+        default=None,
+        help="sqlite file of solved problems, similar ones reuse their model",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=get_log_level())
+
+    counts = run_batch(
+        args.input,
+        args.output,
+        concurrency=args.concurrency,
+        workers=args.workers,
+        validate_input=args.validate_input,
+        max_retries=args.max_retries,
+        cache=ResponseCache(args.cache) if args.cache else None,
+        mock=args.mock,
+        backend=args.backend,
+        candidates=args.candidates,
+        max_repairs=args.max_repairs,
+        profile=args.profile,
+        similar=SimilarityIndex(args.similar) if args.similar else None,
+    )
+    print(json.dumps(counts))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
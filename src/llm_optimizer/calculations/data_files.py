@@ -0,0 +1,177 @@
+"""set members and parameter values read from attached data files instead of
+written into the response by the llm, which only names the file and its
+columns
+
+    paths = ["demand.csv", "costs.npy"]
+    task = with_data_files(problem, paths)
+    llm_pyomo_model = attach_data_files(ask_llm_for_pyomo_model(task), paths)
+
+a `.csv` or `.parquet` table holds a set in one column and a parameter in one
+column per index followed by the value column, it is read in chunks and the
+keys of a chunk are converted at once. A `.npy` array holds a parameter with
+one axis per index set in the order of the set members, it is memory mapped
+and looked up without building a dict."""
+
+import inspect
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+from llm_optimizer.models.compact import DenseParamData, compact_members
+from llm_optimizer.models.llm import DataSource, LinearOptimizationModel
+
+
+DATA_FILE_SUFFIXES = (".csv", ".parquet", ".npy")
+# rows of a table read at once
+CHUNK_ROWS = 100_000
+# rows of a table shown to the llm
+SAMPLE_ROWS = 3
+
+
+def _check_suffix(path: Path) -> None:
+    if path.suffix not in DATA_FILE_SUFFIXES:
+        raise ValueError(
+            f"unsupported data file `{path.name}`, expected one of {DATA_FILE_SUFFIXES}"
+        )
+
+
+def describe_data_file(path: Path | str) -> str:
+    """the columns and first rows of a table or the shape of an array"""
+    path = Path(path)
+    _check_suffix(path)
+    if path.suffix == ".npy":
+        array = np.load(path, mmap_mode="r")
+        return f"- {path.name}: array of shape {array.shape}"
+    if path.suffix == ".csv":
+        import pandas as pd
+
+        sample = pd.read_csv(path, nrows=SAMPLE_ROWS)
+        rows = ""
+    else:
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        sample = next(
+            parquet_file.iter_batches(batch_size=SAMPLE_ROWS),
+            parquet_file.schema_arrow.empty_table(),
+        ).to_pandas()
+        rows = f"{parquet_file.metadata.num_rows} rows, "
+    return (
+        f"- {path.name}: {rows}columns {', '.join(sample.columns)}, first rows:\n"
+        + sample.to_csv(index=False).strip()
+    )
+
+
+def with_data_files(problem_formulation: str, paths: Iterable[Path | str]) -> str:
+    """the problem formulation followed by a description of the data files,
+    the files are part of the task text, so they are part of the cache key"""
+    descriptions = "\n".join(describe_data_file(path) for path in paths)
+    if not descriptions:
+        return problem_formulation
+    return (
+        problem_formulation
+        + "\n\n"
+        + inspect.cleandoc(f'''
+        attached data files: """
+        {descriptions}
+        """
+        Read sets and parameters of these files with a `source` instead of
+        listing their members or values: the file name and for a set its
+        members column, for a parameter one column per index, in the order of
+        its indexes, followed by the value column. An array has one axis per
+        index set and no columns.
+    ''')
+    )
+
+
+def attach_data_files(
+    llm_pyomo_model: LinearOptimizationModel, paths: Iterable[Path | str]
+) -> LinearOptimizationModel:
+    """a copy with the path of every source whose file is attached, a source
+    of a file that is not attached fails when its component is built"""
+    paths_by_name = {Path(path).name: str(Path(path).resolve()) for path in paths}
+    llm_pyomo_model = llm_pyomo_model.model_copy(deep=True)
+    for component in (*llm_pyomo_model.sets, *llm_pyomo_model.parameters):
+        if component.source is not None:
+            component.source.path = paths_by_name.get(component.source.file)
+    return llm_pyomo_model
+
+
+def _source_path(source: DataSource) -> Path:
+    if source.path is None:
+        raise ValueError(f"data file `{source.file}` is not attached")
+    path = Path(source.path)
+    _check_suffix(path)
+    return path
+
+
+def _table_chunks(path: Path, columns: list[str]) -> Iterator[list[np.ndarray]]:
+    """the given columns of a table, `CHUNK_ROWS` rows at a time"""
+    if path.suffix == ".csv":
+        import pandas as pd
+
+        with pd.read_csv(path, usecols=columns, chunksize=CHUNK_ROWS) as reader:
+            for chunk in reader:
+                yield [chunk[column].to_numpy() for column in columns]
+    elif path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(
+            batch_size=CHUNK_ROWS, columns=columns
+        ):
+            yield [batch.column(column).to_numpy() for column in columns]
+    else:
+        raise ValueError(f"`{path.name}` is not a table")
+
+
+def _integers(values: np.ndarray, column: str) -> np.ndarray:
+    integers = values.astype(np.int64)
+    if not np.array_equal(integers, values):
+        raise ValueError(f"column `{column}` holds set members that are not integers")
+    return integers
+
+
+def read_set_members(source: DataSource | dict[str, Any]) -> list[int] | range:
+    """the distinct members of the column of a set, sorted, as a range if
+    they are many contiguous integers"""
+    source = DataSource.model_validate(source)
+    path = _source_path(source)
+    if len(source.columns) != 1:
+        raise ValueError(
+            f"a set is read from one column of a table, got {source.columns}"
+        )
+    members = np.empty(0, dtype=np.int64)
+    for (column,) in _table_chunks(path, source.columns):
+        members = np.union1d(members, _integers(column, source.columns[0]))
+    return compact_members(members.tolist())
+
+
+def read_param_data(
+    source: DataSource | dict[str, Any], index_members: list[Sequence[Any]]
+) -> Mapping:
+    """the values of a parameter indexed by sets with the given members, keyed
+    like `PyomoParam.initialize`"""
+    source = DataSource.model_validate(source)
+    path = _source_path(source)
+    if path.suffix == ".npy":
+        if source.columns:
+            raise ValueError(f"an array has no columns, got {source.columns}")
+        return DenseParamData(np.load(path, mmap_mode="r"), index_members)
+
+    dimensions = len(index_members)
+    if len(source.columns) != dimensions + 1:
+        raise ValueError(
+            f"a parameter with {dimensions} indexes is read from {dimensions} "
+            f"index columns and a value column, got {source.columns}"
+        )
+    data: dict[Any, Any] = {}
+    for *index_columns, values in _table_chunks(path, source.columns):
+        index_lists = [
+            _integers(index_column, column).tolist()
+            for index_column, column in zip(index_columns, source.columns)
+        ]
+        keys = index_lists[0] if dimensions == 1 else zip(*index_lists)
+        data.update(zip(keys, values.tolist()))
+    return data
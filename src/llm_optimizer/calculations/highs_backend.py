@@ -0,0 +1,289 @@
+import functools
+import logging
+import sys
+import time
+from typing import Any, Iterator, TextIO
+
+import highspy
+import numpy as np
+import pyomo.environ as pyo
+
+from llm_optimizer.calculations.matrix_builder import (
+    MatrixModel,
+    build_matrix_model,
+    to_highs,
+)
+from llm_optimizer.calculations.solver_options import (
+    SolverOptions,
+    reset_highs_threads,
+    with_time_limit,
+)
+from llm_optimizer.models.llm import LinearOptimizationModel
+from llm_optimizer.utils import instrumentation
+
+
+# highspy model status -> (solver status, termination condition) like appsi
+_STATUS_MAP = {
+    highspy.HighsModelStatus.kOptimal: (
+        pyo.SolverStatus.ok,
+        pyo.TerminationCondition.optimal,
+    ),
+    highspy.HighsModelStatus.kInfeasible: (
+        pyo.SolverStatus.warning,
+        pyo.TerminationCondition.infeasible,
+    ),
+    highspy.HighsModelStatus.kUnbounded: (
+        pyo.SolverStatus.warning,
+        pyo.TerminationCondition.unbounded,
+    ),
+    highspy.HighsModelStatus.kUnboundedOrInfeasible: (
+        pyo.SolverStatus.warning,
+        pyo.TerminationCondition.infeasibleOrUnbounded,
+    ),
+    highspy.HighsModelStatus.kTimeLimit: (
+        pyo.SolverStatus.aborted,
+        pyo.TerminationCondition.maxTimeLimit,
+    ),
+    highspy.HighsModelStatus.kIterationLimit: (
+        pyo.SolverStatus.aborted,
+        pyo.TerminationCondition.maxIterations,
+    ),
+}
+
+
+class SolverInfo:
+    def __init__(
+        self,
+        status: pyo.SolverStatus,
+        termination_condition: pyo.TerminationCondition,
+        model_status: str,
+        wallclock_time: float,
+        iterations: int,
+        mip_nodes: int = 0,
+    ):
+        self.status = status
+        self.termination_condition = termination_condition
+        self.model_status = model_status
+        self.wallclock_time = wallclock_time
+        self.iterations = iterations
+        self.mip_nodes = mip_nodes
+
+
+class HighsResults:
+    """the parts of pyomo's `SolverResults` the app and the batch use"""
+
+    def __init__(self, solver: SolverInfo):
+        self.solver = solver
+
+    def write(self) -> str:
+        return (
+            f"Solver: highspy\n"
+            f"  Status: {self.solver.status}\n"
+            f"  Termination condition: {self.solver.termination_condition}\n"
+            f"  Model status: {self.solver.model_status}\n"
+            f"  Wallclock time: {self.solver.wallclock_time}\n"
+            f"  Iterations: {self.solver.iterations}\n"
+            f"  MIP nodes: {self.solver.mip_nodes}"
+        )
+
+
+class SolutionValue:
+    """a solved value, called like a pyomo component to get the value"""
+
+    def __init__(self, value: float | None):
+        self.value = value
+
+    def __call__(self) -> float | None:
+        return self.value
+
+
+class SolutionVar:
+    """the solved values of one variable, indexed like the pyomo `Var`"""
+
+    def __init__(
+        self, name: str, doc: str, keys: list, values: np.ndarray | None = None
+    ):
+        self.name = name
+        self.doc = doc
+        self._keys = keys
+        # the variable's slice of the highs column values, `None` unsolved
+        self._array = values
+
+    @functools.cached_property
+    def _values(self) -> dict[Any, float | None]:
+        if self._array is None:
+            return dict.fromkeys(self._keys)
+        return dict(zip(self._keys, self._array.tolist()))
+
+    def __str__(self) -> str:
+        return self.name
+
+    def __iter__(self) -> Iterator:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, idx) -> SolutionValue:
+        return SolutionValue(self._values[idx])
+
+    def __call__(self) -> float | None:
+        # scalar variables are called without an index
+        return self._values[None]
+
+    def extract_values(self) -> dict[Any, float | None]:
+        return dict(self._values)
+
+    def keys(self) -> list:
+        return list(self._keys)
+
+    def value_array(self) -> np.ndarray:
+        """all values at once, nan if not solved"""
+        if self._array is None:
+            return np.full(len(self._keys), np.nan)
+        return self._array.copy()
+
+
+class HighsSolution:
+    """solution of a `MatrixModel` with the interface of a solved pyomo
+    model: `my_objective()`, `component_objects(Var)`, the variables as
+    attributes and `pprint`"""
+
+    def __init__(
+        self,
+        matrix_model: MatrixModel,
+        col_value: np.ndarray | None,
+        var_docs: dict[str, str],
+    ):
+        self.matrix_model = matrix_model
+        objective_value = None
+        if col_value is not None:
+            objective_value = float(
+                matrix_model.objective @ col_value + matrix_model.objective_offset
+            )
+        self.my_objective = SolutionValue(objective_value)
+
+        # the columns of a variable are contiguous, its values are a slice
+        keys: dict[str, list] = {name: [] for name in var_docs}
+        starts: dict[str, int] = {}
+        for col, (var_name, key) in enumerate(matrix_model.column_names):
+            starts.setdefault(var_name, col)
+            keys[var_name].append(key)
+        self._vars = {
+            name: SolutionVar(
+                name,
+                doc,
+                keys[name],
+                None
+                if col_value is None
+                else col_value[starts.get(name, 0) :][: len(keys[name])],
+            )
+            for name, doc in var_docs.items()
+        }
+
+    def __getattr__(self, name: str) -> SolutionVar:
+        try:
+            return self.__dict__["_vars"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def component_objects(self, ctype=pyo.Var, active=True) -> Iterator[SolutionVar]:
+        if ctype is not pyo.Var:
+            return iter(())
+        return iter(self._vars.values())
+
+    def pprint(self, ostream: TextIO | None = None) -> None:
+        ostream = ostream or sys.stdout
+        matrix_model = self.matrix_model
+        ostream.write(
+            f"{len(self._vars)} Var Declarations, {matrix_model.num_cols} columns\n"
+        )
+        for solution_var in self._vars.values():
+            ostream.write(f"    {solution_var} : {solution_var.doc}\n")
+            for key, value in solution_var.extract_values().items():
+                ostream.write(f"        {key} : {value}\n")
+        ostream.write(
+            f"{matrix_model.num_rows} Constraint rows, "
+            f"{matrix_model.num_nonzeros} nonzeros\n"
+        )
+        for row, (name, key) in enumerate(matrix_model.row_names):
+            start, end = matrix_model.a_start[row], matrix_model.a_start[row + 1]
+            terms = " + ".join(
+                f"{value}*{matrix_model.column_names[col][0]}"
+                f"[{matrix_model.column_names[col][1]}]"
+                for col, value in zip(
+                    matrix_model.a_index[start:end], matrix_model.a_value[start:end]
+                )
+            )
+            ostream.write(
+                f"    {name}[{key}] : {matrix_model.row_lower[row]} <= "
+                f"{terms} <= {matrix_model.row_upper[row]}\n"
+            )
+        ostream.write(
+            f"1 Objective Declarations\n    my_objective : {matrix_model.sense} : "
+            f"{self.my_objective()}\n"
+        )
+
+
+def solve_matrix_model(
+    matrix_model: MatrixModel,
+    var_docs: dict[str, str] | None = None,
+    time_limit: float | None = None,
+    options: SolverOptions | None = None,
+) -> tuple[HighsResults, HighsSolution]:
+    highs = to_highs(matrix_model)
+    options = with_time_limit(options, time_limit)
+    if options.solver != "highs":
+        raise ValueError(f"the highs backend cannot solve with {options.solver}")
+    reset_highs_threads(options)
+    for name, value in options.highs_options().items():
+        highs.setOptionValue(name, value)
+    if options.time_limit is not None:
+        highs.setOptionValue("time_limit", float(options.time_limit))
+    logging.debug("starting to solve with highspy ...")
+    with instrumentation.span("solve", backend="highs"):
+        start = time.perf_counter()
+        highs.run()
+        wallclock_time = time.perf_counter() - start
+        # the counter of the method that ran, the others stay 0 or -1
+        info = highs.getInfo()
+        iterations = max(info.simplex_iteration_count, info.ipm_iteration_count, 0)
+        mip_nodes = max(info.mip_node_count, 0)
+        instrumentation.set_attributes(iterations=iterations, mip_nodes=mip_nodes)
+        instrumentation.count("solver_iterations", iterations, backend="highs")
+        instrumentation.count("solver_mip_nodes", mip_nodes, backend="highs")
+
+    model_status = highs.getModelStatus()
+    status, termination_condition = _STATUS_MAP.get(
+        model_status, (pyo.SolverStatus.error, pyo.TerminationCondition.error)
+    )
+    results = HighsResults(
+        SolverInfo(
+            status,
+            termination_condition,
+            highs.modelStatusToString(model_status),
+            wallclock_time,
+            iterations,
+            mip_nodes,
+        )
+    )
+    logging.debug(results.write())
+
+    col_value = None
+    if highs.getSolution().value_valid:
+        col_value = np.asarray(highs.getSolution().col_value, dtype=float)
+    if var_docs is None:
+        var_docs = matrix_model.var_docs or {
+            var_name: "" for var_name, _ in matrix_model.column_names
+        }
+    return results, HighsSolution(matrix_model, col_value, var_docs)
+
+
+def solve_highs(
+    llm_pyomo_model: LinearOptimizationModel, options: SolverOptions | None = None
+) -> tuple[HighsResults, HighsSolution]:
+    """build and solve a `LinearOptimizationModel` with highspy, skipping the
+    pyomo model"""
+    with instrumentation.span("build_matrix_model"):
+        matrix_model = build_matrix_model(llm_pyomo_model)
+    return solve_matrix_model(matrix_model, options=options)
@@ -0,0 +1,110 @@
+import logging
+from typing import Any
+
+import pyomo.environ as pyo
+from pydantic import BaseModel
+
+from llm_optimizer.calculations.lin_optimization_logic import (
+    add_constraint,
+    add_objective,
+    create_concrete_model,
+    create_model_component,
+    register_allowed_names,
+)
+from llm_optimizer.models.llm import (
+    LinearOptimizationModel,
+    PyomoConstraint,
+    PyomoParam,
+    PyomoSet,
+    PyomoVar,
+)
+
+
+# in the order of the response schema, each field only refers to earlier ones
+_COMPONENT_FIELDS = {
+    "sets": PyomoSet,
+    "parameters": PyomoParam,
+    "variables": PyomoVar,
+    "constraints": PyomoConstraint,
+}
+
+
+class IncrementalModelBuilder:
+    """builds the pyomo components of a streamed `LinearOptimizationModel`
+    while the rest of the response is still generated
+
+    a component of a partial response is complete once the next component or
+    a later field has started, it is validated and built right away"""
+
+    def __init__(self, mutable_params: bool = False):
+        self.model: pyo.ConcreteModel = create_concrete_model()
+        self.mutable_params = mutable_params
+        self.failed = False
+        self._built: dict[str, list[dict]] = {field: [] for field in _COMPONENT_FIELDS}
+        self._allowed_names: set = set()
+
+    @property
+    def started(self) -> bool:
+        return any(self._built.values())
+
+    def feed(self, partial_model: BaseModel) -> list[str]:
+        """build the components that are complete in a partial response,
+        returns their names"""
+        return self._feed(partial_model, final=False)
+
+    def finish(
+        self, llm_pyomo_model: LinearOptimizationModel
+    ) -> pyo.ConcreteModel | None:
+        """build the remaining components and the objective of the final
+        response, `None` if the model could not be built incrementally or the
+        built components differ from the final ones"""
+        self._feed(llm_pyomo_model, final=True)
+        if self.failed:
+            return None
+        for field in _COMPONENT_FIELDS:
+            if self._built[field] != [
+                component.model_dump() for component in getattr(llm_pyomo_model, field)
+            ]:
+                logging.debug(f"streamed {field} differ from the final response")
+                return None
+        try:
+            add_objective(self.model, llm_pyomo_model.objective)
+        except Exception as e:
+            logging.debug(f"incremental build failed on the objective: {e}")
+            return None
+        return self.model
+
+    def _feed(self, partial_model: BaseModel, final: bool) -> list[str]:
+        if self.failed:
+            return []
+        built = []
+        fields = list(_COMPONENT_FIELDS)
+        try:
+            for position, field in enumerate(fields):
+                components = getattr(partial_model, field, None) or []
+                if not final and not any(
+                    getattr(partial_model, later_field, None)
+                    for later_field in fields[position + 1 :]
+                ):
+                    # the last component may still be streamed
+                    components = components[:-1]
+                for component in components[len(self._built[field]) :]:
+                    component = _COMPONENT_FIELDS[field].model_validate(
+                        component.model_dump()
+                    )
+                    self._build(field, component)
+                    self._built[field].append(component.model_dump())
+                    built.append(component.name)
+        except Exception as e:
+            # the final model is built in one go instead
+            logging.debug(f"incremental build stopped: {e}")
+            self.failed = True
+        return built
+
+    def _build(self, field: str, component: Any) -> None:
+        logging.debug(f"building streamed {field}: {component.name}")
+        if field == "constraints":
+            add_constraint(self.model, component, frozenset(self._allowed_names))
+            return
+        create_model_component(self.model, component, self.mutable_params)
+        register_allowed_names(self._allowed_names, self.model, component.name)
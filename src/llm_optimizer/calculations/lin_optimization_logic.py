@@ -1,21 +1,107 @@
+import contextlib
 import logging
 import pyomo.environ as pyo
 import re
-
-from llm_optimizer.models.llm import LinearOptimizationModel
-from llm_optimizer.utils.helpers import parse_rule
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from pyomo.core.expr.numeric_expr import LinearExpression, MonomialTermExpression
+from pyomo.core.expr.relational_expr import (
+    EqualityExpression,
+    InequalityExpression,
+    RangedExpression,
+)
+
+from llm_optimizer.models.llm import (
+    LinearOptimizationModel,
+    ObjectiveFunction,
+    PyomoConstraint,
+    PyomoParam,
+    PyomoSet,
+    PyomoVar,
+)
+from llm_optimizer.calculations.data_files import read_param_data, read_set_members
+from llm_optimizer.calculations.model_analysis import (
+    DEFAULT_SIZE_LIMITS,
+    ModelAnalysis,
+    ModelTooLargeError,
+    NonlinearRuleError,
+    SizeLimits,
+    analyze_model,
+    route_backend,
+)
+from llm_optimizer.calculations.rule_compiler import (
+    LinearExpr,
+    NotLinearError,
+    ParamRef,
+    RuleCompiler,
+    SetRef,
+    VarRef,
+    compile_constraint,
+)
+from llm_optimizer.calculations.solver_options import (
+    SolverOptions,
+    reset_highs_threads,
+    with_time_limit,
+)
+from llm_optimizer.utils import instrumentation
+from llm_optimizer.utils.helpers import check_if_expression_is_safe, parse_rule
 from llm_optimizer.models.llm import RuleError
+from llm_optimizer.models.base import SOLVER_BACKENDS
+from llm_optimizer.models.compact import DenseParamData, compact_members
+
+
+@dataclass
+class FailedComponent:
+    # "set", "variable", "parameter", "constraint" or "objective"
+    kind: str
+    name: str
+
+
+@contextlib.contextmanager
+def building(kind: str, name: str) -> Iterator[None]:
+    """mark an error raised while building a component with the component,
+    the error keeps its type, `failed_component` reads the mark"""
+    try:
+        yield
+    except Exception as e:
+        if failed_component(e) is None:
+            e._failed_component = FailedComponent(kind, name)
+            e.add_note(f"while building the {kind} `{name}`")
+        raise
+
+
+def failed_component(error: BaseException) -> FailedComponent | None:
+    """the component an error was raised for, `None` if it was not raised
+    while building a component"""
+    return getattr(error, "_failed_component", None)
 
 
 def create_concrete_model():
     return pyo.ConcreteModel()
 
 
-def create_set(model, name, initialize, doc=""):
+def create_set(model, name, initialize, doc="", source=None):
     logging.debug(f"creating set {name}")
+    if source is not None:
+        initialize = read_set_members(source)
+    if isinstance(initialize, range):
+        # a pyomo `RangeSet` saves little memory next to the rest of the
+        # model, but its membership checks slow down the build
+        initialize = list(initialize)
     setattr(model, name, pyo.Set(initialize=initialize, doc=doc))
 
 
+def set_members(pyo_set: pyo.Set) -> list | range:
+    """the members of a built set, contiguous ones in ascending order as a
+    range, whose positions are computed instead of searched"""
+    members = list(pyo_set)
+    compacted = compact_members(members)
+    if isinstance(compacted, range) and members == list(compacted):
+        return compacted
+    return members
+
+
 def create_var(model, name, indexes, domain, doc=""):
     setattr(
         model,
@@ -28,19 +114,58 @@ def create_var(model, name, indexes, domain, doc=""):
     )
 
 
-def create_param(model, name, indexes, initialize, within, doc=""):
+def create_param(
+    model, name, indexes, initialize, within, doc="", source=None, mutable=False
+):
+    index_sets = [get_index(model, index) for index in (indexes or []) if index]
+    if source is not None:
+        initialize = read_param_data(
+            source, [set_members(index_set) for index_set in index_sets]
+        )
+    if isinstance(initialize, DenseParamData):
+        # pyomo looks up every value once, from a dict that is much faster
+        initialize = initialize.to_dict()
     setattr(
         model,
         name,
         pyo.Param(
-            *[get_index(model, index) for index in (indexes or []) if index],
+            *index_sets,
             initialize=initialize,
             within=get_domain(within),
             doc=doc,
+            mutable=mutable,
         ),
     )
 
 
+def create_model_component(
+    model: pyo.ConcreteModel,
+    component: PyomoSet | PyomoVar | PyomoParam,
+    mutable_params: bool = False,
+) -> None:
+    """create a set, variable or parameter, its fields are passed as they are,
+    `model_dump` would copy the members and values of a large component"""
+    if isinstance(component, PyomoSet):
+        create_set(
+            model, component.name, component.initialize, component.doc, component.source
+        )
+    elif isinstance(component, PyomoParam):
+        create_param(
+            model,
+            component.name,
+            component.indexes,
+            component.initialize,
+            component.within,
+            component.doc,
+            component.source,
+            mutable=mutable_params,
+        )
+    else:
+        create_var(
+            model, component.name, component.indexes, component.domain, component.doc
+        )
+
+
 def get_objective_rule(expr_str):
     pattern = r"model\.\w+"
     variables = re.findall(pattern, expr_str)
@@ -66,95 +191,419 @@ def get_index(model: pyo.ConcreteModel, index_str: str) -> pyo.Set:
     return getattr(model, index_str.split(".")[-1])
 
 
+def register_allowed_names(
+    allowed_names: set, model: pyo.ConcreteModel, component_name: str
+) -> None:
+    """add a component and its index keys to the names rules may reference"""
+    component = getattr(model, component_name)
+    allowed_names.add("model." + component.name)
+    if component.is_indexed():
+        allowed_names.update(comp_key for comp_key in component.keys() if comp_key)
+
+
 def create_constraint(idx_strs, model, name, rule, doc):
     logging.debug(f"creating constraint {idx_strs=} {name}")
     idxs = (getattr(model, idx) for idx in idx_strs)
     setattr(model, name, pyo.Constraint(*idxs, rule=rule["func"], doc=doc))
 
 
-def construct_pyomo_model(
-    llm_pyomo_model: LinearOptimizationModel,
-) -> pyo.ConcreteModel:
-    if not isinstance(llm_pyomo_model, LinearOptimizationModel):
-        raise TypeError
-    if not llm_pyomo_model.variables:
-        raise ValueError
+class PyomoModelData:
+    """the sets, parameters and variables of a pyomo model for the
+    `RuleCompiler`, the columns are positions in `var_data`; read once per
+    referenced component"""
+
+    def __init__(self, model: pyo.ConcreteModel):
+        self.model = model
+        self.var_data: list = []
+        self._components: dict[str, SetRef | ParamRef | VarRef] = {}
+
+    def component(self, name: str) -> SetRef | ParamRef | VarRef:
+        if name not in self._components:
+            self._components[name] = self._read(name)
+        return self._components[name]
+
+    def _read(self, name: str) -> SetRef | ParamRef | VarRef:
+        component = self.model.component(name)
+        if component is None:
+            raise NotLinearError(f"unknown model component `{name}`")
+        if component.ctype is pyo.Set:
+            return SetRef(set_members(component))
+        if component.ctype is pyo.Param:
+            if component.mutable:
+                # the values of a mutable parameter are updated in place, a
+                # rule with it has to stay a pyomo expression
+                raise NotLinearError(f"parameter `{name}` is mutable")
+            return ParamRef(name, component.extract_values())
+        if component.ctype is pyo.Var:
+            start = len(self.var_data)
+            self.var_data.extend(component.values())
+            return VarRef(
+                name, dict(zip(component.keys(), range(start, len(self.var_data))))
+            )
+        raise NotLinearError(f"unsupported model component `{name}`")
+
+    def linear_expression(self, expr: LinearExpr):
+        """a single variable or a `LinearExpression`, a variable with
+        coefficient 1 is a term of its own like in the expressions pyomo
+        builds"""
+        if len(expr.coefs) == 1:
+            ((col, coef),) = expr.coefs.items()
+            if coef == 1:
+                return self.var_data[col]
+        return LinearExpression(
+            [
+                self.var_data[col]
+                if coef == 1
+                else MonomialTermExpression((coef, self.var_data[col]))
+                for col, coef in expr.coefs.items()
+            ]
+        )
+
+
+def create_compiled_constraint(
+    model: pyo.ConcreteModel, pyo_constr: PyomoConstraint, compiler: RuleCompiler
+) -> None:
+    """build each row from the coefficient map of the compiled rule, the body
+    is a variable or a flat `LinearExpression` over the variable data; raises
+    `NotLinearError` without leaving the constraint on the model if the rule
+    is not recognized"""
+    row_of = compile_constraint(pyo_constr, compiler)
+    data: PyomoModelData = compiler.data
+    failed: list[NotLinearError] = []
+
+    def rule(model, *index):
+        # an error raised in a rule is logged by pyomo, it is kept for the
+        # fallback instead and the other indexes are skipped
+        if failed:
+            return pyo.Constraint.Skip
+        try:
+            row = row_of(index)
+        except NotLinearError as e:
+            failed.append(e)
+            return pyo.Constraint.Skip
+        if row is None:
+            return pyo.Constraint.Skip
+        body = data.linear_expression(row.expr)
+        if row.lower == row.upper:
+            return EqualityExpression((body, row.lower))
+        if row.lower is None:
+            return InequalityExpression((body, row.upper), False)
+        if row.upper is None:
+            return InequalityExpression((row.lower, body), False)
+        return RangedExpression((row.lower, body, row.upper), (False, False))
+
+    logging.debug(f"creating compiled constraint {pyo_constr.name}")
+    idxs = [get_index(model, idx) for idx in pyo_constr.idxs or [] if idx]
+    setattr(
+        model, pyo_constr.name, pyo.Constraint(*idxs, rule=rule, doc=pyo_constr.doc)
+    )
+    if failed:
+        model.del_component(pyo_constr.name)
+        raise failed[0]
+
 
-    model: pyo.ConcreteModel = create_concrete_model()
+def create_components(
+    model: pyo.ConcreteModel,
+    llm_pyomo_model: LinearOptimizationModel,
+    mutable_params: bool = False,
+) -> frozenset:
+    """create the sets, variables and parameters and return the names rules
+    may reference"""
+    allowed_names = set()
     for pyo_set in llm_pyomo_model.sets:
         logging.debug(f"creating set: {pyo_set}")
-        create_set(model, *pyo_set.model_dump().values())
+        with (
+            instrumentation.span("build_set", component=pyo_set.name),
+            building("set", pyo_set.name),
+        ):
+            create_model_component(model, pyo_set)
+            register_allowed_names(allowed_names, model, pyo_set.name)
     for pyo_var in llm_pyomo_model.variables:
         logging.debug(f"creating var: {pyo_var}")
-        create_var(model, *pyo_var.model_dump().values())
+        with (
+            instrumentation.span("build_var", component=pyo_var.name),
+            building("variable", pyo_var.name),
+        ):
+            create_model_component(model, pyo_var)
+            register_allowed_names(allowed_names, model, pyo_var.name)
     for pyo_param in llm_pyomo_model.parameters:
         logging.debug(f"creating param: {pyo_param}")
-        create_param(model, *pyo_param.model_dump().values())
-    for pyo_constr in llm_pyomo_model.constraints:
-        allowed_vars = {"model." + attr.name for attr in model.component_objects()} | {
-            *{
-                comp_key
-                for comp in model.component_objects()
-                for comp_key in comp.keys()
-                if comp_key
-            }
-        }
-
-        logging.debug(
-            f"creating constraint {pyo_constr.rule} with allowed vars: {allowed_vars}"
+        with (
+            instrumentation.span("build_param", component=pyo_param.name),
+            building("parameter", pyo_param.name),
+        ):
+            create_model_component(model, pyo_param, mutable_params)
+            register_allowed_names(allowed_names, model, pyo_param.name)
+
+    # rules may only reference sets, variables and parameters, so the allowed
+    # names are complete at this point and are shared by all constraint rules
+    return frozenset(allowed_names)
+
+
+def add_constraint(
+    model: pyo.ConcreteModel,
+    pyo_constr: PyomoConstraint,
+    allowed_vars: frozenset,
+    compiler: RuleCompiler | None = None,
+) -> None:
+    """with a `compiler` of `PyomoModelData` a rule is compiled, rules it does
+    not recognize are built from the lambda like without one"""
+    logging.debug(f"creating constraint {pyo_constr.rule}")
+    with (
+        instrumentation.span("build_constraint", component=pyo_constr.name),
+        building("constraint", pyo_constr.name),
+    ):
+        _add_constraint(model, pyo_constr, allowed_vars, compiler)
+
+
+def _add_constraint(
+    model: pyo.ConcreteModel,
+    pyo_constr: PyomoConstraint,
+    allowed_vars: frozenset,
+    compiler: RuleCompiler | None = None,
+) -> None:
+    if (
+        compiler is not None
+        and getattr(pyo_constr, "rule", None)
+        # an unsafe rule is left to `parse_rule` to reject
+        and check_if_expression_is_safe(
+            pyo_constr.rule.lambda_body.strip(),
+            allowed_vars,
+            extra_vars=pyo_constr.rule.lambda_arguments,
+        )
+    ):
+        try:
+            create_compiled_constraint(model, pyo_constr, compiler)
+            return
+        except (NotLinearError, SyntaxError) as e:
+            logging.debug(f"falling back to the lambda rule for {pyo_constr.name}: {e}")
+    if getattr(pyo_constr, "expr", None):
+        rule = parse_rule(pyo_constr.expr, allowed_vars)
+        create_constraint([], model, pyo_constr.name, rule=rule, doc=pyo_constr.doc)
+    elif getattr(pyo_constr, "rule", None):
+        rule_str = (
+            "lambda "
+            + ", ".join(pyo_constr.rule.lambda_arguments)
+            + ": "
+            + pyo_constr.rule.lambda_body
+        )
+        logging.debug("check: " + rule_str + ", " + str(pyo_constr.idxs))
+        rule = parse_rule(rule_str, allowed_vars)
+        create_constraint(
+            pyo_constr.idxs, model, pyo_constr.name, rule=rule, doc=pyo_constr.doc
         )
-
-        if getattr(pyo_constr, "expr", None):
-            rule = parse_rule(pyo_constr.expr, allowed_vars)
-            create_constraint([], model, pyo_constr.name, rule=rule, doc=pyo_constr.doc)
-        elif getattr(pyo_constr, "rule", None):
-            rule_str = (
-                "lambda "
-                + ", ".join(pyo_constr.rule.lambda_arguments)
-                + ": "
-                + pyo_constr.rule.lambda_body
-            )
-            logging.debug("check: " + rule_str + ", " + str(pyo_constr.idxs))
-            rule = parse_rule(
-                rule_str, allowed_vars | set(pyo_constr.rule.lambda_arguments)
-            )
-            create_constraint(
-                pyo_constr.idxs, model, pyo_constr.name, rule=rule, doc=pyo_constr.doc
-            )
-        else:
-            raise RuleError("Constraint must have either rule or expression.")
-
-    logging.debug(
-        f"creating objective {llm_pyomo_model.objective.expr or llm_pyomo_model.objective.rule}"
-    )
-
-    if getattr(llm_pyomo_model.objective, "expr", None):
-        objective_rule = get_objective_rule(llm_pyomo_model.objective.expr)
-    elif getattr(llm_pyomo_model.objective, "rule", None):
-        objective_rule = get_objective_rule(llm_pyomo_model.objective.rule)
     else:
-        raise RuleError("Objective must have either rule or expression.")
+        raise RuleError("Constraint must have either rule or expression.")
 
-    objective_sense = (
+
+def get_objective_sense(objective: ObjectiveFunction):
+    return (
         pyo.maximize
-        if llm_pyomo_model.objective.optimization_sense.value == "maximize"
+        if objective.optimization_sense.value == "maximize"
         else pyo.minimize
     )
-    model.my_objective = pyo.Objective(
-        rule=objective_rule["func"], sense=objective_sense
-    )
-    # model
+
+
+def add_objective(model: pyo.ConcreteModel, objective: ObjectiveFunction) -> None:
+    logging.debug(f"creating objective {objective.expr or objective.rule}")
+
+    with instrumentation.span("build_objective"), building("objective", "objective"):
+        if getattr(objective, "expr", None):
+            objective_rule = get_objective_rule(objective.expr)
+        elif getattr(objective, "rule", None):
+            objective_rule = get_objective_rule(objective.rule)
+        else:
+            raise RuleError("Objective must have either rule or expression.")
+
+        model.my_objective = pyo.Objective(
+            rule=objective_rule["func"], sense=get_objective_sense(objective)
+        )
+
+
+def construct_pyomo_model(
+    llm_pyomo_model: LinearOptimizationModel, mutable_params: bool = False
+) -> pyo.ConcreteModel:
+    if not isinstance(llm_pyomo_model, LinearOptimizationModel):
+        raise TypeError
+    if not llm_pyomo_model.variables:
+        raise ValueError
+
+    with instrumentation.span("construct_pyomo_model"):
+        model: pyo.ConcreteModel = create_concrete_model()
+        allowed_vars = create_components(model, llm_pyomo_model, mutable_params)
+        compiler = RuleCompiler(PyomoModelData(model))
+        for pyo_constr in llm_pyomo_model.constraints:
+            add_constraint(model, pyo_constr, allowed_vars, compiler)
+        add_objective(model, llm_pyomo_model.objective)
     return model
 
 
-def solve(pyomo_model: pyo.ConcreteModel) -> pyo.ConcreteModel:
-    optimizer = pyo.SolverFactory("appsi_highs")
-    logging.debug("starting to solve ...")
-    results = optimizer.solve(pyomo_model)
+def record_solver_statistics(optimizer, backend: str = "pyomo") -> None:
+    """iteration and mip node counts of the last solve of an appsi highs
+    solver"""
+    # appsi reports no wall time or iterations, they are read from highspy
+    highs = getattr(optimizer, "_solver_model", None)
+    if highs is None or instrumentation.active_recorder() is None:
+        return
+    info = highs.getInfo()
+    iterations = max(info.simplex_iteration_count, info.ipm_iteration_count, 0)
+    mip_nodes = max(info.mip_node_count, 0)
+    instrumentation.set_attributes(
+        iterations=iterations, mip_nodes=mip_nodes, highs_run_time=highs.getRunTime()
+    )
+    instrumentation.count("solver_iterations", iterations, backend=backend)
+    instrumentation.count("solver_mip_nodes", mip_nodes, backend=backend)
+
+
+def solve(
+    pyomo_model: pyo.ConcreteModel,
+    time_limit: float | None = None,
+    options: SolverOptions | None = None,
+) -> pyo.ConcreteModel:
+    options = with_time_limit(options, time_limit)
+    name = "appsi_highs" if options.solver == "highs" else options.solver
+    optimizer = pyo.SolverFactory(name)
+    reset_highs_threads(options)
+    logging.debug(f"starting to solve with {name} ...")
+    # only the options that are set, the solver defaults stay untouched
+    solve_kwargs = {}
+    if solver_options := options.solver_options():
+        solve_kwargs["options"] = solver_options
+    if options.time_limit is not None:
+        solve_kwargs["timelimit"] = options.time_limit
+    with instrumentation.span("solve", backend="pyomo", solver=options.solver):
+        results = optimizer.solve(pyomo_model, **solve_kwargs)
+        record_solver_statistics(optimizer)
     logging.debug(results.write())
     return results, pyomo_model
 
 
+def construct_and_solve(
+    llm_pyomo_model: LinearOptimizationModel,
+    backend: str = "pyomo",
+    options: SolverOptions | None = None,
+) -> tuple:
+    """`construct_pyomo_model` and `solve`, or with `backend="highs"` compile
+    the model straight into highspy, both results share the same interface"""
+    if backend not in SOLVER_BACKENDS:
+        raise ValueError(f"unknown solver backend `{backend}`")
+    if backend == "highs":
+        # imported here, the highs backend builds on this module
+        from llm_optimizer.calculations.highs_backend import solve_highs
+
+        return solve_highs(llm_pyomo_model, options=options)
+    return solve(construct_pyomo_model(llm_pyomo_model), options=options)
+
+
+def is_optimal(results) -> bool:
+    return (
+        results.solver.status == pyo.SolverStatus.ok
+        and results.solver.termination_condition == pyo.TerminationCondition.optimal
+    )
+
+
+def summarize_solution(results, pyomo_model: pyo.ConcreteModel) -> dict[str, Any]:
+    """json serializable summary of the solver results and variable values"""
+    optimal = is_optimal(results)
+    return {
+        "solver_status": str(results.solver.status),
+        "termination_condition": str(results.solver.termination_condition),
+        "optimal": optimal,
+        "objective": pyomo_model.my_objective() if optimal else None,
+        "variables": {
+            str(model_var): [
+                [list(idx) if isinstance(idx, tuple) else idx, value]
+                for idx, value in model_var.extract_values().items()
+            ]
+            for model_var in pyomo_model.component_objects(pyo.Var, active=True)
+        }
+        if optimal
+        else {},
+    }
+
+
+def check_model(
+    llm_pyomo_model: LinearOptimizationModel,
+    limits: SizeLimits = DEFAULT_SIZE_LIMITS,
+    analysis: ModelAnalysis | None = None,
+) -> ModelAnalysis:
+    """`analyze_model` before the build, a nonlinear rule raises
+    `NonlinearRuleError` marked with its component like an error of its build,
+    so it can be repaired, a model above `limits` raises `ModelTooLargeError`
+
+    an `analysis` the caller already made of the model is checked instead of
+    analyzing the model again, which reads the members of its set files"""
+    if analysis is None:
+        with instrumentation.span("analyze_model"):
+            analysis = analyze_model(llm_pyomo_model)
+    logging.debug(f"model analysis: {analysis.summary()}")
+    for kind, name in analysis.nonlinear:
+        with building(kind, name):
+            raise NonlinearRuleError(
+                f"the {kind} is not linear, only linear rules can be solved"
+            )
+    analysis.check_size(limits)
+    return analysis
+
+
+def _build_error(error: Exception) -> dict[str, Any]:
+    result = {"status": "build_error", "error": f"{type(error).__name__}: {error}"}
+    if (component := failed_component(error)) is not None:
+        # the caller may repair just this component
+        result["component"] = {"kind": component.kind, "name": component.name}
+    return result
+
+
+def build_and_solve(
+    llm_pyomo_model_json: str,
+    backend: str = "pyomo",
+    time_limit: float | None = None,
+    options: SolverOptions | None = None,
+) -> dict[str, Any]:
+    """construct and solve a `LinearOptimizationModel` given as json, meant to
+    be run in worker processes, so only plain data goes in and out
+
+    `time_limit` in seconds stops the solver, the best solution found so far
+    is summarized; the model is checked with `check_model` first, a large
+    model is built with the highs backend, see `route_backend`"""
+    if backend not in SOLVER_BACKENDS:
+        raise ValueError(f"unknown solver backend `{backend}`")
+    options = with_time_limit(options, time_limit)
+    if backend == "highs" and options.solver != "highs":
+        raise ValueError(f"the highs backend cannot solve with {options.solver}")
+
+    llm_pyomo_model = LinearOptimizationModel.model_validate_json(llm_pyomo_model_json)
+    try:
+        analysis = check_model(llm_pyomo_model)
+    except ModelTooLargeError as e:
+        return {"status": "too_large", "error": str(e)}
+    except Exception as e:
+        return _build_error(e)
+    if options.solver == "highs":
+        backend = route_backend(analysis, backend)
+    if backend == "highs":
+        from llm_optimizer.calculations.highs_backend import solve_matrix_model
+        from llm_optimizer.calculations.matrix_builder import build_matrix_model
+
+        build_model, solve_model = build_matrix_model, solve_matrix_model
+    else:
+        build_model, solve_model = construct_pyomo_model, solve
+
+    try:
+        model = build_model(llm_pyomo_model)
+    except Exception as e:
+        return _build_error(e)
+    try:
+        results, solution = solve_model(model, options=options)
+    except Exception as e:
+        return {"status": "solve_error", "error": f"{type(e).__name__}: {e}"}
+    return {
+        "status": "solved",
+        "problem_class": analysis.problem_class,
+        **summarize_solution(results, solution),
+    }
+
+
 if __name__ == "__main__":
     import json
     from pathlib import Path
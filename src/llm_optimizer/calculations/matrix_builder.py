@@ -0,0 +1,372 @@
+import itertools
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Any
+
+import highspy
+import numpy as np
+import pyomo.environ as pyo
+from pyomo.repn import generate_standard_repn
+
+from llm_optimizer.calculations.data_files import read_param_data, read_set_members
+from llm_optimizer.calculations.lin_optimization_logic import (
+    add_constraint,
+    add_objective,
+    building,
+    create_components,
+    create_concrete_model,
+)
+from llm_optimizer.calculations.rule_compiler import (
+    LinearExpr,
+    NotLinearError,
+    ParamRef,
+    Row,
+    RuleCompiler,
+    SetRef,
+    VarRef,
+    constraint_rows,
+    objective_expression,
+)
+from llm_optimizer.models.llm import (
+    LinearOptimizationModel,
+    ObjectiveFunction,
+    PyomoConstraint,
+)
+
+
+# (lower bound, upper bound, integer) for the domains `get_domain` knows,
+# any other domain name gives an unbounded continuous variable there as well
+DOMAIN_BOUNDS = {
+    "NonNegativeIntegers": (0.0, math.inf, True),
+    "NonNegativeReals": (0.0, math.inf, False),
+    "NonPositiveIntegers": (-math.inf, 0.0, True),
+    "NonPositiveReals": (-math.inf, 0.0, False),
+    "Integers": (-math.inf, math.inf, True),
+    "Reals": (-math.inf, math.inf, False),
+}
+
+
+@dataclass
+class MatrixModel:
+    """an lp/ milp in matrix form, the constraint matrix is stored row wise
+    in compressed sparse row arrays"""
+
+    column_names: list[tuple[str, Any]]
+    col_lower: np.ndarray
+    col_upper: np.ndarray
+    integrality: np.ndarray
+    row_names: list[tuple[str, Any]]
+    row_lower: np.ndarray
+    row_upper: np.ndarray
+    a_start: np.ndarray
+    a_index: np.ndarray
+    a_value: np.ndarray
+    objective: np.ndarray
+    objective_offset: float
+    sense: str
+    # the docs of the variables by name, also of variables without columns
+    var_docs: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def num_cols(self) -> int:
+        return len(self.column_names)
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.row_names)
+
+    @property
+    def num_nonzeros(self) -> int:
+        return len(self.a_value)
+
+
+class ModelData:
+    """the sets, parameter data and variable columns of a
+    `LinearOptimizationModel`, without building a pyomo model"""
+
+    def __init__(self, llm_pyomo_model: LinearOptimizationModel):
+        self.sets: dict[str, SetRef] = {}
+        for pyo_set in llm_pyomo_model.sets:
+            with building("set", pyo_set.name):
+                if pyo_set.source is not None:
+                    members = read_set_members(pyo_set.source)
+                elif isinstance(pyo_set.initialize, range):
+                    members = pyo_set.initialize
+                else:
+                    members = list(pyo_set.initialize)
+                self.sets[pyo_set.name] = SetRef(members)
+        # the keys of the members of a range are built once and shared by the
+        # columns and rows indexed by the same sets
+        self._index_keys: dict[tuple[str, ...], list] = {}
+        self.params: dict[str, ParamRef] = {}
+        for pyo_param in llm_pyomo_model.parameters:
+            with building("parameter", pyo_param.name):
+                # the values of a memory mapped array are only read where a
+                # rule looks them up
+                self.params[pyo_param.name] = ParamRef(
+                    pyo_param.name,
+                    pyo_param.initialize
+                    if pyo_param.source is None
+                    else read_param_data(
+                        pyo_param.source, self.index_members(pyo_param.indexes)
+                    ),
+                )
+        self.vars: dict[str, VarRef] = {}
+        self.column_names: list[tuple[str, Any]] = []
+        self.col_lower: list[float] = []
+        self.col_upper: list[float] = []
+        self.integrality: list[bool] = []
+
+        for pyo_var in llm_pyomo_model.variables:
+            keys = self.index_keys(pyo_var.indexes)
+            lower, upper, integer = DOMAIN_BOUNDS.get(
+                str(pyo_var.domain), (-math.inf, math.inf, False)
+            )
+            start = len(self.column_names)
+            self.column_names.extend((pyo_var.name, key) for key in keys)
+            self.col_lower.extend(itertools.repeat(lower, len(keys)))
+            self.col_upper.extend(itertools.repeat(upper, len(keys)))
+            self.integrality.extend(itertools.repeat(integer, len(keys)))
+            self.vars[pyo_var.name] = VarRef(
+                pyo_var.name, dict(zip(keys, range(start, len(self.column_names))))
+            )
+
+    def index_members(self, index_names: list[str] | None) -> list[list | range]:
+        """the members of the given index sets"""
+        index_sets = []
+        for index_name in index_names or []:
+            if not index_name:
+                continue
+            if (set_name := index_name.split(".")[-1]) not in self.sets:
+                raise NotLinearError(f"unknown index set `{set_name}`")
+            index_sets.append(self.sets[set_name].members)
+        return index_sets
+
+    def index_keys(self, index_names: list[str] | None) -> list:
+        """the keys of a component indexed by the given sets, in pyomo order"""
+        names = tuple(index_names or [])
+        if names not in self._index_keys:
+            index_sets = self.index_members(names)
+            if not index_sets:
+                keys = [None]
+            elif len(index_sets) == 1:
+                keys = list(index_sets[0])
+            else:
+                keys = list(itertools.product(*index_sets))
+            self._index_keys[names] = keys
+        return self._index_keys[names]
+
+    def component(self, name: str):
+        for components in (self.sets, self.params, self.vars):
+            if name in components:
+                return components[name]
+        raise NotLinearError(f"unknown model component `{name}`")
+
+
+class _LambdaFallback:
+    """builds rules that are not recognized with the lambda path on a pyomo
+    model and reads their rows back from pyomo's linear representation"""
+
+    def __init__(self, llm_pyomo_model: LinearOptimizationModel, data: ModelData):
+        self.model = create_concrete_model()
+        self.allowed_vars = create_components(self.model, llm_pyomo_model)
+        self.columns = {}
+        for var_name, var_ref in data.vars.items():
+            model_var_data = dict(getattr(self.model, var_name).items())
+            for key, col in var_ref.columns.items():
+                self.columns[id(model_var_data[key])] = col
+
+    def constraint_rows(self, pyo_constr: PyomoConstraint) -> dict[Any, Row]:
+        add_constraint(self.model, pyo_constr, self.allowed_vars)
+        return {
+            key: _pyomo_row(constraint_data, self.columns)
+            for key, constraint_data in getattr(self.model, pyo_constr.name).items()
+        }
+
+    def objective_expression(self, objective: ObjectiveFunction) -> LinearExpr:
+        add_objective(self.model, objective)
+        return _pyomo_linear(self.model.my_objective.expr, self.columns)
+
+
+def _pyomo_linear(expr, columns: dict[int, int]) -> LinearExpr:
+    """a pyomo expression over the variable data mapped to columns by id"""
+    repn = generate_standard_repn(expr, compute_values=True)
+    if not repn.is_linear():
+        raise NotLinearError(f"{expr} is not linear")
+    coefs = {}
+    for var, coef in zip(repn.linear_vars, repn.linear_coefs):
+        col = columns[id(var)]
+        coefs[col] = coefs.get(col, 0.0) + coef
+    return LinearExpr(coefs, repn.constant)
+
+
+def _pyomo_row(constraint_data, columns: dict[int, int]) -> Row:
+    expr = _pyomo_linear(constraint_data.body, columns)
+    lower, upper = constraint_data.lb, constraint_data.ub
+    return Row(
+        None if lower is None else lower - expr.constant,
+        LinearExpr(expr.coefs),
+        None if upper is None else upper - expr.constant,
+    )
+
+
+def build_matrix_model(llm_pyomo_model: LinearOptimizationModel) -> MatrixModel:
+    """compile a `LinearOptimizationModel` straight into matrix form, rules
+    that are not recognized fall back to the lambda path, raises
+    `NotLinearError` if one of them is not linear"""
+    if not isinstance(llm_pyomo_model, LinearOptimizationModel):
+        raise TypeError
+    if not llm_pyomo_model.variables:
+        raise ValueError
+
+    data = ModelData(llm_pyomo_model)
+    compiler = RuleCompiler(data)
+    fallback = None
+
+    def get_fallback() -> _LambdaFallback:
+        nonlocal fallback
+        if fallback is None:
+            fallback = _LambdaFallback(llm_pyomo_model, data)
+        return fallback
+
+    row_names, row_lower, row_upper = [], [], []
+    a_start, a_index, a_value = [0], [], []
+    for pyo_constr in llm_pyomo_model.constraints:
+        with building("constraint", pyo_constr.name):
+            try:
+                rows = constraint_rows(
+                    pyo_constr, data.index_keys(pyo_constr.idxs), compiler
+                )
+            except (NotLinearError, SyntaxError) as e:
+                logging.debug(
+                    f"falling back to the lambda rule for {pyo_constr.name}: {e}"
+                )
+                rows = get_fallback().constraint_rows(pyo_constr)
+        for key, row in rows.items():
+            if row is None:
+                continue
+            row_names.append((pyo_constr.name, key))
+            row_lower.append(-math.inf if row.lower is None else row.lower)
+            row_upper.append(math.inf if row.upper is None else row.upper)
+            a_index.extend(row.expr.coefs.keys())
+            a_value.extend(row.expr.coefs.values())
+            a_start.append(len(a_index))
+
+    with building("objective", "objective"):
+        try:
+            objective_expr = objective_expression(llm_pyomo_model.objective, compiler)
+        except (NotLinearError, SyntaxError) as e:
+            logging.debug(f"falling back to the lambda rule for the objective: {e}")
+            objective_expr = get_fallback().objective_expression(
+                llm_pyomo_model.objective
+            )
+    objective = np.zeros(len(data.column_names))
+    for col, coef in objective_expr.coefs.items():
+        objective[col] = coef
+
+    return MatrixModel(
+        column_names=data.column_names,
+        col_lower=np.array(data.col_lower, dtype=float),
+        col_upper=np.array(data.col_upper, dtype=float),
+        integrality=np.array(data.integrality, dtype=bool),
+        row_names=row_names,
+        row_lower=np.array(row_lower, dtype=float),
+        row_upper=np.array(row_upper, dtype=float),
+        a_start=np.array(a_start, dtype=np.int64),
+        a_index=np.array(a_index, dtype=np.int64),
+        a_value=np.array(a_value, dtype=float),
+        objective=objective,
+        objective_offset=objective_expr.constant,
+        sense=llm_pyomo_model.objective.optimization_sense.value,
+        var_docs={pyo_var.name: pyo_var.doc for pyo_var in llm_pyomo_model.variables},
+    )
+
+
+def matrix_model_from_pyomo(model: pyo.ConcreteModel) -> MatrixModel:
+    """the matrix form of an already constructed pyomo model, e.g. of
+    `construct_pyomo_model`, raises `NotLinearError` if a constraint or the
+    objective is not linear"""
+    column_names, col_lower, col_upper, integrality = [], [], [], []
+    columns, var_docs = {}, {}
+    for model_var in model.component_objects(pyo.Var, active=True):
+        var_docs[model_var.name] = model_var.doc or ""
+        for key, var_data in model_var.items():
+            columns[id(var_data)] = len(column_names)
+            column_names.append((model_var.name, key))
+            col_lower.append(-math.inf if var_data.lb is None else var_data.lb)
+            col_upper.append(math.inf if var_data.ub is None else var_data.ub)
+            integrality.append(var_data.is_integer())
+
+    row_names, row_lower, row_upper = [], [], []
+    a_start, a_index, a_value = [0], [], []
+    for constraint in model.component_objects(pyo.Constraint, active=True):
+        for key, constraint_data in constraint.items():
+            row = _pyomo_row(constraint_data, columns)
+            row_names.append((constraint.name, key))
+            row_lower.append(-math.inf if row.lower is None else row.lower)
+            row_upper.append(math.inf if row.upper is None else row.upper)
+            a_index.extend(row.expr.coefs.keys())
+            a_value.extend(row.expr.coefs.values())
+            a_start.append(len(a_index))
+
+    (model_objective,) = model.component_objects(pyo.Objective, active=True)
+    objective_expr = _pyomo_linear(model_objective.expr, columns)
+    objective = np.zeros(len(column_names))
+    for col, coef in objective_expr.coefs.items():
+        objective[col] = coef
+
+    return MatrixModel(
+        column_names=column_names,
+        col_lower=np.array(col_lower, dtype=float),
+        col_upper=np.array(col_upper, dtype=float),
+        integrality=np.array(integrality, dtype=bool),
+        row_names=row_names,
+        row_lower=np.array(row_lower, dtype=float),
+        row_upper=np.array(row_upper, dtype=float),
+        a_start=np.array(a_start, dtype=np.int64),
+        a_index=np.array(a_index, dtype=np.int64),
+        a_value=np.array(a_value, dtype=float),
+        objective=objective,
+        objective_offset=objective_expr.constant,
+        sense="maximize" if model_objective.sense == pyo.maximize else "minimize",
+        var_docs=var_docs,
+    )
+
+
+def to_highs(matrix_model: MatrixModel) -> highspy.Highs:
+    """pass a `MatrixModel` to a new `highspy.Highs` instance"""
+    lp = highspy.HighsLp()
+    lp.num_col_ = matrix_model.num_cols
+    lp.num_row_ = matrix_model.num_rows
+    lp.col_cost_ = matrix_model.objective
+    lp.col_lower_ = matrix_model.col_lower
+    lp.col_upper_ = matrix_model.col_upper
+    lp.row_lower_ = matrix_model.row_lower
+    lp.row_upper_ = matrix_model.row_upper
+    lp.offset_ = matrix_model.objective_offset
+    lp.sense_ = (
+        highspy.ObjSense.kMaximize
+        if matrix_model.sense == "maximize"
+        else highspy.ObjSense.kMinimize
+    )
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+    lp.a_matrix_.num_col_ = matrix_model.num_cols
+    lp.a_matrix_.num_row_ = matrix_model.num_rows
+    lp.a_matrix_.start_ = matrix_model.a_start
+    lp.a_matrix_.index_ = matrix_model.a_index
+    lp.a_matrix_.value_ = matrix_model.a_value
+    if matrix_model.integrality.any():
+        lp.integrality_ = [
+            highspy.HighsVarType.kInteger
+            if integer
+            else highspy.HighsVarType.kContinuous
+            for integer in matrix_model.integrality
+        ]
+
+    highs = highspy.Highs()
+    highs.setOptionValue("output_flag", False)
+    status = highs.passModel(lp)
+    if status == highspy.HighsStatus.kError:
+        raise ValueError("HiGHS rejected the matrix model")
+    return highs
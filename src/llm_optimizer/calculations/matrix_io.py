@@ -0,0 +1,107 @@
+"""save a built `MatrixModel` and load it again without evaluating any rule
+
+    save_matrix_model(matrix_model, "model.npz")  # a single file
+    save_matrix_model(matrix_model, "model")  # a directory of .npy files
+    results, solution = solve_matrix_model(load_matrix_model("model"))
+
+the arrays of a `.npz` file are read into memory when it is loaded, the
+arrays of a directory are memory mapped read only, so processes loading the
+same model share its pages and nothing is copied until the solver reads it"""
+
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from llm_optimizer.calculations.matrix_builder import MatrixModel
+
+
+FORMAT_VERSION = 1
+METADATA_FILE = "metadata.json"
+_ARRAYS = (
+    "col_lower",
+    "col_upper",
+    "integrality",
+    "row_lower",
+    "row_upper",
+    "a_start",
+    "a_index",
+    "a_value",
+    "objective",
+)
+
+
+def _encode_key(key: Any) -> Any:
+    # json has no tuples
+    return list(key) if isinstance(key, tuple) else key
+
+
+def _decode_key(key: Any) -> Any:
+    return tuple(key) if isinstance(key, list) else key
+
+
+def _metadata(matrix_model: MatrixModel) -> dict[str, Any]:
+    return {
+        "format_version": FORMAT_VERSION,
+        "column_names": [
+            [name, _encode_key(key)] for name, key in matrix_model.column_names
+        ],
+        "row_names": [[name, _encode_key(key)] for name, key in matrix_model.row_names],
+        "objective_offset": float(matrix_model.objective_offset),
+        "sense": matrix_model.sense,
+        "var_docs": matrix_model.var_docs,
+    }
+
+
+def save_matrix_model(
+    matrix_model: MatrixModel, path: Path | str, compressed: bool = False
+) -> Path:
+    """write the arrays and the names of a `MatrixModel` to a `.npz` file or,
+    for any other path, to a directory that can be memory mapped"""
+    path = Path(path)
+    metadata = json.dumps(_metadata(matrix_model))
+    arrays = {
+        name: np.ascontiguousarray(getattr(matrix_model, name)) for name in _ARRAYS
+    }
+    if path.suffix == ".npz":
+        path.parent.mkdir(parents=True, exist_ok=True)
+        savez = np.savez_compressed if compressed else np.savez
+        savez(path, metadata=np.frombuffer(metadata.encode(), dtype=np.uint8), **arrays)
+    else:
+        path.mkdir(parents=True, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(path / f"{name}.npy", array)
+        (path / METADATA_FILE).write_text(metadata)
+    return path
+
+
+def load_matrix_model(path: Path | str, mmap: bool = True) -> MatrixModel:
+    """a `MatrixModel` saved by `save_matrix_model`, the arrays of a directory
+    are memory mapped unless `mmap` is `False`"""
+    path = Path(path)
+    if path.is_dir():
+        metadata = json.loads((path / METADATA_FILE).read_text())
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r" if mmap else None)
+            for name in _ARRAYS
+        }
+    else:
+        with np.load(path) as archive:
+            metadata = json.loads(archive["metadata"].tobytes())
+            arrays = {name: archive[name] for name in _ARRAYS}
+    if metadata.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"unsupported matrix model format {metadata.get('format_version')}"
+        )
+
+    return MatrixModel(
+        column_names=[
+            (name, _decode_key(key)) for name, key in metadata["column_names"]
+        ],
+        row_names=[(name, _decode_key(key)) for name, key in metadata["row_names"]],
+        objective_offset=metadata["objective_offset"],
+        sense=metadata["sense"],
+        var_docs=metadata["var_docs"],
+        **arrays,
+    )
@@ -0,0 +1,302 @@
+"""a static analysis of a generated model before it is built: whether its
+rules are linear, whether it has integer variables, and how many rows,
+columns and nonzeros it will have, estimated from the sizes of its sets
+
+    analysis = analyze_model(llm_pyomo_model)
+    analysis.problem_class, analysis.rows, analysis.nonzeros
+
+the rule strings are walked like in `check_if_expression_is_safe`, nothing is
+expanded; the estimates are upper bounds, skipped rows and repeated terms of a
+variable are counted"""
+
+import ast
+import math
+from dataclasses import dataclass, field
+
+from llm_optimizer.calculations.data_files import read_set_members
+from llm_optimizer.models.llm import LinearOptimizationModel, RuleError
+
+
+INTEGER_DOMAINS = ("NonNegativeIntegers", "NonPositiveIntegers", "Integers")
+
+# a degree above every polynomial one, e.g. of a division by a variable
+NONLINEAR = math.inf
+
+
+@dataclass
+class SizeLimits:
+    rows: int
+    columns: int
+    nonzeros: int
+
+
+DEFAULT_SIZE_LIMITS = SizeLimits(
+    rows=10_000_000, columns=10_000_000, nonzeros=100_000_000
+)
+# above this many nonzeros the pyomo backend spends most of its time building
+ROUTE_TO_HIGHS_NONZEROS = 200_000
+
+
+class ModelTooLargeError(ValueError):
+    pass
+
+
+class NonlinearRuleError(RuleError):
+    pass
+
+
+@dataclass
+class ModelAnalysis:
+    # "LP", "MILP" or "nonlinear"
+    problem_class: str
+    # `None` if a set of a data file that is not attached is involved
+    rows: int | None
+    columns: int | None
+    nonzeros: int | None
+    integer_columns: int | None
+    # (kind, name) of the components with a nonlinear rule
+    nonlinear: list[tuple[str, str]] = field(default_factory=list)
+
+    def summary(self) -> str:
+        def count(value: int | None) -> str:
+            return "?" if value is None else f"{value:,}"
+
+        return (
+            f"{self.problem_class}, {count(self.rows)} rows, "
+            f"{count(self.columns)} columns, {count(self.nonzeros)} nonzeros"
+        )
+
+    def check_size(self, limits: SizeLimits = DEFAULT_SIZE_LIMITS) -> None:
+        """raises `ModelTooLargeError` if an estimate exceeds its limit"""
+        for name in ("rows", "columns", "nonzeros"):
+            value, limit = getattr(self, name), getattr(limits, name)
+            if value is not None and value > limit:
+                raise ModelTooLargeError(
+                    f"the model has about {value:,} {name}, the limit is {limit:,}"
+                )
+
+
+def _as_count(value: float) -> int | None:
+    return None if math.isnan(value) else int(value)
+
+
+def _max(*values: float) -> float:
+    """`max` that keeps an unknown (nan) value"""
+    if any(math.isnan(value) for value in values):
+        return math.nan
+    return max(values, default=0)
+
+
+class _RuleAnalyzer:
+    """the polynomial degree in the variables and the number of variable terms
+    of a rule, a rule that does not parse counts as linear, its build fails"""
+
+    def __init__(
+        self, model_arg: str, variables: set[str], set_sizes: dict[str, float]
+    ):
+        self.model_arg = model_arg
+        self.variables = variables
+        self.set_sizes = set_sizes
+
+    def _is_variable(self, node: ast.AST) -> bool:
+        return (
+            isinstance(node, ast.Attribute)
+            and isinstance(node.value, ast.Name)
+            and node.value.id == self.model_arg
+            and node.attr in self.variables
+        )
+
+    def degree(self, node: ast.AST) -> float:
+        if isinstance(node, ast.Attribute):
+            return 1 if self._is_variable(node) else 0
+        if isinstance(node, ast.Subscript):
+            # an index holds no variables
+            return 1 if self._is_variable(node.value) else 0
+        if isinstance(node, ast.UnaryOp):
+            return self.degree(node.operand)
+        if isinstance(node, ast.BinOp):
+            return self._binop_degree(node)
+        if isinstance(node, ast.Compare):
+            return max(self.degree(part) for part in [node.left, *node.comparators])
+        if isinstance(node, ast.IfExp):
+            if self.degree(node.test):
+                return NONLINEAR
+            return max(self.degree(node.body), self.degree(node.orelse))
+        if isinstance(node, ast.Call):
+            degrees = [self.degree(arg) for arg in node.args]
+            if isinstance(node.func, ast.Name) and node.func.id == "sum":
+                return max(degrees, default=0)
+            return NONLINEAR if any(degrees) else 0
+        if isinstance(node, ast.GeneratorExp):
+            loops = [gen.iter for gen in node.generators] + [
+                condition for gen in node.generators for condition in gen.ifs
+            ]
+            if any(self.degree(loop) for loop in loops):
+                return NONLINEAR
+            return self.degree(node.elt)
+        if isinstance(node, (ast.Tuple, ast.List)):
+            return max((self.degree(element) for element in node.elts), default=0)
+        return 0
+
+    def _binop_degree(self, node: ast.BinOp) -> float:
+        left, right = self.degree(node.left), self.degree(node.right)
+        if isinstance(node.op, (ast.Add, ast.Sub)):
+            return max(left, right)
+        if isinstance(node.op, ast.Mult):
+            return left + right
+        if isinstance(node.op, ast.Div):
+            return left if not right else NONLINEAR
+        if isinstance(node.op, ast.Pow) and not right:
+            if not left:
+                return 0
+            exponent = node.right
+            if (
+                isinstance(exponent, ast.Constant)
+                and isinstance(exponent.value, int)
+                and exponent.value >= 0
+            ):
+                return left * exponent.value if exponent.value else 0
+        return 0 if not (left or right) else NONLINEAR
+
+    def terms(self, node: ast.AST) -> float:
+        """the number of variable terms, nan if a set size is unknown"""
+        if isinstance(node, ast.Attribute):
+            return 1 if self._is_variable(node) else 0
+        if isinstance(node, ast.Subscript):
+            return 1 if self._is_variable(node.value) else 0
+        if isinstance(node, ast.UnaryOp):
+            return self.terms(node.operand)
+        if isinstance(node, ast.BinOp):
+            return self.terms(node.left) + self.terms(node.right)
+        if isinstance(node, ast.Compare):
+            return sum(self.terms(part) for part in [node.left, *node.comparators])
+        if isinstance(node, ast.IfExp):
+            return _max(self.terms(node.body), self.terms(node.orelse))
+        if isinstance(node, ast.Call):
+            return sum(self.terms(arg) for arg in node.args)
+        if isinstance(node, ast.GeneratorExp):
+            terms = self.terms(node.elt)
+            if not terms:
+                return 0
+            for gen in node.generators:
+                terms *= self.iterations(gen.iter)
+            return terms
+        if isinstance(node, (ast.Tuple, ast.List)):
+            return sum(self.terms(element) for element in node.elts)
+        return 0
+
+    def iterations(self, node: ast.AST) -> float:
+        """the number of members a generator iterates over"""
+        if (
+            isinstance(node, ast.Attribute)
+            and isinstance(node.value, ast.Name)
+            and node.value.id == self.model_arg
+            and node.attr in self.set_sizes
+        ):
+            return self.set_sizes[node.attr]
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult):
+            return self.iterations(node.left) * self.iterations(node.right)
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id == "range"
+            and all(isinstance(arg, ast.Constant) for arg in node.args)
+        ):
+            return len(range(*(arg.value for arg in node.args)))
+        if isinstance(node, (ast.Tuple, ast.List)):
+            return len(node.elts)
+        # e.g. a slice of a set, at most as many as the largest set
+        return _max(*self.set_sizes.values())
+
+
+def _parse_rule(rule: str) -> tuple[str, ast.AST] | None:
+    """the model argument and the body of a rule or expression string"""
+    try:
+        tree = ast.parse(rule.strip(), mode="eval").body
+    except SyntaxError:
+        return None
+    if isinstance(tree, ast.Lambda):
+        if not tree.args.args:
+            return None
+        return tree.args.args[0].arg, tree.body
+    return "model", tree
+
+
+def _set_size(pyo_set) -> float:
+    if pyo_set.source is None:
+        return len(pyo_set.initialize)
+    if pyo_set.source.path is None:
+        return math.nan
+    return len(read_set_members(pyo_set.source))
+
+
+def _product(set_sizes: dict[str, float], names: list[str] | None) -> float:
+    size = 1
+    for name in names or []:
+        if name:
+            size *= set_sizes.get(name.split(".")[-1], math.nan)
+    return size
+
+
+def analyze_model(llm_pyomo_model: LinearOptimizationModel) -> ModelAnalysis:
+    """classify the model as LP, MILP or nonlinear and estimate its size,
+    without building it"""
+    set_sizes = {pyo_set.name: _set_size(pyo_set) for pyo_set in llm_pyomo_model.sets}
+    variables = {pyo_var.name for pyo_var in llm_pyomo_model.variables}
+
+    columns = integer_columns = 0
+    for pyo_var in llm_pyomo_model.variables:
+        size = _product(set_sizes, pyo_var.indexes)
+        columns += size
+        if pyo_var.domain in INTEGER_DOMAINS:
+            integer_columns += size
+
+    rows = nonzeros = 0
+    nonlinear = []
+    for pyo_constr in llm_pyomo_model.constraints:
+        parsed = _parse_rule(
+            f"lambda {', '.join(pyo_constr.rule.lambda_arguments) or 'model'}: "
+            f"{pyo_constr.rule.lambda_body}"
+        )
+        constraint_rows = _product(set_sizes, pyo_constr.idxs)
+        rows += constraint_rows
+        if parsed is None:
+            nonzeros = math.nan
+            continue
+        analyzer = _RuleAnalyzer(parsed[0], variables, set_sizes)
+        if analyzer.degree(parsed[1]) > 1:
+            nonlinear.append(("constraint", pyo_constr.name))
+        nonzeros += constraint_rows * analyzer.terms(parsed[1])
+
+    objective = llm_pyomo_model.objective
+    parsed = _parse_rule(objective.expr or objective.rule or "0")
+    if parsed is not None:
+        if _RuleAnalyzer(parsed[0], variables, set_sizes).degree(parsed[1]) > 1:
+            nonlinear.append(("objective", "objective"))
+
+    if nonlinear:
+        problem_class = "nonlinear"
+    elif integer_columns:
+        problem_class = "MILP"
+    else:
+        problem_class = "LP"
+    return ModelAnalysis(
+        problem_class,
+        _as_count(rows),
+        _as_count(columns),
+        _as_count(nonzeros),
+        _as_count(integer_columns),
+        nonlinear,
+    )
+
+
+def route_backend(analysis: ModelAnalysis, backend: str) -> str:
+    """the backend to build a model with: the highs backend for a large model
+    requested with the pyomo backend"""
+    if (
+        backend == "pyomo"
+        and analysis.nonzeros is not None
+        and analysis.nonzeros > ROUTE_TO_HIGHS_NONZEROS
+    ):
+        return "highs"
+    return backend
@@ -0,0 +1,305 @@
+import copy
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+import pyomo.environ as pyo
+
+from llm_optimizer.calculations.lin_optimization_logic import (
+    add_constraint,
+    add_objective,
+    construct_pyomo_model,
+    create_model_component,
+    get_domain,
+    record_solver_statistics,
+    register_allowed_names,
+)
+from llm_optimizer.calculations.solver_options import (
+    SolverOptions,
+    reset_highs_threads,
+)
+from llm_optimizer.models.compact import DenseParamData
+from llm_optimizer.models.llm import LinearOptimizationModel
+from llm_optimizer.utils import instrumentation
+
+
+_COMPONENT_REFERENCE = re.compile(r"\bmodel\.(\w+)")
+
+
+def referenced_components(expr_str: str | None) -> set[str]:
+    """names of the model components an expression or rule refers to"""
+    return set(_COMPONENT_REFERENCE.findall(expr_str or ""))
+
+
+@dataclass
+class ModelChanges:
+    rebuilt: bool = False
+    components: list[str] = field(default_factory=list)
+
+
+def _frozen(component: Any) -> Any:
+    """a copy of a component that later edits of the model do not change, a
+    range or array of members and values is shared instead of copied"""
+    initialize = getattr(component, "initialize", None)
+    if isinstance(initialize, (range, DenseParamData)):
+        return copy.deepcopy(component, {id(initialize): initialize})
+    return copy.deepcopy(component)
+
+
+def _snapshot(llm_pyomo_model: LinearOptimizationModel) -> dict[str, Any]:
+    """copies of all components, to diff the next model against"""
+    return {
+        "sets": [_frozen(pyo_set) for pyo_set in llm_pyomo_model.sets],
+        "variables": {
+            pyo_var.name: _frozen(pyo_var) for pyo_var in llm_pyomo_model.variables
+        },
+        "parameters": {
+            pyo_param.name: _frozen(pyo_param)
+            for pyo_param in llm_pyomo_model.parameters
+        },
+        "constraints": {
+            pyo_constr.name: _frozen(pyo_constr)
+            for pyo_constr in llm_pyomo_model.constraints
+        },
+        "objective": _frozen(llm_pyomo_model.objective),
+    }
+
+
+def _same_keys(previous: Any, current: Any) -> bool:
+    """whether two parameter values have the same keys, of arrays compared by
+    their members instead of key by key"""
+    if isinstance(previous, DenseParamData) and isinstance(current, DenseParamData):
+        return [list(members) for members in previous.index_members] == [
+            list(members) for members in current.index_members
+        ]
+    return previous.keys() == current.keys()
+
+
+def _needs_rebuild(previous: dict[str, Any], current: dict[str, Any]) -> bool:
+    """sets, the variable indexes and the parameter structure are what all
+    other components are built on, a change to them rebuilds the model"""
+    if previous["sets"] != current["sets"]:
+        return True
+    if {name: var.indexes for name, var in previous["variables"].items()} != {
+        name: var.indexes for name, var in current["variables"].items()
+    }:
+        return True
+    return {
+        name: (param.indexes, param.within)
+        for name, param in previous["parameters"].items()
+    } != {
+        name: (param.indexes, param.within)
+        for name, param in current["parameters"].items()
+    }
+
+
+class ModelStore:
+    """keeps the pyomo model of the last `LinearOptimizationModel` and a
+    persistent appsi highs solver, an edited model only updates the changed
+    components and the solver updates its instance and starts from the
+    previous basis
+
+    parameters are built mutable, so new parameter values are written in
+    place, unless a rule needs their values while it is evaluated"""
+
+    def __init__(self):
+        self.model: pyo.ConcreteModel | None = None
+        self._snapshot: dict[str, Any] = {}
+        self._mutable_params = True
+        self._allowed_vars: frozenset = frozenset()
+        self._solver = None
+        self._solver_options: dict[str, Any] = {}
+
+    def reset(self) -> None:
+        self.model = None
+        self._snapshot = {}
+        self._allowed_vars = frozenset()
+
+    def update(
+        self,
+        llm_pyomo_model: LinearOptimizationModel,
+        prebuilt: pyo.ConcreteModel | None = None,
+    ) -> ModelChanges:
+        """`prebuilt` is a model already built from `llm_pyomo_model`, e.g.
+        while it was streamed, used if the model is rebuilt"""
+        if not isinstance(llm_pyomo_model, LinearOptimizationModel):
+            raise TypeError
+        if not llm_pyomo_model.variables:
+            raise ValueError
+
+        snapshot = _snapshot(llm_pyomo_model)
+        try:
+            with instrumentation.span("update_model_store"):
+                if self.model is None or _needs_rebuild(self._snapshot, snapshot):
+                    changes = self._rebuild(llm_pyomo_model, prebuilt)
+                else:
+                    changes = self._update_components(llm_pyomo_model, snapshot)
+                instrumentation.set_attributes(
+                    rebuilt=changes.rebuilt, components=len(changes.components)
+                )
+        except BaseException:
+            # a partially updated model is not kept, the next update rebuilds
+            self.reset()
+            raise
+
+        self._snapshot = snapshot
+        logging.debug(f"model store update: {changes}")
+        return changes
+
+    def _rebuild(
+        self,
+        llm_pyomo_model: LinearOptimizationModel,
+        prebuilt: pyo.ConcreteModel | None = None,
+    ) -> ModelChanges:
+        if prebuilt is not None:
+            self.model = prebuilt
+            self._mutable_params = all(
+                param.mutable for param in prebuilt.component_objects(pyo.Param)
+            )
+        else:
+            self._construct(llm_pyomo_model)
+        self._register_allowed_names(llm_pyomo_model)
+        return ModelChanges(
+            rebuilt=True,
+            components=[
+                component.name
+                for component in self.model.component_objects(descend_into=False)
+            ],
+        )
+
+    def _construct(self, llm_pyomo_model: LinearOptimizationModel) -> None:
+        try:
+            self.model = construct_pyomo_model(llm_pyomo_model, mutable_params=True)
+            self._mutable_params = True
+        except Exception as e:
+            # e.g. a rule that branches on a parameter value
+            logging.debug(f"building with immutable parameters: {e}")
+            self.model = construct_pyomo_model(llm_pyomo_model)
+            self._mutable_params = False
+
+    def _register_allowed_names(self, llm_pyomo_model: LinearOptimizationModel):
+        allowed_names = set()
+        for components in (
+            llm_pyomo_model.sets,
+            llm_pyomo_model.variables,
+            llm_pyomo_model.parameters,
+        ):
+            for component in components:
+                register_allowed_names(allowed_names, self.model, component.name)
+        self._allowed_vars = frozenset(allowed_names)
+
+    def _update_components(
+        self, llm_pyomo_model: LinearOptimizationModel, snapshot: dict[str, Any]
+    ) -> ModelChanges:
+        model = self.model
+        previous = self._snapshot
+        changes = ModelChanges()
+
+        changed_params = {
+            name
+            for name, param in snapshot["parameters"].items()
+            if param != previous["parameters"][name]
+        }
+        # values of mutable parameters are updated in place, the others are
+        # part of the built expressions and rebuild every component using them
+        updated_params = {
+            name
+            for name in changed_params
+            if self._mutable_params
+            # the values of a data file are read again with the component
+            and snapshot["parameters"][name].source is None
+            and previous["parameters"][name].source is None
+            and _same_keys(
+                previous["parameters"][name].initialize,
+                snapshot["parameters"][name].initialize,
+            )
+        }
+        recreated_params = changed_params - updated_params
+
+        constraints = {
+            pyo_constr.name: pyo_constr for pyo_constr in llm_pyomo_model.constraints
+        }
+        removed_constraints = sorted(
+            previous["constraints"].keys() - snapshot["constraints"].keys()
+        )
+        changed_constraints = [
+            name
+            for name, pyo_constr in constraints.items()
+            if snapshot["constraints"][name] != previous["constraints"].get(name)
+            or referenced_components(pyo_constr.rule.lambda_body) & recreated_params
+        ]
+        objective = llm_pyomo_model.objective
+        objective_changed = snapshot["objective"] != previous["objective"] or bool(
+            referenced_components(objective.expr or objective.rule) & recreated_params
+        )
+
+        for name in (*removed_constraints, *changed_constraints):
+            if model.component(name) is not None:
+                model.del_component(name)
+        if objective_changed:
+            model.del_component("my_objective")
+
+        for pyo_param in llm_pyomo_model.parameters:
+            if pyo_param.name in updated_params:
+                model_param = getattr(model, pyo_param.name)
+                model_param.store_values(pyo_param.initialize)
+                model_param.doc = pyo_param.doc
+            elif pyo_param.name in recreated_params:
+                model.del_component(pyo_param.name)
+                create_model_component(model, pyo_param, self._mutable_params)
+        if recreated_params:
+            self._register_allowed_names(llm_pyomo_model)
+
+        for pyo_var in llm_pyomo_model.variables:
+            if (
+                snapshot["variables"][pyo_var.name]
+                == previous["variables"][pyo_var.name]
+            ):
+                continue
+            model_var = getattr(model, pyo_var.name)
+            model_var.doc = pyo_var.doc
+            domain = get_domain(pyo_var.domain) or pyo.Reals
+            for var_data in model_var.values():
+                var_data.domain = domain
+            changes.components.append(pyo_var.name)
+
+        for name in changed_constraints:
+            add_constraint(model, constraints[name], self._allowed_vars)
+        if objective_changed:
+            add_objective(model, objective)
+
+        changes.components.extend(
+            [
+                *sorted(changed_params),
+                *removed_constraints,
+                *changed_constraints,
+                *(["my_objective"] if objective_changed else []),
+            ]
+        )
+        return changes
+
+    def solve(self, options: SolverOptions | None = None) -> tuple:
+        """solve with the persistent solver, returns the same as `solve`"""
+        if self.model is None:
+            raise ValueError("no model to solve")
+        options = options or SolverOptions()
+        if options.solver != "highs":
+            raise ValueError(
+                f"the persistent solver cannot solve with {options.solver}"
+            )
+        if options.highs_options() != self._solver_options:
+            # highspy keeps options that were set, only a new solver drops them
+            self._solver, self._solver_options = None, options.highs_options()
+        if self._solver is None:
+            self._solver = pyo.SolverFactory("appsi_highs")
+        reset_highs_threads(options)
+        logging.debug("starting to solve with the persistent solver ...")
+        with instrumentation.span("solve", backend="pyomo", persistent=True):
+            results = self._solver.solve(
+                self.model,
+                options=options.highs_options(),
+                timelimit=options.time_limit,
+            )
+            record_solver_statistics(self._solver)
+        return results, self.model
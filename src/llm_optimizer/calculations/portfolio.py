@@ -0,0 +1,162 @@
+"""race several solver configurations on one model, each in its own
+process, the first proven optimal result wins and the other processes are
+terminated
+
+    result = race(llm_pyomo_model.model_dump_json(), time_limit=60)
+    result["options"]  # the configuration that won
+
+a hard mip is often solved much faster by one configuration than by the
+others, which one is hard to tell in advance"""
+
+import dataclasses
+import logging
+import multiprocessing
+from multiprocessing.connection import Connection, wait
+from typing import Any, Sequence
+
+import pyomo.environ as pyo
+
+from llm_optimizer.calculations.lin_optimization_logic import build_and_solve
+from llm_optimizer.calculations.solver_options import SOLVERS, SolverOptions
+from llm_optimizer.models.base import SOLVER_BACKENDS
+
+
+# HiGHS with each of its methods, and a mip that stops at a 1% gap, which
+# does not prove optimality, see `_proves_optimality`
+DEFAULT_PORTFOLIO = (
+    SolverOptions(method="simplex"),
+    SolverOptions(method="ipm"),
+    SolverOptions(presolve=False),
+    SolverOptions(mip_gap=0.01),
+)
+
+
+def available_solvers() -> list[str]:
+    """the `SOLVERS` installed here, highs is always there"""
+    return [
+        solver
+        for solver in SOLVERS
+        if solver == "highs"
+        or pyo.SolverFactory(solver).available(exception_flag=False)
+    ]
+
+
+def default_portfolio(backend: str = "pyomo") -> list[SolverOptions]:
+    """`DEFAULT_PORTFOLIO` and, for the pyomo backend, the other installed
+    solvers"""
+    portfolio = list(DEFAULT_PORTFOLIO)
+    if backend == "pyomo":
+        portfolio += [
+            SolverOptions(solver=solver)
+            for solver in available_solvers()
+            if solver != "highs"
+        ]
+    return portfolio
+
+
+def _proves_optimality(result: dict[str, Any], options: SolverOptions) -> bool:
+    """an optimal result of a mip solved with a relaxed gap is only optimal
+    within that gap"""
+    if not result.get("optimal"):
+        return False
+    return result.get("problem_class") != "MILP" or not options.mip_gap
+
+
+def _on_base(options: SolverOptions, base_options: SolverOptions) -> SolverOptions:
+    """`options` with the fields it leaves unset taken from `base_options`"""
+    return dataclasses.replace(
+        base_options,
+        **{
+            field.name: getattr(options, field.name)
+            for field in dataclasses.fields(options)
+            if getattr(options, field.name) is not None
+        },
+    )
+
+
+def _solve_configuration(
+    sender: Connection, llm_pyomo_model_json: str, backend: str, options: SolverOptions
+) -> None:
+    try:
+        result = build_and_solve(llm_pyomo_model_json, backend=backend, options=options)
+    except Exception as e:
+        result = {"status": "solve_error", "error": f"{type(e).__name__}: {e}"}
+    sender.send(result)
+    sender.close()
+
+
+def race(
+    llm_pyomo_model_json: str,
+    portfolio: Sequence[SolverOptions] | None = None,
+    backend: str = "pyomo",
+    time_limit: float | None = None,
+    base_options: SolverOptions | None = None,
+) -> dict[str, Any]:
+    """solve with every configuration of `portfolio` at once, returns the
+    result of `build_and_solve` of the first one that proves optimality, with
+    the winning configuration as `options`
+
+    without an optimal result the first solved one is returned, a mip solved
+    with a relaxed `mip_gap` is not optimal then; a build error
+    is the same for all configurations and is returned at once
+
+    `base_options` set what a configuration leaves unset, e.g. the threads
+    chosen in the app; `time_limit` replaces the time limits of the
+    configurations"""
+    if backend not in SOLVER_BACKENDS:
+        raise ValueError(f"unknown solver backend `{backend}`")
+    portfolio = list(portfolio or default_portfolio(backend))
+    if base_options is not None:
+        portfolio = [_on_base(options, base_options) for options in portfolio]
+    if time_limit is not None:
+        portfolio = [
+            dataclasses.replace(options, time_limit=time_limit) for options in portfolio
+        ]
+
+    # spawned like the workers of `SolverQueue`, forking threads is unsafe
+    context = multiprocessing.get_context("spawn")
+    running: dict[Connection, tuple[SolverOptions, multiprocessing.Process]] = {}
+    processes = []
+    for options in portfolio:
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_solve_configuration,
+            args=(sender, llm_pyomo_model_json, backend, options),
+            daemon=True,
+        )
+        process.start()
+        sender.close()
+        running[receiver] = (options, process)
+        processes.append(process)
+
+    results = []
+    try:
+        while running:
+            for receiver in wait(list(running)):
+                options, process = running.pop(receiver)
+                try:
+                    result = receiver.recv()
+                except EOFError:
+                    process.join()
+                    result = {
+                        "status": "solve_error",
+                        "error": f"solver process exited with {process.exitcode}",
+                    }
+                result["options"] = dataclasses.asdict(options)
+                logging.debug(f"race: {options} finished with {result['status']}")
+                if result["status"] == "build_error" or _proves_optimality(
+                    result, options
+                ):
+                    return result
+                # e.g. within the gap, not proven optimal
+                result["optimal"] = False
+                results.append(result)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+    return next(
+        (result for result in results if result["status"] == "solved"), results[0]
+    )
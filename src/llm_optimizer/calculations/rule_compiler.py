@@ -0,0 +1,720 @@
+"""compiles the rule strings of a `LinearOptimizationModel` into closures
+that evaluate straight to linear coefficient maps, `{column: coefficient}`
+and a constant, instead of pyomo expressions
+
+    compiler = RuleCompiler(data)
+    row = compile_constraint(pyo_constr, compiler)
+    row((i,))  # the row of index `i`, `None` if it is skipped
+
+`data` resolves the model components a rule references, its columns are the
+matrix columns of `build_matrix_model` or number the variable data of a pyomo
+model in `construct_pyomo_model`; only the nodes and names the compiler
+recognizes are evaluated, nothing goes through `eval`, anything else raises
+`NotLinearError`"""
+
+import ast
+import operator
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Protocol
+
+from llm_optimizer.models.llm import (
+    ObjectiveFunction,
+    PyomoConstraint,
+    RuleError,
+)
+
+
+class ComponentData(Protocol):
+    """the model components rules are compiled against"""
+
+    def component(self, name: str) -> "SetRef | ParamRef | VarRef":
+        """raises `NotLinearError` for a name that is no component"""
+
+
+class NotLinearError(Exception):
+    """a rule does not match one of the recognized linear patterns"""
+
+
+class LinearExpr:
+    """affine expression `sum(coef * column) + constant` over columns"""
+
+    __slots__ = ("coefs", "constant")
+
+    def __init__(self, coefs: dict[int, float] | None = None, constant: float = 0.0):
+        self.coefs = coefs if coefs is not None else {}
+        self.constant = constant
+
+    def __repr__(self) -> str:
+        return f"LinearExpr({self.coefs}, {self.constant})"
+
+
+@dataclass
+class SetRef:
+    # a range for contiguous members
+    members: list | range
+
+    def position(self, member) -> int:
+        # pyomo sets are ordered and 1-based
+        return self.members.index(member) + 1
+
+
+@dataclass
+class ParamRef:
+    name: str
+    data: dict
+
+
+@dataclass
+class VarRef:
+    name: str
+    columns: dict
+
+
+@dataclass
+class Row:
+    lower: float | None
+    expr: LinearExpr
+    upper: float | None
+
+
+_SKIP = object()
+# errors of evaluating a rule on data it does not fit, e.g. a missing key
+_EVALUATION_ERRORS = (KeyError, IndexError, TypeError, ValueError, ZeroDivisionError)
+
+_NUMBER_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.Gt: operator.gt,
+    ast.Lt: operator.lt,
+    ast.GtE: operator.ge,
+    ast.LtE: operator.le,
+}
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _as_linear(value) -> LinearExpr:
+    if isinstance(value, LinearExpr):
+        return value
+    if _is_number(value):
+        return LinearExpr(constant=value)
+    raise NotLinearError(f"{value!r} is not a linear expression")
+
+
+def _combine(left, right, factor: float) -> LinearExpr:
+    """left + factor * right"""
+    left, right = _as_linear(left), _as_linear(right)
+    coefs = dict(left.coefs)
+    for col, coef in right.coefs.items():
+        coefs[col] = coefs.get(col, 0.0) + factor * coef
+    return LinearExpr(coefs, left.constant + factor * right.constant)
+
+
+def _scale(expr: LinearExpr, factor: float) -> LinearExpr:
+    return LinearExpr(
+        {col: coef * factor for col, coef in expr.coefs.items()},
+        expr.constant * factor,
+    )
+
+
+class RuleCompiler:
+    """compiles the rule ASTs accepted by `check_if_expression_is_safe` into
+    closures that are evaluated once per index; model components are resolved
+    at compile time and variables become columns instead of pyomo
+    expressions. Anything that is not recognized raises `NotLinearError`."""
+
+    def __init__(self, data: ComponentData):
+        self.data = data
+
+    def compile(self, node: ast.AST, model_arg: str, args: Iterable[str]):
+        return self._compile(node, model_arg, frozenset(args))
+
+    def _compile(self, node: ast.AST, model_arg: str, scope: frozenset):
+        method = getattr(self, f"_compile_{type(node).__name__}", None)
+        if method is None:
+            raise NotLinearError(f"unsupported expression {ast.dump(node)}")
+        return method(node, model_arg, scope)
+
+    def _resolve(self, node: ast.AST, model_arg: str):
+        """the model component an `model.<name>` attribute refers to, if any"""
+        if (
+            isinstance(node, ast.Attribute)
+            and isinstance(node.value, ast.Name)
+            and node.value.id == model_arg
+        ):
+            return self.data.component(node.attr)
+        return None
+
+    def _compile_Constant(self, node, model_arg, scope):
+        if not _is_number(node.value):
+            raise NotLinearError(f"unsupported constant {node.value!r}")
+        value = node.value
+        return lambda env: value
+
+    def _compile_Name(self, node, model_arg, scope):
+        if node.id not in scope:
+            raise NotLinearError(f"unknown name `{node.id}`")
+        name = node.id
+        return lambda env: env[name]
+
+    def _compile_Attribute(self, node, model_arg, scope):
+        if isinstance(node.value, ast.Name) and node.value.id == "Constraint":
+            if node.attr == "Skip":
+                return lambda env: _SKIP
+            raise NotLinearError(f"unsupported attribute Constraint.{node.attr}")
+        component = self._resolve(node, model_arg)
+        if component is None:
+            raise NotLinearError(f"unsupported attribute `{node.attr}`")
+        if isinstance(component, VarRef) and None in component.columns:
+            column = component.columns[None]
+            return lambda env: LinearExpr({column: 1.0})
+        return lambda env: component
+
+    def _compile_key(self, node, model_arg, scope):
+        if (
+            isinstance(node, ast.Tuple)
+            and len(node.elts) == 2
+            and all(
+                isinstance(element, ast.Name) and element.id in scope
+                for element in node.elts
+            )
+        ):
+            # `[i, j]`, the most common key, in a single call
+            first_name, second_name = (element.id for element in node.elts)
+            return lambda env: (env[first_name], env[second_name])
+        if isinstance(node, ast.Tuple) and len(node.elts) == 2:
+            first, second = (
+                self._compile(element, model_arg, scope) for element in node.elts
+            )
+            return lambda env: (first(env), second(env))
+        if isinstance(node, ast.Tuple) and len(node.elts) > 1:
+            elements = [
+                self._compile(element, model_arg, scope) for element in node.elts
+            ]
+            return lambda env: tuple(element(env) for element in elements)
+        if isinstance(node, ast.Tuple) and len(node.elts) == 1:
+            node = node.elts[0]
+        return self._compile(node, model_arg, scope)
+
+    def _compile_column(self, node, model_arg, scope):
+        """a closure giving the column of an indexed variable, or `None` if
+        `node` is not a `model.<var>[...]` subscript"""
+        if not isinstance(node, ast.Subscript):
+            return None
+        component = self._resolve(node.value, model_arg)
+        if not isinstance(component, VarRef):
+            return None
+        columns = component.columns
+        names = _scope_names(node.slice, scope)
+        # `[i]` and `[i, j]` are looked up without a key closure, this runs
+        # once per term of every row
+        if names is not None and len(names) == 1:
+            (name,) = names
+            return lambda env: columns[env[name]]
+        if names is not None and len(names) == 2:
+            first_name, second_name = names
+            return lambda env: columns[env[first_name], env[second_name]]
+        key = self._compile_key(node.slice, model_arg, scope)
+        return lambda env: columns[key(env)]
+
+    def _compile_Subscript(self, node, model_arg, scope):
+        if column := self._compile_column(node, model_arg, scope):
+            return lambda env: LinearExpr({column(env): 1.0})
+
+        key = self._compile_key(node.slice, model_arg, scope)
+        component = self._resolve(node.value, model_arg)
+        if isinstance(component, ParamRef):
+            data = component.data
+            names = _scope_names(node.slice, scope)
+            if names is not None and len(names) == 1:
+                (name,) = names
+                return lambda env: data[env[name]]
+            return lambda env: data[key(env)]
+        if isinstance(component, SetRef):
+            members = component.members
+
+            def set_member(env):
+                position = key(env)
+                if not isinstance(position, int) or position < 1:
+                    raise NotLinearError(f"invalid set position {position!r}")
+                return members[position - 1]
+
+            return set_member
+
+        container = self._compile(node.value, model_arg, scope)
+
+        def subscript(env):
+            value = container(env)
+            if not isinstance(value, (list, tuple, range)):
+                raise NotLinearError(f"unsupported subscript of {value!r}")
+            return value[key(env)]
+
+        return subscript
+
+    def _compile_Tuple(self, node, model_arg, scope):
+        elements = [self._compile(element, model_arg, scope) for element in node.elts]
+        return lambda env: tuple(element(env) for element in elements)
+
+    def _compile_List(self, node, model_arg, scope):
+        elements = [self._compile(element, model_arg, scope) for element in node.elts]
+        return lambda env: [element(env) for element in elements]
+
+    def _compile_UnaryOp(self, node, model_arg, scope):
+        operand = self._compile(node.operand, model_arg, scope)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+        if not isinstance(node.op, ast.USub):
+            raise NotLinearError(f"unsupported unary operation {ast.unparse(node)}")
+
+        def negate(env):
+            value = operand(env)
+            if isinstance(value, LinearExpr):
+                return _scale(value, -1.0)
+            if _is_number(value):
+                return -value
+            raise NotLinearError(f"cannot negate {value!r}")
+
+        return negate
+
+    def _compile_term(self, node, model_arg, scope):
+        """a closure giving `(column, coefficient)` for `model.<var>[...]` and
+        `coefficient * model.<var>[...]` in either order, or `None` for any
+        other expression"""
+        if column := self._compile_column(node, model_arg, scope):
+            return lambda env: (column(env), 1.0)
+        if not (isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult)):
+            return None
+        for var_node, coef_node in ((node.right, node.left), (node.left, node.right)):
+            if column := self._compile_column(var_node, model_arg, scope):
+                break
+        else:
+            return None
+        coef = self._compile(coef_node, model_arg, scope)
+        text = ast.unparse(node)
+
+        def term(env):
+            value = coef(env)
+            if _is_number(value):
+                return column(env), value
+            if isinstance(value, LinearExpr) and not value.coefs:
+                return column(env), value.constant
+            raise NotLinearError(f"not a linear operation: {text}")
+
+        return term
+
+    def _compile_BinOp(self, node, model_arg, scope):
+        if isinstance(node.op, ast.Mult) and (
+            term := self._compile_term(node, model_arg, scope)
+        ):
+            return lambda env: LinearExpr(dict((term(env),)))
+
+        left_fn = self._compile(node.left, model_arg, scope)
+        right_fn = self._compile(node.right, model_arg, scope)
+        op = type(node.op)
+        if op not in _NUMBER_OPS:
+            raise NotLinearError(f"unsupported operation {ast.unparse(node)}")
+        number_op = _NUMBER_OPS[op]
+        text = ast.unparse(node)
+
+        def binop(env):
+            left, right = left_fn(env), right_fn(env)
+            if _is_number(left) and _is_number(right):
+                return number_op(left, right)
+            if op is ast.Add:
+                return _combine(left, right, 1.0)
+            if op is ast.Sub:
+                return _combine(left, right, -1.0)
+            if op is ast.Mult:
+                if _is_number(left) and isinstance(right, LinearExpr):
+                    return _scale(right, left)
+                if isinstance(left, LinearExpr) and _is_number(right):
+                    return _scale(left, right)
+            if op is ast.Div:
+                if isinstance(left, LinearExpr) and _is_number(right) and right != 0:
+                    return _scale(left, 1.0 / right)
+            if op is ast.Pow and isinstance(left, LinearExpr) and right == 1:
+                return left
+            raise NotLinearError(f"not a linear operation: {text}")
+
+        return binop
+
+    def _compile_Compare(self, node, model_arg, scope):
+        operand_fns = [self._compile(node.left, model_arg, scope)] + [
+            self._compile(comparator, model_arg, scope)
+            for comparator in node.comparators
+        ]
+        ops = [type(op) for op in node.ops]
+        text = ast.unparse(node)
+        if len(ops) == 1:
+            return _single_comparison(ops[0], *operand_fns, text)
+
+        def compare(env):
+            operands = [operand_fn(env) for operand_fn in operand_fns]
+            if all(_is_number(operand) for operand in operands):
+                return all(
+                    _COMPARE_OPS[op](left, right)
+                    for op, left, right in zip(ops, operands, operands[1:])
+                )
+            if (
+                ops == [ast.LtE, ast.LtE]
+                and _is_number(operands[0])
+                and _is_number(operands[2])
+            ):
+                # ranged constraint `lower <= expr <= upper`
+                expr = _as_linear(operands[1])
+                return Row(
+                    operands[0] - expr.constant,
+                    LinearExpr(expr.coefs),
+                    operands[2] - expr.constant,
+                )
+            raise NotLinearError(f"unsupported comparison {text}")
+
+        return compare
+
+    def _compile_condition(self, node, model_arg, scope):
+        test_fn = self._compile(node, model_arg, scope)
+
+        def condition(env) -> bool:
+            test = test_fn(env)
+            if not isinstance(test, bool):
+                raise NotLinearError(f"condition depends on variables: {test!r}")
+            return test
+
+        return condition
+
+    def _compile_IfExp(self, node, model_arg, scope):
+        test = self._compile_condition(node.test, model_arg, scope)
+        body = self._compile(node.body, model_arg, scope)
+        orelse = self._compile(node.orelse, model_arg, scope)
+        return lambda env: body(env) if test(env) else orelse(env)
+
+    def _compile_Call(self, node, model_arg, scope):
+        if node.keywords:
+            raise NotLinearError(f"unsupported call {ast.unparse(node)}")
+        if isinstance(node.func, ast.Name):
+            if node.func.id == "sum" and len(node.args) == 1:
+                return self._compile_sum(node.args[0], model_arg, scope)
+            if node.func.id == "range":
+                args = [self._compile(arg, model_arg, scope) for arg in node.args]
+                return lambda env: range(*(arg(env) for arg in args))
+        elif isinstance(node.func, ast.Attribute):
+            component = self._resolve(node.func.value, model_arg)
+            if isinstance(component, SetRef):
+                args = [self._compile(arg, model_arg, scope) for arg in node.args]
+                method = node.func.attr
+                return lambda env: _set_method(
+                    component, method, [arg(env) for arg in args]
+                )
+        raise NotLinearError(f"unsupported call {ast.unparse(node)}")
+
+    def _compile_sum(self, node, model_arg, scope):
+        if fused := self._compile_term_sum(node, model_arg, scope):
+            return fused
+        if isinstance(node, ast.GeneratorExp):
+            values = self._compile_generator(node, model_arg, scope)
+        else:
+            iterable = self._compile(node, model_arg, scope)
+            values = lambda env: _iterable(iterable(env))  # noqa: E731
+
+        def accumulate(env):
+            # accumulate in place, adding expressions pairwise would copy the
+            # coefficients of the partial sum for every term
+            coefs: dict[int, float] = {}
+            constant = 0.0
+            linear = False
+            for value in values(env):
+                if isinstance(value, LinearExpr):
+                    linear = True
+                    for col, coef in value.coefs.items():
+                        coefs[col] = coefs.get(col, 0.0) + coef
+                    constant += value.constant
+                elif _is_number(value):
+                    constant += value
+                else:
+                    raise NotLinearError(f"cannot sum {value!r}")
+            return LinearExpr(coefs, constant) if linear else constant
+
+        return accumulate
+
+    def _compile_term_sum(self, node, model_arg, scope):
+        """`sum(coefficient * model.<var>[...] for i in ... for j in ...)` with
+        one or two unconditional loops, accumulated without intermediate
+        expressions; `None` for any other sum"""
+        if not (
+            isinstance(node, ast.GeneratorExp)
+            and len(node.generators) <= 2
+            and all(
+                isinstance(generator.target, ast.Name) and not generator.ifs
+                for generator in node.generators
+            )
+        ):
+            return None
+        loops = []
+        for generator in node.generators:
+            loops.append(
+                (generator.target.id, self._compile(generator.iter, model_arg, scope))
+            )
+            scope = scope | {generator.target.id}
+        if len(loops) == 1 and (
+            fused := self._compile_column_sum(node.elt, model_arg, scope, *loops[0])
+        ):
+            return fused
+        term = self._compile_term(node.elt, model_arg, scope)
+        if term is None:
+            return None
+
+        if len(loops) == 1:
+            ((name, iterable),) = loops
+
+            def fused(env):
+                env = dict(env)
+                coefs: dict[int, float] = {}
+                for value in _iterable(iterable(env)):
+                    env[name] = value
+                    col, coef = term(env)
+                    coefs[col] = coefs.get(col, 0.0) + coef
+                return LinearExpr(coefs)
+
+        else:
+            (outer_name, outer_iterable), (inner_name, inner_iterable) = loops
+
+            def fused(env):
+                env = dict(env)
+                coefs: dict[int, float] = {}
+                for outer_value in _iterable(outer_iterable(env)):
+                    env[outer_name] = outer_value
+                    for inner_value in _iterable(inner_iterable(env)):
+                        env[inner_name] = inner_value
+                        col, coef = term(env)
+                        coefs[col] = coefs.get(col, 0.0) + coef
+                return LinearExpr(coefs)
+
+        return fused
+
+    def _compile_column_sum(self, node, model_arg, scope, name, iterable):
+        """`sum(model.<var>[i, j] for j in ...)`, a key of the loop and index
+        variables, without a closure call per term; `None` for any other
+        element"""
+        if not isinstance(node, ast.Subscript):
+            return None
+        component = self._resolve(node.value, model_arg)
+        names = _scope_names(node.slice, scope)
+        if not isinstance(component, VarRef) or names is None:
+            return None
+        if names.count(name) != 1:
+            return None
+        columns = component.columns
+        position = names.index(name)
+        before_names, after_names = names[:position], names[position + 1 :]
+
+        def fused(env):
+            before = tuple(env[before_name] for before_name in before_names)
+            after = tuple(env[after_name] for after_name in after_names)
+            coefs: dict[int, float] = {}
+            for value in _iterable(iterable(env)):
+                col = (
+                    columns[(*before, value, *after)]
+                    if len(names) > 1
+                    else columns[value]
+                )
+                coefs[col] = coefs.get(col, 0.0) + 1.0
+            return LinearExpr(coefs)
+
+        return fused
+
+    def _compile_generator(self, node: ast.GeneratorExp, model_arg, scope):
+        loops = []
+        for generator in node.generators:
+            iterable = self._compile(generator.iter, model_arg, scope)
+            scope = scope | _target_names(generator.target)
+            conditions = [
+                self._compile_condition(test, model_arg, scope)
+                for test in generator.ifs
+            ]
+            loops.append((generator.target, iterable, conditions))
+        element = self._compile(node.elt, model_arg, scope)
+
+        if len(loops) == 1 and not loops[0][2]:
+            # the common `sum(... for i in model.I)` without the recursion
+            target, iterable, _ = loops[0]
+
+            def run(env):
+                for value in _iterable(iterable(env)):
+                    _bind(target, value, env)
+                    yield element(env)
+
+        else:
+
+            def run(env, depth=0):
+                if depth == len(loops):
+                    yield element(env)
+                    return
+                target, iterable, conditions = loops[depth]
+                for value in _iterable(iterable(env)):
+                    _bind(target, value, env)
+                    if all(condition(env) for condition in conditions):
+                        yield from run(env, depth + 1)
+
+        # the loop variables are bound in a copy, like in a python generator
+        # they do not leak into the enclosing expression
+        return lambda env: run(dict(env))
+
+
+def _single_comparison(op: type, left_fn, right_fn, text: str):
+    """a closure for `left <op> right`, a row once per index of most rules"""
+
+    def compare(env):
+        left, right = left_fn(env), right_fn(env)
+        if isinstance(left, LinearExpr) and _is_number(right):
+            # `expr <= bound`, the usual form, without a copy of the
+            # coefficients; an evaluated expression is not shared
+            expr = LinearExpr(left.coefs) if left.constant else left
+            bound = right - left.constant
+        elif _is_number(left) and _is_number(right):
+            return _COMPARE_OPS[op](left, right)
+        else:
+            expr = _combine(left, right, -1.0)
+            expr, bound = LinearExpr(expr.coefs), -expr.constant
+        if op is ast.LtE:
+            return Row(None, expr, bound)
+        if op is ast.GtE:
+            return Row(bound, expr, None)
+        if op is ast.Eq:
+            return Row(bound, expr, bound)
+        raise NotLinearError(f"unsupported comparison {text}")
+
+    return compare
+
+
+def _scope_names(node: ast.AST, scope: frozenset) -> list[str] | None:
+    """the names of a key of loop or index variables only, e.g. of `[i, j]`"""
+    elements = node.elts if isinstance(node, ast.Tuple) else [node]
+    if not all(
+        isinstance(element, ast.Name) and element.id in scope for element in elements
+    ):
+        return None
+    return [element.id for element in elements]
+
+
+def _set_method(set_ref: SetRef, method: str, args: list):
+    if method == "first" and not args:
+        return set_ref.members[0]
+    if method == "last" and not args:
+        return set_ref.members[-1]
+    if method == "ord" and len(args) == 1:
+        return set_ref.position(args[0])
+    if method == "next" and len(args) == 1:
+        return set_ref.members[set_ref.position(args[0])]
+    if method == "prev" and len(args) == 1 and set_ref.position(args[0]) > 1:
+        return set_ref.members[set_ref.position(args[0]) - 2]
+    raise NotLinearError(f"unsupported set method `{method}`")
+
+
+def _iterable(value):
+    if isinstance(value, SetRef):
+        return value.members
+    if isinstance(value, (list, tuple, range)):
+        return value
+    raise NotLinearError(f"cannot iterate over {value!r}")
+
+
+def _target_names(target: ast.AST) -> frozenset:
+    if isinstance(target, ast.Name):
+        return frozenset({target.id})
+    if isinstance(target, (ast.Tuple, ast.List)):
+        return frozenset().union(*(_target_names(element) for element in target.elts))
+    raise NotLinearError(f"unsupported loop target {ast.dump(target)}")
+
+
+def _bind(target: ast.AST, value, env: dict) -> None:
+    if isinstance(target, ast.Name):
+        env[target.id] = value
+        return
+    if not isinstance(value, tuple) or len(value) != len(target.elts):
+        raise NotLinearError(f"cannot unpack {value!r}")
+    for element, element_value in zip(target.elts, value):
+        _bind(element, element_value, env)
+
+
+def _evaluate_rule(compiled_rule, env: dict):
+    try:
+        return compiled_rule(env)
+    except NotLinearError:
+        raise
+    except _EVALUATION_ERRORS as e:
+        raise NotLinearError(f"{type(e).__name__}: {e}") from e
+
+
+def compile_constraint(
+    pyo_constr: PyomoConstraint, compiler: RuleCompiler
+) -> Callable[[tuple], Row | None]:
+    """the row of a constraint rule for the tuple of its index arguments,
+    `None` for a skipped index"""
+    if not getattr(pyo_constr, "rule", None):
+        # plain expressions and missing rules are left to the lambda path
+        raise NotLinearError(f"{pyo_constr.name} has no rule")
+
+    model_arg, *index_args = pyo_constr.rule.lambda_arguments or ["model"]
+    body = ast.parse(pyo_constr.rule.lambda_body.strip(), mode="eval").body
+    compiled_rule = compiler.compile(body, model_arg, index_args)
+
+    def row(index: tuple) -> Row | None:
+        if len(index) != len(index_args):
+            raise NotLinearError(
+                f"{pyo_constr.name}: {len(index_args)} index arguments for {index}"
+            )
+        try:
+            result = compiled_rule(dict(zip(index_args, index)))
+        except NotLinearError:
+            raise
+        except _EVALUATION_ERRORS as e:
+            raise NotLinearError(f"{type(e).__name__}: {e}") from e
+        if result is _SKIP:
+            return None
+        if isinstance(result, Row) and result.expr.coefs:
+            return result
+        # trivial or non constraint results are left to pyomo to report
+        raise NotLinearError(
+            f"{pyo_constr.name}{list(index)} is not a linear constraint"
+        )
+
+    return row
+
+
+def constraint_rows(
+    pyo_constr: PyomoConstraint, keys: list, compiler: RuleCompiler
+) -> dict[Any, Row | None]:
+    """the rows of an indexed constraint by index key, `None` for skipped
+    indexes"""
+    row = compile_constraint(pyo_constr, compiler)
+    return {
+        key: row(() if key is None else key if isinstance(key, tuple) else (key,))
+        for key in keys
+    }
+
+
+def objective_expression(
+    objective: ObjectiveFunction, compiler: RuleCompiler
+) -> LinearExpr:
+    expr_str = objective.expr or objective.rule
+    if not expr_str:
+        raise RuleError("Objective must have either rule or expression.")
+
+    node = ast.parse(expr_str.strip(), mode="eval").body
+    model_arg = "model"
+    if isinstance(node, ast.Lambda):
+        if len(node.args.args) != 1:
+            raise NotLinearError("objective rule must only take the model")
+        model_arg, node = node.args.args[0].arg, node.body
+    compiled_rule = compiler.compile(node, model_arg, ())
+    return _as_linear(_evaluate_rule(compiled_rule, {}))
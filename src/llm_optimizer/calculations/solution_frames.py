@@ -0,0 +1,108 @@
+import io
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as pyo
+
+from llm_optimizer.models.llm import LinearOptimizationModel
+
+
+def variable_values(model_var: Any) -> tuple[list, np.ndarray]:
+    """the index keys and the values of a solved variable, not solved values
+    are nan"""
+    if hasattr(model_var, "value_array"):
+        # highs backend, the values are already an array
+        return model_var.keys(), model_var.value_array()
+    values = model_var.extract_values()
+    return list(values), np.array(list(values.values()), dtype=float)
+
+
+def index_column_names(index_names: list[str] | None, dimensions: int) -> list[str]:
+    """a column name per index dimension, the index set names where known"""
+    names = [index_name.split(".")[-1] for index_name in index_names or []]
+    if len(names) != dimensions:
+        names = [f"index_{dimension}" for dimension in range(1, dimensions + 1)]
+    columns: list[str] = []
+    for name in names:
+        # e.g. a variable indexed twice by the same set
+        column, suffix = name, 1
+        while column in columns or column == "value":
+            suffix += 1
+            column = f"{name}_{suffix}"
+        columns.append(column)
+    return columns
+
+
+def variable_frame(
+    model_var: Any, index_names: list[str] | None = None
+) -> pd.DataFrame:
+    """the values of a pyomo `Var` or a highs `SolutionVar` in one pass, a
+    column per index dimension and a `value` column"""
+    keys, values = variable_values(model_var)
+    return _frame(keys, values, index_names)
+
+
+def _frame(keys: list, values: np.ndarray, index_names: list[str] | None):
+    if not keys or keys == [None]:
+        return pd.DataFrame({"value": values})
+    if not isinstance(keys[0], tuple):
+        (name,) = index_column_names(index_names, 1)
+        return pd.DataFrame({name: keys, "value": values})
+    # splits the key tuples into columns faster than zip(*keys)
+    index = pd.MultiIndex.from_tuples(
+        keys, names=index_column_names(index_names, len(keys[0]))
+    )
+    return pd.DataFrame({"value": values}, index=index).reset_index()
+
+
+def solution_frames(
+    solution: Any, llm_pyomo_model: LinearOptimizationModel | None = None
+) -> dict[str, pd.DataFrame]:
+    """a frame per variable of a solved pyomo model or `HighsSolution`, the
+    index columns are named after the sets of `llm_pyomo_model`"""
+    index_names = {
+        pyo_var.name: pyo_var.indexes
+        for pyo_var in (llm_pyomo_model.variables if llm_pyomo_model else [])
+    }
+    return {
+        str(model_var): variable_frame(model_var, index_names.get(str(model_var)))
+        for model_var in solution.component_objects(pyo.Var, active=True)
+    }
+
+
+def summary_frames(
+    summary: dict[str, Any], llm_pyomo_model: LinearOptimizationModel | None = None
+) -> dict[str, pd.DataFrame]:
+    """the frames of the variables of a `summarize_solution` summary, e.g. the
+    result of a solver job"""
+    index_names = {
+        pyo_var.name: pyo_var.indexes
+        for pyo_var in (llm_pyomo_model.variables if llm_pyomo_model else [])
+    }
+    return {
+        name: _frame(
+            # json turned the index tuples into lists
+            [tuple(idx) if isinstance(idx, list) else idx for idx, _ in items],
+            np.array([value for _, value in items], dtype=float),
+            index_names.get(name),
+        )
+        for name, items in summary.get("variables", {}).items()
+    }
+
+
+def frame_to_csv(frame: pd.DataFrame) -> bytes:
+    return frame.to_csv(index=False).encode()
+
+
+def frame_to_parquet(frame: pd.DataFrame) -> bytes:
+    with (buffer := io.BytesIO()):
+        # index values of mixed types are stored as strings
+        frame.astype(
+            {
+                column: str
+                for column in frame.columns
+                if column != "value" and frame[column].dtype == object
+            }
+        ).to_parquet(buffer, index=False)
+        return buffer.getvalue()
@@ -0,0 +1,103 @@
+"""the configuration of a solve: time limit, threads, presolve, mip gap and
+the HiGHS method, for the pyomo and the highs backend
+
+    options = SolverOptions(time_limit=60, mip_gap=0.01, threads=4)
+    construct_and_solve(llm_pyomo_model, options=options)
+
+`None` keeps the default of the solver, so `SolverOptions()` solves as
+before; the pyomo backend can also use cbc or glpk if they are installed"""
+
+import dataclasses
+from dataclasses import dataclass
+from typing import Any
+
+
+# an llm model without an upper bound on time can run for hours
+DEFAULT_TIME_LIMIT = 300.0
+SOLVERS = ("highs", "cbc", "glpk")
+HIGHS_METHODS = ("choose", "simplex", "ipm", "pdlp")
+
+# option names of the solvers other than highs, options without a name here
+# are not passed to them
+_SOLVER_OPTION_NAMES = {
+    "cbc": {"threads": "threads", "mip_gap": "ratioGap", "presolve": "presolve"},
+    "glpk": {"mip_gap": "mipgap"},
+}
+
+
+@dataclass(frozen=True)
+class SolverOptions:
+    # seconds, the best solution found so far is summarized
+    time_limit: float | None = None
+    threads: int | None = None
+    presolve: bool | None = None
+    # relative gap at which a mip counts as solved
+    mip_gap: float | None = None
+    # one of `HIGHS_METHODS`
+    method: str | None = None
+    # one of `SOLVERS`, other solvers than highs only with the pyomo backend
+    solver: str = "highs"
+
+    def __post_init__(self):
+        if self.solver not in SOLVERS:
+            raise ValueError(f"unknown solver `{self.solver}`")
+        if self.method is not None and self.method not in HIGHS_METHODS:
+            raise ValueError(f"unknown HiGHS method `{self.method}`")
+        if self.time_limit is not None and self.time_limit <= 0:
+            raise ValueError("time_limit must be positive")
+        if self.threads is not None and self.threads < 1:
+            raise ValueError("threads must be at least 1")
+        if self.mip_gap is not None and not 0 <= self.mip_gap <= 1:
+            raise ValueError("mip_gap must be between 0 and 1")
+
+    def _presolve(self) -> str | None:
+        if self.presolve is None:
+            return None
+        return "on" if self.presolve else "off"
+
+    def highs_options(self) -> dict[str, Any]:
+        """the options as HiGHS option values, without the time limit"""
+        options = {
+            "threads": self.threads,
+            "presolve": self._presolve(),
+            "mip_rel_gap": self.mip_gap,
+            "solver": self.method,
+        }
+        return {name: value for name, value in options.items() if value is not None}
+
+    def solver_options(self) -> dict[str, Any]:
+        """the options of the `options` argument of a pyomo solver, without the
+        time limit, which all of them take as `timelimit`"""
+        if self.solver == "highs":
+            return self.highs_options()
+        values = {
+            "threads": self.threads,
+            "mip_gap": self.mip_gap,
+            "presolve": self._presolve(),
+        }
+        return {
+            solver_name: values[name]
+            for name, solver_name in _SOLVER_OPTION_NAMES[self.solver].items()
+            if values[name] is not None
+        }
+
+
+def reset_highs_threads(options: SolverOptions) -> None:
+    """HiGHS starts its threads once per process, a later solve with another
+    number of `threads` fails unless they are started again"""
+    if options.solver == "highs" and options.threads is not None:
+        # highspy is not imported with the options, see `test_imports`
+        import highspy
+
+        highspy.Highs.resetGlobalScheduler(True)
+
+
+def with_time_limit(
+    options: SolverOptions | None, time_limit: float | None
+) -> SolverOptions:
+    """`options` with `time_limit` if it is given, the separate `time_limit`
+    argument of the solve functions predates the options"""
+    options = options or SolverOptions()
+    if time_limit is None:
+        return options
+    return dataclasses.replace(options, time_limit=time_limit)
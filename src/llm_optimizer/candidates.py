@@ -0,0 +1,211 @@
+"""several candidate models for one problem, requested concurrently and each
+solved as soon as it arrives, the selected candidate is the one most of the
+others agree with on the optimal objective value
+
+    selection = asyncio.run(solve_candidates_async(problem, n=3))
+    selection.best.result["objective"], selection.agreement
+
+the requests are separate concurrent calls, instructor parses one response
+model per completion and does not support the `n` parameter"""
+
+import asyncio
+import functools
+import logging
+import math
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable
+
+from llm_optimizer.calculations.data_files import attach_data_files, with_data_files
+from llm_optimizer.calculations.lin_optimization_logic import (
+    SOLVER_BACKENDS,
+    build_and_solve,
+)
+from llm_optimizer.llm.communication_async import (
+    generate_llm_pyomo_model_async,
+    get_async_client,
+    validate_optimization_problem_async,
+)
+from llm_optimizer.llm.communication_instructor import PROMPT_PROFILES, llm_errors
+from llm_optimizer.models.base import InvalidInputError
+from llm_optimizer.models.llm import LinearOptimizationModel
+from llm_optimizer.utils import instrumentation
+
+if TYPE_CHECKING:
+    import instructor
+
+
+SELECTION_CRITERIA = ("agreement", "first")
+# candidates at the default temperature of 0.2 are mostly the same model
+CANDIDATE_TEMPERATURE = 0.7
+
+
+@dataclass
+class Candidate:
+    llm_pyomo_model: LinearOptimizationModel | None
+    # the `build_and_solve` result, status "llm_error" if the request failed
+    result: dict[str, Any]
+
+    @property
+    def optimal(self) -> bool:
+        return self.result.get("status") == "solved" and bool(
+            self.result.get("optimal")
+        )
+
+    @property
+    def objective(self) -> float | None:
+        return self.result.get("objective")
+
+
+@dataclass
+class CandidateSelection:
+    best: Candidate | None
+    candidates: list[Candidate] = field(default_factory=list)
+    # the number of optimal candidates with the objective value of `best`
+    agreement: int = 0
+
+
+def agreeing_groups(
+    candidates: Iterable[Candidate], rel_tol: float = 1e-6
+) -> list[list[Candidate]]:
+    """the optimal candidates grouped by their objective value, the largest
+    group first, equally large groups in the order they were formed"""
+    groups: list[list[Candidate]] = []
+    for candidate in candidates:
+        if not candidate.optimal:
+            continue
+        for group in groups:
+            if math.isclose(
+                group[0].objective, candidate.objective, rel_tol=rel_tol, abs_tol=1e-9
+            ):
+                group.append(candidate)
+                break
+        else:
+            groups.append([candidate])
+    return sorted(groups, key=len, reverse=True)
+
+
+def select_candidate(
+    candidates: list[Candidate], criterion: str = "agreement", rel_tol: float = 1e-6
+) -> CandidateSelection:
+    """ "agreement" selects the first candidate of the largest group of equal
+    objective values, "first" the first optimal candidate"""
+    if criterion not in SELECTION_CRITERIA:
+        raise ValueError(f"unknown selection criterion `{criterion}`")
+    groups = agreeing_groups(candidates, rel_tol)
+    if not groups:
+        return CandidateSelection(None, list(candidates))
+    if criterion == "first":
+        best = next(candidate for candidate in candidates if candidate.optimal)
+        group = next(
+            group for group in groups if any(member is best for member in group)
+        )
+    else:
+        group = groups[0]
+        best = group[0]
+    return CandidateSelection(best, list(candidates), len(group))
+
+
+def _decided(
+    candidates: list[Candidate], n: int, criterion: str, rel_tol: float
+) -> bool:
+    """whether the candidates still to come can change the selection"""
+    groups = agreeing_groups(candidates, rel_tol)
+    if not groups:
+        return False
+    if criterion == "first":
+        return True
+    runner_up = len(groups[1]) if len(groups) > 1 else 0
+    return len(groups[0]) > runner_up + n - len(candidates)
+
+
+async def solve_candidates_async(
+    problem_formulation: str,
+    n: int = 3,
+    validate_input: bool = True,
+    backend: str = "pyomo",
+    criterion: str = "agreement",
+    time_limit: float | None = None,
+    rel_tol: float = 1e-6,
+    executor: Executor | None = None,
+    client: "instructor.AsyncInstructor | None" = None,
+    profile: str = "full",
+    data_files: Iterable[Path | str] = (),
+) -> CandidateSelection:
+    """request `n` candidates at once and solve each in `executor` as soon as
+    it arrives, the outstanding requests are cancelled once the selection is
+    decided, raises `InvalidInputError` if the validation rejects the problem
+
+    the `data_files` are described in the request and attached to every
+    candidate, see `with_data_files`"""
+    if not problem_formulation:
+        raise ValueError("No problem formulation given")
+    if n < 1:
+        raise ValueError("n must be at least 1")
+    if criterion not in SELECTION_CRITERIA:
+        raise ValueError(f"unknown selection criterion `{criterion}`")
+    if backend not in SOLVER_BACKENDS:
+        raise ValueError(f"unknown solver backend `{backend}`")
+    if profile not in PROMPT_PROFILES:
+        raise ValueError(f"unknown prompt profile `{profile}`")
+
+    data_files = list(data_files)
+    task = with_data_files(problem_formulation, data_files)
+    client = client or get_async_client()
+    llm_prompt_settings = {
+        **PROMPT_PROFILES[profile],
+        "temperature": CANDIDATE_TEMPERATURE,
+    }
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=min(n, os.cpu_count() or 1))
+    loop = asyncio.get_running_loop()
+
+    async def candidate() -> Candidate:
+        try:
+            llm_pyomo_model = await generate_llm_pyomo_model_async(
+                client, task, llm_prompt_settings
+            )
+        except llm_errors() as e:
+            return Candidate(None, {"status": "llm_error", "error": str(e)})
+        llm_pyomo_model = attach_data_files(llm_pyomo_model, data_files)
+        llm_pyomo_model.problem_str = problem_formulation
+        result = await loop.run_in_executor(
+            executor,
+            functools.partial(build_and_solve, backend=backend, time_limit=time_limit),
+            llm_pyomo_model.model_dump_json(),
+        )
+        return Candidate(llm_pyomo_model, result)
+
+    tasks = [asyncio.create_task(candidate()) for _ in range(n)]
+    candidates: list[Candidate] = []
+    try:
+        with instrumentation.span("solve_candidates", n=n, criterion=criterion):
+            if validate_input:
+                answer = await validate_optimization_problem_async(task, client)
+                if not answer.valid:
+                    raise InvalidInputError(
+                        f"Optimization problem not valid, reason: {answer.reason}"
+                    )
+            for next_candidate in asyncio.as_completed(tasks):
+                candidates.append(await next_candidate)
+                if _decided(candidates, n, criterion, rel_tol):
+                    break
+            selection = select_candidate(candidates, criterion, rel_tol)
+            instrumentation.set_attributes(
+                solved=len(candidates), agreement=selection.agreement
+            )
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    logging.debug(
+        f"selected a candidate agreed on by {selection.agreement} of "
+        f"{len(candidates)} candidates"
+    )
+    return selection
@@ -0,0 +1,394 @@
+"""a local queue of solver jobs in sqlite and a pool of worker processes that
+run them, so long solves neither block the app nor compete in its process
+
+    with SolverQueue(workers=4) as queue:
+        job_id = queue.submit(llm_pyomo_model, time_limit=60)
+        queue.status(job_id)  # "queued", "running", "finished", ...
+        result = queue.result(job_id, timeout=120)
+
+the queue file can be shared by several processes, each starts its own
+workers and they all take the next queued job"""
+
+import dataclasses
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from llm_optimizer.calculations.lin_optimization_logic import build_and_solve
+from llm_optimizer.calculations.solver_options import SolverOptions, with_time_limit
+from llm_optimizer.models.base import SOLVER_BACKENDS
+from llm_optimizer.models.llm import LinearOptimizationModel
+
+
+DEFAULT_QUEUE_PATH = Path.home() / ".cache" / "llm_optimizer" / "jobs.sqlite3"
+
+QUEUED = "queued"
+RUNNING = "running"
+# cancelled while running, until the worker is stopped
+CANCELLING = "cancelling"
+FINISHED = "finished"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+FAILED = "failed"
+DONE_STATUSES = (FINISHED, CANCELLED, TIMED_OUT, FAILED)
+
+
+@dataclass
+class Job:
+    id: str
+    status: str
+    backend: str
+    time_limit: float | None
+    created_at: float
+    started_at: float | None
+    finished_at: float | None
+    result: dict[str, Any] | None
+    error: str | None
+
+    @property
+    def done(self) -> bool:
+        return self.status in DONE_STATUSES
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _work(
+    path: str,
+    solve_job: Callable[..., dict[str, Any]],
+    poll_interval: float,
+    parent_pid: int,
+) -> None:
+    """the loop of a worker process, runs queued jobs until the app is gone"""
+    queue = SolverQueue(path)
+    while os.getppid() == parent_pid:
+        claimed = queue._claim(os.getpid())
+        if claimed is None:
+            time.sleep(poll_interval)
+            continue
+        job_id, payload, backend, time_limit, options = claimed
+        logging.debug(f"worker {os.getpid()} runs job {job_id}")
+        # only jobs with options pass them, `solve_job` may not take them
+        options = {"options": SolverOptions(**json.loads(options))} if options else {}
+        try:
+            result = solve_job(
+                payload, backend=backend, time_limit=time_limit, **options
+            )
+        except Exception as e:
+            queue._finish(job_id, None, f"{type(e).__name__}: {e}")
+        else:
+            queue._finish(job_id, result, None)
+
+
+class SolverQueue:
+    """sqlite backed queue of solver jobs, `start` runs them in `workers`
+    processes
+
+    a job gets its `time_limit` as the solver time limit, a worker still busy
+    `kill_grace` seconds after the limit is terminated like the worker of a
+    cancelled running job, workers that died are replaced"""
+
+    def __init__(
+        self,
+        path: Path | str = DEFAULT_QUEUE_PATH,
+        workers: int | None = None,
+        solve_job: Callable[..., dict[str, Any]] = build_and_solve,
+        poll_interval: float = 0.1,
+        kill_grace: float = 5.0,
+    ):
+        self.path = Path(path)
+        self.workers = workers or os.cpu_count() or 1
+        self.solve_job = solve_job
+        self.poll_interval = poll_interval
+        self.kill_grace = kill_grace
+        # workers are spawned, forking the threads of streamlit is unsafe
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: list[multiprocessing.Process] = []
+        self._stop = threading.Event()
+        self._monitor: threading.Thread | None = None
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    backend TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    time_limit REAL,
+                    options TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    worker_pid INTEGER,
+                    result TEXT,
+                    error TEXT
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)"
+            )
+            # queue files of earlier versions have no options
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "options" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN options TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def __enter__(self) -> "SolverQueue":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> None:
+        """start the workers and the thread that watches them"""
+        if self._monitor is not None:
+            return
+        self._requeue_orphaned_jobs()
+        for _ in range(self.workers):
+            self._processes.append(self._start_worker())
+        self._stop.clear()
+        self._monitor = threading.Thread(
+            target=self._watch, name="solver-queue-monitor", daemon=True
+        )
+        self._monitor.start()
+
+    def close(self) -> None:
+        """stop the workers, their running jobs are queued again"""
+        if self._monitor is None:
+            return
+        self._stop.set()
+        self._monitor.join()
+        self._monitor = None
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join()
+            self._requeue_jobs_of(process.pid)
+        self._processes = []
+
+    def submit(
+        self,
+        llm_pyomo_model: LinearOptimizationModel,
+        backend: str = "pyomo",
+        time_limit: float | None = None,
+        options: SolverOptions | None = None,
+    ) -> str:
+        """`time_limit` replaces the time limit of `options`"""
+        if backend not in SOLVER_BACKENDS:
+            raise ValueError(f"unknown solver backend `{backend}`")
+        if options is not None:
+            options = with_time_limit(options, time_limit)
+            time_limit = options.time_limit
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """INSERT INTO jobs (id, status, backend, payload, time_limit,
+                options, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    job_id,
+                    QUEUED,
+                    backend,
+                    llm_pyomo_model.model_dump_json(),
+                    time_limit,
+                    None
+                    if options is None
+                    else json.dumps(dataclasses.asdict(options)),
+                    time.time(),
+                ),
+            )
+        logging.debug(f"submitted solver job {job_id}")
+        return job_id
+
+    def job(self, job_id: str) -> Job:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                """SELECT id, status, backend, time_limit, created_at, started_at,
+                finished_at, result, error FROM jobs WHERE id = ?""",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            raise KeyError(job_id)
+        *fields, result, error = row
+        return Job(*fields, result=json.loads(result) if result else None, error=error)
+
+    def status(self, job_id: str) -> str:
+        return self.job(job_id).status
+
+    def cancel(self, job_id: str) -> bool:
+        """cancel a queued or running job, `False` if it is already done"""
+        with closing(self._connect()) as conn, conn:
+            cancelled = conn.execute(
+                """UPDATE jobs SET status = ?, finished_at = ?
+                WHERE id = ? AND status = ?""",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            ).rowcount
+            # the monitor of the process that owns the worker stops it
+            cancelled += conn.execute(
+                "UPDATE jobs SET status = ? WHERE id = ? AND status = ?",
+                (CANCELLING, job_id, RUNNING),
+            ).rowcount
+        return bool(cancelled)
+
+    def wait(self, job_id: str, timeout: float | None = None) -> Job:
+        """poll until the job is done, raises `TimeoutError` after `timeout`
+        seconds"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not (job := self.job(job_id)).done:
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"solver job {job_id} is {job.status}")
+            time.sleep(self.poll_interval)
+        return job
+
+    def result(self, job_id: str, timeout: float | None = None) -> dict[str, Any]:
+        """the `build_and_solve` result of a finished job, otherwise the status
+        of the job and why it has no result"""
+        job = self.wait(job_id, timeout)
+        if job.status == FINISHED:
+            return job.result
+        return {"status": job.status, "error": job.error}
+
+    def _claim(self, worker_pid: int) -> tuple | None:
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(
+                """UPDATE jobs SET status = ?, started_at = ?, worker_pid = ?
+                WHERE id = (
+                    SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1
+                ) AND status = ?
+                RETURNING id, payload, backend, time_limit, options""",
+                (RUNNING, time.time(), worker_pid, QUEUED, QUEUED),
+            ).fetchone()
+
+    def _finish(
+        self, job_id: str, result: dict[str, Any] | None, error: str | None
+    ) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """UPDATE jobs SET status = CASE
+                    WHEN status = ? THEN ? WHEN ? IS NULL THEN ? ELSE ? END,
+                result = ?, error = ?, finished_at = ?
+                WHERE id = ? AND status IN (?, ?)""",
+                (
+                    CANCELLING,
+                    CANCELLED,
+                    error,
+                    FINISHED,
+                    FAILED,
+                    None if result is None else json.dumps(result),
+                    error,
+                    time.time(),
+                    job_id,
+                    RUNNING,
+                    CANCELLING,
+                ),
+            )
+
+    def _start_worker(self) -> multiprocessing.Process:
+        process = self._context.Process(
+            target=_work,
+            args=(str(self.path), self.solve_job, self.poll_interval, os.getpid()),
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def _requeue_jobs_of(self, worker_pid: int | None) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """UPDATE jobs SET status = ?, started_at = NULL, worker_pid = NULL
+                WHERE worker_pid = ? AND status = ?""",
+                (QUEUED, worker_pid, RUNNING),
+            )
+            conn.execute(
+                """UPDATE jobs SET status = ?, finished_at = ?
+                WHERE worker_pid = ? AND status = ?""",
+                (CANCELLED, time.time(), worker_pid, CANCELLING),
+            )
+
+    def _requeue_orphaned_jobs(self) -> None:
+        """jobs of workers that are gone, e.g. after the app was killed"""
+        with closing(self._connect()) as conn:
+            worker_pids = [
+                worker_pid
+                for (worker_pid,) in conn.execute(
+                    "SELECT DISTINCT worker_pid FROM jobs WHERE status IN (?, ?)",
+                    (RUNNING, CANCELLING),
+                )
+            ]
+        for worker_pid in worker_pids:
+            if worker_pid is None or not _pid_alive(worker_pid):
+                self._requeue_jobs_of(worker_pid)
+
+    def _stop_job(
+        self, job_id: str, from_status: str, to_status: str, error: str
+    ) -> bool:
+        with closing(self._connect()) as conn, conn:
+            return bool(
+                conn.execute(
+                    """UPDATE jobs SET status = ?, finished_at = ?, error = ?
+                    WHERE id = ? AND status = ?""",
+                    (to_status, time.time(), error, job_id, from_status),
+                ).rowcount
+            )
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self._check_workers()
+            except Exception as e:
+                logging.warning(f"solver queue monitor: {e}")
+
+    def _check_workers(self) -> None:
+        processes = {process.pid: process for process in self._processes}
+        now = time.time()
+        with closing(self._connect()) as conn:
+            busy = conn.execute(
+                f"""SELECT id, status, started_at, time_limit, worker_pid FROM jobs
+                WHERE status IN (?, ?) AND worker_pid IN
+                ({", ".join("?" * len(processes))})""",
+                (RUNNING, CANCELLING, *processes),
+            ).fetchall()
+        for job_id, status, started_at, time_limit, worker_pid in busy:
+            if status == CANCELLING:
+                stopped = self._stop_job(
+                    job_id, CANCELLING, CANCELLED, "cancelled while running"
+                )
+            elif time_limit is not None and (
+                now > started_at + time_limit + self.kill_grace
+            ):
+                stopped = self._stop_job(
+                    job_id,
+                    RUNNING,
+                    TIMED_OUT,
+                    f"still running {self.kill_grace}s after the time limit",
+                )
+            else:
+                continue
+            if stopped:
+                logging.debug(f"stopping the worker of job {job_id}: {status}")
+                processes[worker_pid].terminate()
+
+        for position, process in enumerate(self._processes):
+            if not process.is_alive():
+                process.join()
+                self._requeue_jobs_of(process.pid)
+                self._processes[position] = self._start_worker()
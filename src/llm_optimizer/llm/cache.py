@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+from llm_optimizer.models.llm import LinearOptimizationModel
+
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "llm_optimizer" / "responses.sqlite3"
+
+
+def normalize_problem_text(problem_formulation: str) -> str:
+    return re.sub(r"\s+", " ", problem_formulation).strip()
+
+
+def make_cache_key(
+    problem_formulation: str,
+    model_name: str,
+    prompt_version: str,
+    llm_prompt_settings: dict,
+    validate_input: bool = True,
+) -> str:
+    """a response generated without validating the input is kept apart from a
+    validated one"""
+    key_data = json.dumps(
+        {
+            "problem": normalize_problem_text(problem_formulation),
+            "model": model_name,
+            "prompt_version": prompt_version,
+            "settings": llm_prompt_settings,
+            "validate_input": validate_input,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite backed cache of validated `LinearOptimizationModel` responses.
+
+    Entries expire `ttl` seconds after they were stored; once more than
+    `max_entries` are stored, the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: Path | str = DEFAULT_CACHE_PATH,
+        ttl: Optional[float] = 7 * 24 * 60 * 60,
+        max_entries: Optional[int] = 1000,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # a short lived connection per operation keeps the cache usable from
+        # the different threads streamlit runs its scripts in
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, key: str) -> Optional[LinearOptimizationModel]:
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT payload, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                logging.debug(f"llm response cache miss: {key}")
+                return None
+            conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+
+        self.hits += 1
+        logging.debug(f"llm response cache hit: {key}")
+        return LinearOptimizationModel.model_validate_json(row[0])
+
+    def put(self, key: str, llm_pyomo_model: LinearOptimizationModel) -> None:
+        if llm_pyomo_model.error_message:
+            raise ValueError("Only valid responses can be cached.")
+
+        now = time.time()
+        payload = llm_pyomo_model.model_dump_json(exclude={"problem_str"})
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl is not None:
+            conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)
+            )
+        if self.max_entries is not None:
+            conn.execute(
+                """DELETE FROM responses WHERE key NOT IN (
+                    SELECT key FROM responses ORDER BY last_access DESC LIMIT ?
+                )""",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM responses")
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import weakref
+from typing import TYPE_CHECKING, Iterable
+
+from pydantic import BaseModel
+
+from llm_optimizer.models.llm import LinearOptimizationModel, ValidationAnswer
+from llm_optimizer.models.base import InvalidInputError, get_settings
+from llm_optimizer.llm.cache import ResponseCache, make_cache_key
+from llm_optimizer.llm.similarity import SimilarityIndex
+from llm_optimizer.models.problem_data import apply_problem_data
+from llm_optimizer.utils import instrumentation
+from llm_optimizer.llm.communication_instructor import (
+    DEFAULT_LLM_PROMPT_SETTINGS,
+    EXTRACTION_MODEL,
+    GENERATION_MODEL,
+    PROMPT_PROFILES,
+    PROMPT_TEMPLATE_VERSION,
+    VALIDATION_MODEL,
+    as_linear_optimization_model,
+    build_validation_prompt,
+    extraction_create_kwargs,
+    generation_create_kwargs,
+    llm_errors,
+    repair_create_kwargs,
+)
+
+if TYPE_CHECKING:
+    import instructor
+
+
+# one pooled client per event loop, httpx connections cannot outlive their loop
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> "instructor.AsyncInstructor":
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        import instructor
+        import openai
+
+        _async_clients[loop] = instructor.from_openai(
+            openai.AsyncOpenAI(api_key=get_settings().OPENAI_API_KEY),
+            mode=instructor.Mode.JSON,
+        )
+    return _async_clients[loop]
+
+
+async def validate_optimization_problem_async(
+    user_input: str, client: "instructor.AsyncInstructor"
+) -> ValidationAnswer:
+    with instrumentation.span("validate_optimization_problem", model=VALIDATION_MODEL):
+        validation_answer = await client.chat.completions.create(
+            max_retries=1,
+            model=VALIDATION_MODEL,
+            response_model=ValidationAnswer,
+            temperature=0,
+            messages=[
+                {
+                    "role": "user",
+                    "content": build_validation_prompt(user_input),
+                }
+            ],
+        )
+        instrumentation.record_usage(validation_answer, VALIDATION_MODEL)
+    return validation_answer
+
+
+async def generate_llm_pyomo_model_async(
+    client: "instructor.AsyncInstructor", user_input: str, llm_prompt_settings: dict
+) -> LinearOptimizationModel:
+    profile = llm_prompt_settings.get("profile", "full")
+    with instrumentation.span(
+        "get_llm_pyomo_model", model=GENERATION_MODEL, profile=profile
+    ):
+        response = await client.chat.completions.create(
+            **generation_create_kwargs(user_input, llm_prompt_settings)
+        )
+        instrumentation.record_usage(response, GENERATION_MODEL, profile=profile)
+    return as_linear_optimization_model(response)
+
+
+async def repair_component_async(
+    client: "instructor.AsyncInstructor",
+    llm_pyomo_model: LinearOptimizationModel,
+    kind: str,
+    name: str,
+    error: str,
+) -> BaseModel:
+    """ask for a corrected version of the component that failed with `error`"""
+    with instrumentation.span(
+        "repair_component", model=GENERATION_MODEL, kind=kind, component=name
+    ):
+        component = await client.chat.completions.create(
+            **repair_create_kwargs(llm_pyomo_model, kind, name, error)
+        )
+        instrumentation.record_usage(component, GENERATION_MODEL)
+    if kind != "objective":
+        component.name = name
+    return component
+
+
+async def extract_problem_data_async(
+    client: "instructor.AsyncInstructor",
+    user_input: str,
+    llm_pyomo_model: LinearOptimizationModel,
+) -> LinearOptimizationModel:
+    """the model of a similar problem with the data of `user_input`, raises
+    `ValueError` if the data does not fit the model"""
+    with instrumentation.span("extract_problem_data", model=EXTRACTION_MODEL):
+        data = await client.chat.completions.create(
+            **extraction_create_kwargs(user_input, llm_pyomo_model)
+        )
+        instrumentation.record_usage(data, EXTRACTION_MODEL)
+    extracted = apply_problem_data(llm_pyomo_model, data)
+    extracted.problem_str = user_input
+    return extracted
+
+
+async def reuse_similar_model_async(
+    client: "instructor.AsyncInstructor", user_input: str, similar: SimilarityIndex
+) -> LinearOptimizationModel | None:
+    """see `reuse_similar_model`"""
+    similar_problem = similar.lookup(user_input)
+    if similar_problem is None:
+        instrumentation.count("similar_problem", result="miss")
+        return None
+    try:
+        llm_pyomo_model = await extract_problem_data_async(
+            client, user_input, similar_problem.llm_pyomo_model
+        )
+    except llm_errors() as e:
+        logging.debug(f"the model of the similar problem does not fit: {e}")
+        instrumentation.count("similar_problem", result="unfit")
+        return None
+    instrumentation.count("similar_problem", result="hit")
+    return llm_pyomo_model
+
+
+async def get_llm_pyomo_model_async(
+    client: "instructor.AsyncInstructor",
+    user_input: str,
+    validate_input: bool = True,
+    llm_prompt_settings: dict = DEFAULT_LLM_PROMPT_SETTINGS,
+) -> LinearOptimizationModel:
+    if not user_input:
+        raise ValueError("No problem formulation given")
+
+    # the generation request is sent right away, the validation answer only
+    # decides whether its result is used
+    generation = asyncio.create_task(
+        generate_llm_pyomo_model_async(client, user_input, llm_prompt_settings)
+    )
+
+    if validate_input:
+        try:
+            is_optimization_problem = await validate_optimization_problem_async(
+                user_input, client
+            )
+        except BaseException:
+            generation.cancel()
+            raise
+        logging.debug(
+            f"The user input describes a valid linear optimization problem: {is_optimization_problem}"
+        )
+
+        if not is_optimization_problem.valid:
+            generation.cancel()
+            raise InvalidInputError(
+                f"Optimization problem not valid, reason: {is_optimization_problem.reason}"
+            )
+
+    pyomo_model: LinearOptimizationModel = await generation
+    pyomo_model.problem_str = user_input
+
+    return pyomo_model
+
+
+async def ask_llm_for_pyomo_model_async(
+    problem_formulation: str,
+    validate_input: bool = True,
+    max_retries: int = 1,
+    cache: ResponseCache | None = None,
+    client: "instructor.AsyncInstructor | None" = None,
+    profile: str = "full",
+    similar: SimilarityIndex | None = None,
+) -> LinearOptimizationModel:
+    """see `ask_llm_for_pyomo_model`"""
+    if max_retries < 0:
+        raise ValueError
+    if profile not in PROMPT_PROFILES:
+        raise ValueError(f"unknown prompt profile `{profile}`")
+
+    llm_prompt_settings = PROMPT_PROFILES[profile]
+
+    cache_key = None
+    if cache is not None and problem_formulation:
+        cache_key = make_cache_key(
+            problem_formulation,
+            GENERATION_MODEL,
+            PROMPT_TEMPLATE_VERSION,
+            llm_prompt_settings,
+            validate_input,
+        )
+        if (cached_response := cache.get(cache_key)) is not None:
+            instrumentation.count("llm_response_cache", result="hit")
+            cached_response.problem_str = problem_formulation
+            return cached_response
+        instrumentation.count("llm_response_cache", result="miss")
+
+    client = client or get_async_client()
+
+    if similar is not None and problem_formulation:
+        llm_pyomo_model = await reuse_similar_model_async(
+            client, problem_formulation, similar
+        )
+        if llm_pyomo_model is not None:
+            if cache_key is not None:
+                # the input of a reused model is not validated, a later
+                # request with validation does not get it from the cache
+                unvalidated_key = make_cache_key(
+                    problem_formulation,
+                    GENERATION_MODEL,
+                    PROMPT_TEMPLATE_VERSION,
+                    llm_prompt_settings,
+                    validate_input=False,
+                )
+                cache.put(unvalidated_key, llm_pyomo_model)
+            return llm_pyomo_model
+
+    for _ in range(max_retries):
+        try:
+            llm_pyomo_model = await get_llm_pyomo_model_async(
+                client,
+                problem_formulation,
+                validate_input=validate_input,
+                llm_prompt_settings=llm_prompt_settings,
+            )
+            logging.debug(llm_pyomo_model.model_dump_json(indent=2))
+        except (*llm_errors(), InvalidInputError) as e:
+            llm_pyomo_model = LinearOptimizationModel.empty()
+            llm_pyomo_model.error_message = str(e)
+        else:
+            if cache_key is not None:
+                cache.put(cache_key, llm_pyomo_model)
+            if similar is not None:
+                similar.add(problem_formulation, llm_pyomo_model)
+            break
+
+    return llm_pyomo_model
+
+
+async def ask_llm_for_pyomo_models(
+    problem_formulations: Iterable[str],
+    concurrency: int = 8,
+    validate_input: bool = True,
+    max_retries: int = 1,
+    cache: ResponseCache | None = None,
+    client: "instructor.AsyncInstructor | None" = None,
+    profile: str = "full",
+    similar: SimilarityIndex | None = None,
+) -> list[LinearOptimizationModel]:
+    """`asyncio.gather` the responses for several problem formulations, with at
+    most `concurrency` problems in flight, in the order of the input"""
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    client = client or get_async_client()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ask(problem_formulation: str) -> LinearOptimizationModel:
+        async with semaphore:
+            return await ask_llm_for_pyomo_model_async(
+                problem_formulation,
+                validate_input=validate_input,
+                max_retries=max_retries,
+                cache=cache,
+                client=client,
+                profile=profile,
+                similar=similar,
+            )
+
+    return await asyncio.gather(*(ask(problem) for problem in problem_formulations))
@@ -1,45 +1,92 @@
-from httpx import HTTPStatusError
+import functools
 import inspect
-import instructor
-import instructor.exceptions
-import openai
+import json
 import os
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
+from typing import TYPE_CHECKING, Callable
 
 import logging
 
+from llm_optimizer.models.lean import (
+    LeanLinearOptimizationModel,
+    LeanLinearOptimizationModelWithFormulation,
+)
 from llm_optimizer.models.llm import LinearOptimizationModel, ValidationAnswer
-from llm_optimizer.models.base import AppSettings
+from llm_optimizer.models.base import get_settings
+from llm_optimizer.models.problem_data import (
+    ProblemData,
+    apply_problem_data,
+    marked_rules,
+)
+from llm_optimizer.llm.cache import ResponseCache, make_cache_key
+from llm_optimizer.llm.similarity import SimilarityIndex
+from llm_optimizer.utils import instrumentation
 
+# openai, instructor and httpx take most of the import time and are only
+# imported once the llm is asked, library use without the llm never loads them
+if TYPE_CHECKING:
+    import instructor
 
-SETTINGS = AppSettings()
-os.environ["OPENAI_API_KEY"] = SETTINGS.OPENAI_API_KEY
 
-logging.getLogger("openai._base_client").setLevel(logging.DEBUG)
-logging.basicConfig(level=logging.DEBUG)
+GENERATION_MODEL = "gpt-4o"
+VALIDATION_MODEL = "gpt-3.5-turbo"
+# only reads the data of a problem into the model of a similar one
+EXTRACTION_MODEL = "gpt-4o-mini"
+# bump whenever the generation prompt changes, so cached responses are not reused
+PROMPT_TEMPLATE_VERSION = "1"
+DEFAULT_LLM_PROMPT_SETTINGS = {
+    "temperature": 0.2,
+    "max_tokens": 2048,
+}
+# the settings of a prompt profile are part of the cache key, "full" asks
+# for the documented `LinearOptimizationModel`, "lean" for the compact
+# `LeanLinearOptimizationModel` without a latex formulation
+PROMPT_PROFILES = {
+    "full": DEFAULT_LLM_PROMPT_SETTINGS,
+    "lean": {**DEFAULT_LLM_PROMPT_SETTINGS, "profile": "lean", "formulation": False},
+    "lean_formulation": {
+        **DEFAULT_LLM_PROMPT_SETTINGS,
+        "profile": "lean",
+        "formulation": True,
+    },
+}
+# a repaired component is a fraction of a whole model
+REPAIR_MAX_TOKENS = 512
+# set members listed in the repair prompt
+REPAIR_SET_MEMBERS = 10
 
 
-def get_llm_pyomo_model(
-    client: instructor.Instructor,
-    user_input: str,
-    validate_input: bool = True,
-    llm_prompt_settings: dict = dict(temperature=0.2, max_tokens=2048),
-) -> LinearOptimizationModel:
-    if not user_input:
-        raise ValueError("No problem formulation given")
+@functools.lru_cache(maxsize=None)
+def llm_errors() -> tuple[type[Exception], ...]:
+    """the errors of a failed llm request, turned into an error message"""
+    from httpx import HTTPStatusError
 
-    if validate_input:
-        is_optimization_problem = validate_optimization_problem(user_input, client)
-        logging.debug(
-            f"The user input describes a valid linear optimization problem: {is_optimization_problem}"
-        )
+    try:
+        from instructor.core import InstructorRetryException
+    except ImportError:
+        # instructor before `instructor.core`, which deprecates this module
+        from instructor.exceptions import InstructorRetryException
 
-        if not is_optimization_problem.valid:
-            raise ValidationError(
-                f"Optimization problem not valid, reason: {is_optimization_problem.reason}"
-            )
+    return (HTTPStatusError, InstructorRetryException, ValidationError, ValueError)
 
-    prompt = inspect.cleandoc(f'''
+
+@functools.lru_cache(maxsize=None)
+def get_client() -> "instructor.Instructor":
+    """the instructor client shared by all requests of the process"""
+    import instructor
+    import openai
+
+    settings = get_settings()
+    os.environ["OPENAI_API_KEY"] = settings.OPENAI_API_KEY
+    logging.getLogger("openai._base_client").setLevel(logging.DEBUG)
+    return instructor.from_openai(
+        openai.OpenAI(api_key=settings.OPENAI_API_KEY),
+        mode=instructor.Mode.JSON,  # .TOOLS,
+    )
+
+
+def build_generation_prompt(user_input: str) -> str:
+    return inspect.cleandoc(f'''
         You are an AI assistant tasked with transfering a clients linear 
         optimization task into a mathematical formulation and a 
         python/ pyomo code snippet. Please use
@@ -65,10 +112,41 @@ def get_llm_pyomo_model(
         """
     ''')
 
-    pyomo_model: LinearOptimizationModel = client.chat.completions.create(
+
+def build_lean_generation_prompt(user_input: str, formulation: bool = False) -> str:
+    formulation_request = (
+        "Also give the latex mathematical formulation. " if formulation else ""
+    )
+    return inspect.cleandoc(f'''
+        Model this linear optimization task as a pyomo ConcreteModel `model`.
+        Set members are integers starting at 1. Parameter values are listed in
+        the order of their index set members, the last index changing fastest.
+        Constraint and objective bodies are python expressions of `model` and
+        the constraint's index arguments. Use parameters only if necessary.
+        {formulation_request}
+        task: """
+        {user_input}
+        """
+    ''')
+
+
+def generation_create_kwargs(user_input: str, llm_prompt_settings: dict) -> dict:
+    """the generation request of the prompt profile in `llm_prompt_settings`"""
+    if llm_prompt_settings.get("profile", "full") == "lean":
+        formulation = llm_prompt_settings.get("formulation", False)
+        prompt = build_lean_generation_prompt(user_input, formulation)
+        response_model = (
+            LeanLinearOptimizationModelWithFormulation
+            if formulation
+            else LeanLinearOptimizationModel
+        )
+    else:
+        prompt = build_generation_prompt(user_input)
+        response_model = LinearOptimizationModel
+    return dict(
         max_retries=1,
-        model="gpt-4o",
-        response_model=LinearOptimizationModel,
+        model=GENERATION_MODEL,
+        response_model=response_model,
         max_tokens=llm_prompt_settings.get("max_tokens", 1024),
         temperature=llm_prompt_settings.get("temperature", 0.2),
         messages=[
@@ -78,15 +156,26 @@ def get_llm_pyomo_model(
             }
         ],
     )
-    pyomo_model.problem_str = user_input
 
-    return pyomo_model
 
+def as_linear_optimization_model(response: BaseModel) -> LinearOptimizationModel:
+    """the `LinearOptimizationModel` of a full or a lean response"""
+    if isinstance(response, LeanLinearOptimizationModel):
+        return response.to_model()
+    return response
 
-def validate_optimization_problem(
-    user_input: str, client: instructor.Instructor
-) -> ValidationAnswer:
-    prompt = inspect.cleandoc(f'''
+
+def request_characters(user_input: str, profile: str = "full") -> int:
+    """the characters of the generation prompt and of the response schema
+    instructor adds to the request in json mode, to compare the profiles
+    without sending a request"""
+    create_kwargs = generation_create_kwargs(user_input, PROMPT_PROFILES[profile])
+    schema = json.dumps(create_kwargs["response_model"].model_json_schema(), indent=2)
+    return len(create_kwargs["messages"][0]["content"]) + len(schema)
+
+
+def build_validation_prompt(user_input: str) -> str:
+    return inspect.cleandoc(f'''
     Your job is to validate the given input and check wether it can be mathematically modeled
     by an optimization model whose requirements and objective are represented 
     by linear relationships (linear optimization) or not.
@@ -95,28 +184,291 @@ def validate_optimization_problem(
     """
     ''')
 
-    return client.chat.completions.create(
+
+def _declarations(llm_pyomo_model: LinearOptimizationModel) -> str:
+    """the components rules may refer to, one line each"""
+    lines = []
+    for pyo_set in llm_pyomo_model.sets:
+        members = sorted(pyo_set.initialize)
+        shown = ", ".join(str(member) for member in members[:REPAIR_SET_MEMBERS])
+        more = (
+            f", ... ({len(members)} members)"
+            if len(members) > REPAIR_SET_MEMBERS
+            else ""
+        )
+        lines.append(f"- set model.{pyo_set.name}: [{shown}{more}]")
+    for pyo_param in llm_pyomo_model.parameters:
+        lines.append(f"- param model.{pyo_param.name} indexed by {pyo_param.indexes}")
+    for pyo_var in llm_pyomo_model.variables:
+        lines.append(
+            f"- var model.{pyo_var.name} indexed by {pyo_var.indexes}, "
+            f"domain {pyo_var.domain}"
+        )
+    return "\n".join(lines)
+
+
+def build_repair_prompt(
+    llm_pyomo_model: LinearOptimizationModel, kind: str, name: str, error: str
+) -> str:
+    component = llm_pyomo_model.component(kind, name)
+    return inspect.cleandoc(f'''
+        The {kind} `{name}` of a pyomo model failed to build with the error:
+        """
+        {error}
+        """
+
+        {kind}: """
+        {component.model_dump_json()}
+        """
+
+        declared model components: """
+        {_declarations(llm_pyomo_model)}
+        """
+
+        Return only the corrected {kind} in the given response format and keep
+        its name. Rules are python lambda functions of `model` and the index
+        arguments that only use the declared model components.
+    ''')
+
+
+def repair_create_kwargs(
+    llm_pyomo_model: LinearOptimizationModel, kind: str, name: str, error: str
+) -> dict:
+    """the request for a corrected component, with only that component's
+    schema as response model"""
+    return dict(
         max_retries=1,
-        model="gpt-3.5-turbo",
-        response_model=ValidationAnswer,
+        model=GENERATION_MODEL,
+        response_model=type(llm_pyomo_model.component(kind, name)),
+        max_tokens=REPAIR_MAX_TOKENS,
         temperature=0,
         messages=[
             {
                 "role": "user",
-                "content": prompt,
+                "content": build_repair_prompt(llm_pyomo_model, kind, name, error),
             }
         ],
     )
 
 
+def repair_component(
+    client: "instructor.Instructor",
+    llm_pyomo_model: LinearOptimizationModel,
+    kind: str,
+    name: str,
+    error: str,
+) -> BaseModel:
+    """ask for a corrected version of the component that failed with `error`"""
+    with instrumentation.span(
+        "repair_component", model=GENERATION_MODEL, kind=kind, component=name
+    ):
+        component = client.chat.completions.create(
+            **repair_create_kwargs(llm_pyomo_model, kind, name, error)
+        )
+        instrumentation.record_usage(component, GENERATION_MODEL)
+    if kind != "objective":
+        # the other components may refer to it by name
+        component.name = name
+    return component
+
+
+def build_extraction_prompt(
+    user_input: str, llm_pyomo_model: LinearOptimizationModel
+) -> str:
+    marked = marked_rules(llm_pyomo_model)
+    lines = [
+        f"- set {pyo_set.name}: {pyo_set.doc}"
+        for pyo_set in marked.sets
+        if pyo_set.source is None
+    ]
+    lines.extend(
+        f"- param {pyo_param.name} indexed by {pyo_param.indexes}: {pyo_param.doc}"
+        for pyo_param in marked.parameters
+        if pyo_param.source is None
+    )
+    lines.extend(
+        f"- constraint {pyo_constr.name}: {pyo_constr.rule.lambda_body}"
+        for pyo_constr in marked.constraints
+    )
+    lines.append(
+        f"- objective: {marked.objective.expr or marked.objective.rule} "
+        f"({marked.objective.optimization_sense.value})"
+    )
+    model_lines = "\n".join(lines)
+    return inspect.cleandoc(f'''
+        The following pyomo model was generated for a similar optimization
+        task. Give the data of the new task for it: the integer members of
+        every set, starting at 1, the values of every parameter in the order
+        of its index set members, the last index changing fastest, and the
+        value of every numbered constant <c1>, <c2>, ... of the rules.
+
+        model: """
+        {model_lines}
+        """
+
+        task: """
+        {user_input}
+        """
+    ''')
+
+
+def extraction_create_kwargs(
+    user_input: str, llm_pyomo_model: LinearOptimizationModel
+) -> dict:
+    """the request for the data of a problem in the structure of the model of
+    a similar problem"""
+    return dict(
+        max_retries=1,
+        model=EXTRACTION_MODEL,
+        response_model=ProblemData,
+        max_tokens=DEFAULT_LLM_PROMPT_SETTINGS["max_tokens"],
+        temperature=0,
+        messages=[
+            {
+                "role": "user",
+                "content": build_extraction_prompt(user_input, llm_pyomo_model),
+            }
+        ],
+    )
+
+
+def extract_problem_data(
+    client: "instructor.Instructor",
+    user_input: str,
+    llm_pyomo_model: LinearOptimizationModel,
+) -> LinearOptimizationModel:
+    """the model of a similar problem with the data of `user_input`, raises
+    `ValueError` if the data does not fit the model"""
+    with instrumentation.span("extract_problem_data", model=EXTRACTION_MODEL):
+        data = client.chat.completions.create(
+            **extraction_create_kwargs(user_input, llm_pyomo_model)
+        )
+        instrumentation.record_usage(data, EXTRACTION_MODEL)
+    extracted = apply_problem_data(llm_pyomo_model, data)
+    extracted.problem_str = user_input
+    return extracted
+
+
+def reuse_similar_model(
+    client: "instructor.Instructor", user_input: str, similar: SimilarityIndex
+) -> LinearOptimizationModel | None:
+    """the model of the most similar indexed problem with the data of
+    `user_input`, `None` if no problem is similar enough or its model does
+    not fit the data"""
+    similar_problem = similar.lookup(user_input)
+    if similar_problem is None:
+        instrumentation.count("similar_problem", result="miss")
+        return None
+    try:
+        llm_pyomo_model = extract_problem_data(
+            client, user_input, similar_problem.llm_pyomo_model
+        )
+    except llm_errors() as e:
+        logging.debug(f"the model of the similar problem does not fit: {e}")
+        instrumentation.count("similar_problem", result="unfit")
+        return None
+    instrumentation.count("similar_problem", result="hit")
+    return llm_pyomo_model
+
+
+def stream_llm_pyomo_model(
+    client: "instructor.Instructor",
+    on_partial: Callable[[BaseModel], None],
+    **create_kwargs,
+) -> LinearOptimizationModel:
+    """stream the response with instructor's partial mode, `on_partial` gets
+    every partial model as the tokens arrive"""
+    partial_model = None
+    for partial_model in client.chat.completions.create_partial(**create_kwargs):
+        on_partial(partial_model)
+    if partial_model is None:
+        raise ValueError("Empty response from the llm")
+    return create_kwargs["response_model"].model_validate(partial_model.model_dump())
+
+
+def get_llm_pyomo_model(
+    client: "instructor.Instructor",
+    user_input: str,
+    validate_input: bool = True,
+    llm_prompt_settings: dict = dict(temperature=0.2, max_tokens=2048),
+    on_partial: Callable[[BaseModel], None] | None = None,
+) -> LinearOptimizationModel:
+    if not user_input:
+        raise ValueError("No problem formulation given")
+
+    if validate_input:
+        is_optimization_problem = validate_optimization_problem(user_input, client)
+        logging.debug(
+            f"The user input describes a valid linear optimization problem: {is_optimization_problem}"
+        )
+
+        if not is_optimization_problem.valid:
+            raise ValidationError(
+                f"Optimization problem not valid, reason: {is_optimization_problem.reason}"
+            )
+
+    create_kwargs = generation_create_kwargs(user_input, llm_prompt_settings)
+    profile = llm_prompt_settings.get("profile", "full")
+    with instrumentation.span(
+        "get_llm_pyomo_model",
+        model=GENERATION_MODEL,
+        streamed=on_partial is not None,
+        profile=profile,
+    ):
+        if on_partial is None:
+            response = client.chat.completions.create(**create_kwargs)
+        else:
+            response = stream_llm_pyomo_model(client, on_partial, **create_kwargs)
+        instrumentation.record_usage(response, GENERATION_MODEL, profile=profile)
+    pyomo_model = as_linear_optimization_model(response)
+    pyomo_model.problem_str = user_input
+
+    return pyomo_model
+
+
+def validate_optimization_problem(
+    user_input: str, client: "instructor.Instructor"
+) -> ValidationAnswer:
+    prompt = build_validation_prompt(user_input)
+
+    with instrumentation.span("validate_optimization_problem", model=VALIDATION_MODEL):
+        validation_answer = client.chat.completions.create(
+            max_retries=1,
+            model=VALIDATION_MODEL,
+            response_model=ValidationAnswer,
+            temperature=0,
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+        )
+        instrumentation.record_usage(validation_answer, VALIDATION_MODEL)
+    return validation_answer
+
+
 def ask_llm_for_pyomo_model(
     problem_formulation: str,
     validate_input: bool = True,
     max_retries: int = 1,
     mock: bool = False,
+    cache: ResponseCache | None = None,
+    on_partial: Callable[[BaseModel], None] | None = None,
+    profile: str = "full",
+    similar: SimilarityIndex | None = None,
 ) -> LinearOptimizationModel:
+    """`on_partial` streams the response and is called with every partial
+    model, it is not called for mocked and cached responses, `profile` is
+    one of `PROMPT_PROFILES`
+
+    with a `similar` index the model of a similar problem is reused with
+    the data of this one, which a cheap request extracts without validating
+    the input again, generated models are added to the index"""
     if max_retries < 0:
         raise ValueError
+    if profile not in PROMPT_PROFILES:
+        raise ValueError(f"unknown prompt profile `{profile}`")
 
     if mock:
         import json
@@ -128,15 +480,40 @@ def ask_llm_for_pyomo_model(
 
         return mocked_response
 
-    client: instructor.Instructor = instructor.from_openai(
-        openai.OpenAI(api_key=SETTINGS.OPENAI_API_KEY),
-        mode=instructor.Mode.JSON,  # .TOOLS,
-    )
+    llm_prompt_settings = PROMPT_PROFILES[profile]
+
+    cache_key = None
+    if cache is not None and problem_formulation:
+        cache_key = make_cache_key(
+            problem_formulation,
+            GENERATION_MODEL,
+            PROMPT_TEMPLATE_VERSION,
+            llm_prompt_settings,
+            validate_input,
+        )
+        if (cached_response := cache.get(cache_key)) is not None:
+            instrumentation.count("llm_response_cache", result="hit")
+            cached_response.problem_str = problem_formulation
+            return cached_response
+        instrumentation.count("llm_response_cache", result="miss")
+
+    client = get_client()
 
-    llm_prompt_settings = {
-        "temperature": 0.2,
-        "max_tokens": 2048,
-    }
+    if similar is not None and problem_formulation:
+        llm_pyomo_model = reuse_similar_model(client, problem_formulation, similar)
+        if llm_pyomo_model is not None:
+            if cache_key is not None:
+                # the input of a reused model is not validated, a later
+                # request with validation does not get it from the cache
+                unvalidated_key = make_cache_key(
+                    problem_formulation,
+                    GENERATION_MODEL,
+                    PROMPT_TEMPLATE_VERSION,
+                    llm_prompt_settings,
+                    validate_input=False,
+                )
+                cache.put(unvalidated_key, llm_pyomo_model)
+            return llm_pyomo_model
 
     for _ in range(max_retries):
         try:
@@ -145,17 +522,17 @@ def ask_llm_for_pyomo_model(
                 problem_formulation,
                 validate_input=validate_input,
                 llm_prompt_settings=llm_prompt_settings,
+                on_partial=on_partial,
             )
             logging.debug(llm_pyomo_model.model_dump_json(indent=2))
-        except (
-            HTTPStatusError,
-            instructor.exceptions.InstructorRetryException,
-            ValidationError,
-            ValueError,
-        ) as e:
+        except llm_errors() as e:
             llm_pyomo_model = LinearOptimizationModel.empty()
             llm_pyomo_model.error_message = str(e)
         else:
+            if cache_key is not None:
+                cache.put(cache_key, llm_pyomo_model)
+            if similar is not None:
+                similar.add(problem_formulation, llm_pyomo_model)
             break
 
     return llm_pyomo_model
@@ -0,0 +1,177 @@
+"""a local index of solved problem texts to find the model of a similar
+problem, e.g. the same template with other numbers
+
+    index = SimilarityIndex()
+    index.add(problem_formulation, llm_pyomo_model)
+    similar = index.lookup(new_problem_formulation)
+
+the texts are compared by the cosine similarity of their tf-idf weighted
+words and word pairs, numbers are all the same word, so problems that only
+differ in their data are the most similar ones"""
+
+import hashlib
+import json
+import logging
+import math
+import re
+import sqlite3
+import time
+from collections import Counter
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from llm_optimizer.llm.cache import DEFAULT_CACHE_PATH, normalize_problem_text
+from llm_optimizer.models.llm import LinearOptimizationModel
+
+
+DEFAULT_INDEX_PATH = DEFAULT_CACHE_PATH.parent / "problems.sqlite3"
+# below this similarity the model of the stored problem is not reused
+SIMILARITY_THRESHOLD = 0.9
+
+_TOKEN = re.compile(r"[^\W\d_]+|\d+(?:[.,]\d+)*")
+_NUMBER = "<number>"
+
+
+def problem_terms(problem_formulation: str) -> Counter:
+    """the words and word pairs of a problem text, numbers replaced by one
+    word"""
+    words = [
+        _NUMBER if token[0].isdigit() else token
+        for token in _TOKEN.findall(problem_formulation.lower())
+    ]
+    return Counter(
+        words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    )
+
+
+def _weights(terms: Counter, idf: dict[str, float], default_idf: float) -> dict:
+    weights = {
+        term: count * idf.get(term, default_idf) for term, count in terms.items()
+    }
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {term: weight / norm for term, weight in weights.items()} if norm else {}
+
+
+@dataclass
+class SimilarProblem:
+    similarity: float
+    problem_str: str
+    llm_pyomo_model: LinearOptimizationModel
+
+
+class SimilarityIndex:
+    """SQLite backed index of problem texts and the models generated for them,
+    the `max_entries` most recently added are kept"""
+
+    def __init__(
+        self,
+        path: Path | str = DEFAULT_INDEX_PATH,
+        max_entries: Optional[int] = 1000,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS problems (
+                    key TEXT PRIMARY KEY,
+                    problem TEXT NOT NULL,
+                    terms TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # a short lived connection per operation, as in `ResponseCache`
+        return sqlite3.connect(self.path, timeout=10)
+
+    def add(
+        self, problem_formulation: str, llm_pyomo_model: LinearOptimizationModel
+    ) -> None:
+        if llm_pyomo_model.error_message:
+            raise ValueError("Only valid responses can be indexed.")
+
+        problem = normalize_problem_text(problem_formulation)
+        key = hashlib.sha256(problem.encode("utf-8")).hexdigest()
+        payload = llm_pyomo_model.model_dump_json(exclude={"problem_str"})
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO problems VALUES (?, ?, ?, ?, ?)",
+                (
+                    key,
+                    problem,
+                    json.dumps(problem_terms(problem)),
+                    payload,
+                    time.time(),
+                ),
+            )
+            if self.max_entries is not None:
+                conn.execute(
+                    """DELETE FROM problems WHERE key NOT IN (
+                        SELECT key FROM problems ORDER BY created_at DESC LIMIT ?
+                    )""",
+                    (self.max_entries,),
+                )
+
+    def lookup(
+        self, problem_formulation: str, threshold: float = SIMILARITY_THRESHOLD
+    ) -> Optional[SimilarProblem]:
+        """the most similar stored problem, `None` if none reaches `threshold`"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT key, terms FROM problems").fetchall()
+        if not rows:
+            return None
+
+        documents = {key: Counter(json.loads(terms)) for key, terms in rows}
+        document_frequency = Counter(
+            term for terms in documents.values() for term in terms
+        )
+        # smoothed as if the query were one more document
+        idf = {
+            term: math.log((1 + len(documents)) / (1 + frequency)) + 1
+            for term, frequency in document_frequency.items()
+        }
+        default_idf = math.log(1 + len(documents)) + 1
+        query = _weights(
+            problem_terms(normalize_problem_text(problem_formulation)), idf, default_idf
+        )
+
+        def similarity(terms: Counter) -> float:
+            weights = _weights(terms, idf, default_idf)
+            return sum(
+                weight * weights.get(term, 0.0) for term, weight in query.items()
+            )
+
+        best_key, best_similarity = max(
+            ((key, similarity(terms)) for key, terms in documents.items()),
+            key=lambda item: item[1],
+        )
+        logging.debug(f"most similar problem: {best_key} ({best_similarity:.3f})")
+        if best_similarity < threshold:
+            return None
+
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT problem, payload FROM problems WHERE key = ?", (best_key,)
+            ).fetchone()
+        if row is None:
+            # evicted in the meantime
+            return None
+        problem, payload = row
+        return SimilarProblem(
+            best_similarity,
+            problem,
+            LinearOptimizationModel.model_validate_json(payload),
+        )
+
+    def clear(self) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM problems")
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM problems").fetchone()[0]
@@ -1,12 +1,30 @@
+import functools
+import os
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+SOLVER_BACKENDS = ("pyomo", "highs")
+
+
 class AppSettings(BaseSettings):
     OPENAI_API_KEY: str
     LOG_LEVEL: str
     model_config = SettingsConfigDict(env_file=".env")
 
 
+@functools.lru_cache(maxsize=None)
+def get_settings() -> AppSettings:
+    """the settings, read from the environment and `.env` on first use"""
+    return AppSettings()
+
+
+def get_log_level() -> str:
+    """`LOG_LEVEL` of the environment, `WARNING` without it; the command line
+    tools run without the llm and so without the other settings"""
+    return os.environ.get("LOG_LEVEL", "WARNING")
+
+
 class InvalidInputError(Exception):
     def __init__(self, message="Invalid input provided."):
         self.message = message
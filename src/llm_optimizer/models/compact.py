@@ -0,0 +1,127 @@
+"""compact set members and parameter values of large models: a set of
+contiguous integers is kept as a `range`, a parameter with a number for every
+key of its index sets is kept as an array instead of a dict of boxed keys and
+values; the pyomo build gets plain members and dicts from them
+
+    compact_members({1, 2, ..., n})  # range(1, n + 1)
+    dense_param_data(initialize, [members_i, members_j])  # a DenseParamData
+
+only data of at least `COMPACT_MIN_SIZE` members or values is compacted, a
+small model keeps its sets and dicts as the llm wrote them"""
+
+import itertools
+import math
+from collections.abc import Collection, Mapping, Sequence
+from typing import Any, Iterator
+
+import numpy as np
+
+
+COMPACT_MIN_SIZE = 1_000
+
+
+def compact_members(members: Collection[int]) -> Collection[int]:
+    """a range of at least `COMPACT_MIN_SIZE` distinct contiguous integers,
+    other members unchanged"""
+    if isinstance(members, range) or len(members) < COMPACT_MIN_SIZE:
+        return members
+    first, last = min(members), max(members)
+    if last - first + 1 != len(members):
+        return members
+    return range(first, last + 1)
+
+
+class DenseParamData(Mapping):
+    """the values of a parameter in an array with one axis per index set, in
+    the order of the set members"""
+
+    def __init__(self, array: np.ndarray, index_members: Sequence[Sequence[Any]]):
+        shape = tuple(len(members) for members in index_members)
+        if array.shape != shape:
+            raise ValueError(
+                f"an array of shape {array.shape} does not match index sets of "
+                f"sizes {shape}"
+            )
+        self.array = array
+        self.index_members = index_members
+        # the position of a member along each axis, of a range computed
+        # instead of kept in a dict
+        self._position_of = [
+            members.index
+            if isinstance(members, range)
+            else {member: position for position, member in enumerate(members)}.get
+            for members in index_members
+        ]
+        self._item = array.item
+
+    def __getitem__(self, key: Any) -> float:
+        # the common one and two index sets without a loop, a value is looked
+        # up for every key while building
+        position_of = self._position_of
+        try:
+            if len(position_of) == 1:
+                member = key[0] if isinstance(key, tuple) and len(key) == 1 else key
+                return self._item(position_of[0](member))
+            if len(position_of) == 2:
+                first, second = key
+                return self._item(position_of[0](first), position_of[1](second))
+            if len(key) != len(position_of):
+                raise KeyError(key)
+            return self._item(
+                *[position(member) for position, member in zip(position_of, key)]
+            )
+        except (TypeError, ValueError):
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[Any]:
+        if len(self.index_members) == 1:
+            return iter(self.index_members[0])
+        return itertools.product(*self.index_members)
+
+    def __len__(self) -> int:
+        return self.array.size
+
+    def __eq__(self, other: object) -> bool:
+        # the arrays are compared at once if the members are the same
+        if isinstance(other, DenseParamData) and [
+            list(members) for members in self.index_members
+        ] == [list(members) for members in other.index_members]:
+            return bool(np.array_equal(self.array, other.array))
+        return super().__eq__(other)
+
+    def to_dict(self) -> dict[Any, float]:
+        """the values by key, all read from the array at once"""
+        return dict(zip(self, self.array.ravel().tolist()))
+
+    def __repr__(self) -> str:
+        return f"DenseParamData(shape={self.array.shape}, dtype={self.array.dtype})"
+
+
+def dense_param_data(
+    initialize: Mapping, index_members: Sequence[Collection[int]]
+) -> DenseParamData | None:
+    """the values of a parameter as an array, if there are at least
+    `COMPACT_MIN_SIZE` of them and a number for every key of the index sets,
+    otherwise `None`"""
+    size = math.prod(len(members) for members in index_members)
+    if size < COMPACT_MIN_SIZE or len(initialize) != size:
+        return None
+    index_members = [
+        members if isinstance(members, range) else sorted(members)
+        for members in index_members
+    ]
+    keys = (
+        index_members[0]
+        if len(index_members) == 1
+        else itertools.product(*index_members)
+    )
+    try:
+        array = np.array([initialize[key] for key in keys])
+    except KeyError:
+        return None
+    # e.g. bools, strings or integers beyond int64 stay in their dict
+    if array.dtype.kind not in "iuf":
+        return None
+    return DenseParamData(
+        array.reshape([len(members) for members in index_members]), index_members
+    )
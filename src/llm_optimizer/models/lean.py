@@ -0,0 +1,206 @@
+"""a compact response format for the generation request: no field
+descriptions and docs, the latex formulation only if asked for and the
+parameter values as a flat list instead of a dict keyed by index strings,
+converted to a `LinearOptimizationModel` right after the response"""
+
+import itertools
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from llm_optimizer.models.llm import (
+    DataSource,
+    LinearOptimizationModel,
+    OptimizationSense,
+)
+
+
+class LeanSet(BaseModel):
+    name: str
+    members: list[int] = []
+    source: Optional[DataSource] = None
+
+
+class LeanParam(BaseModel):
+    name: str
+    # at least one, like `PyomoParam.indexes`
+    indexes: list[str] = Field(..., min_length=1)
+    # in the order of the index set members, the last index changing fastest
+    values: list[float] = []
+    within: Optional[str] = None
+    source: Optional[DataSource] = None
+
+
+class LeanVar(BaseModel):
+    name: str
+    indexes: list[str] = []
+    domain: Optional[str] = None
+
+
+class LeanConstraint(BaseModel):
+    name: str
+    idxs: list[str] = []
+    # lambda arguments and body
+    args: list[str]
+    body: str
+
+
+class LeanObjective(BaseModel):
+    expr: str
+    sense: OptimizationSense
+
+
+class LeanLinearOptimizationModel(BaseModel):
+    sets: list[LeanSet]
+    parameters: list[LeanParam]
+    variables: list[LeanVar]
+    constraints: list[LeanConstraint]
+    objective: LeanObjective
+
+    @model_validator(mode="after")
+    def check_parameter_values(self) -> "LeanLinearOptimizationModel":
+        # the size of a set read from a file is not known yet
+        sizes = {
+            lean_set.name: None if lean_set.source else len(lean_set.members)
+            for lean_set in self.sets
+        }
+        for lean_param in self.parameters:
+            if lean_param.source is not None:
+                continue
+            expected = 1
+            for index in lean_param.indexes:
+                if (set_name := index.split(".")[-1]) not in sizes:
+                    raise ValueError(
+                        f"parameter `{lean_param.name}`: unknown set `{set_name}`"
+                    )
+                if sizes[set_name] is None:
+                    raise ValueError(
+                        f"parameter `{lean_param.name}` is indexed by the set "
+                        f"`{set_name}` of a data file and needs a `source` too"
+                    )
+                expected *= sizes[set_name]
+            if len(lean_param.values) != expected:
+                raise ValueError(
+                    f"parameter `{lean_param.name}` needs {expected} values, one "
+                    f"per member of {lean_param.indexes}, got "
+                    f"{len(lean_param.values)}"
+                )
+        return self
+
+    def to_model(self) -> LinearOptimizationModel:
+        members = {lean_set.name: lean_set.members for lean_set in self.sets}
+        return LinearOptimizationModel(
+            mathematical_formulation=getattr(self, "mathematical_formulation", ""),
+            objective={
+                "expr": self.objective.expr,
+                "optimization_sense": self.objective.sense,
+                "doc": "",
+            },
+            sets=[
+                {
+                    "name": lean_set.name,
+                    "initialize": lean_set.members,
+                    "doc": "",
+                    "source": lean_set.source,
+                }
+                for lean_set in self.sets
+            ],
+            parameters=[
+                {
+                    "name": lean_param.name,
+                    "indexes": lean_param.indexes,
+                    "initialize": {}
+                    if lean_param.source
+                    else dict(
+                        zip(
+                            index_keys(members, lean_param.indexes),
+                            lean_param.values,
+                        )
+                    ),
+                    "within": lean_param.within,
+                    "doc": "",
+                    "source": lean_param.source,
+                }
+                for lean_param in self.parameters
+            ],
+            variables=[
+                {**lean_var.model_dump(), "doc": ""} for lean_var in self.variables
+            ],
+            constraints=[
+                {
+                    "name": lean_constr.name,
+                    "idxs": lean_constr.idxs,
+                    "rule": {
+                        "lambda_arguments": lean_constr.args,
+                        "lambda_body": lean_constr.body,
+                    },
+                    "doc": "",
+                }
+                for lean_constr in self.constraints
+            ],
+        )
+
+    @classmethod
+    def from_model(
+        cls, llm_pyomo_model: LinearOptimizationModel
+    ) -> "LeanLinearOptimizationModel":
+        """the lean form of a model, e.g. to compare the size of a response"""
+        members = {
+            pyo_set.name: sorted(pyo_set.initialize) for pyo_set in llm_pyomo_model.sets
+        }
+        objective = llm_pyomo_model.objective
+        return cls(
+            sets=[
+                {
+                    "name": pyo_set.name,
+                    "members": members[pyo_set.name],
+                    "source": pyo_set.source,
+                }
+                for pyo_set in llm_pyomo_model.sets
+            ],
+            parameters=[
+                {
+                    "name": pyo_param.name,
+                    "indexes": pyo_param.indexes,
+                    "values": []
+                    if pyo_param.source
+                    else [
+                        pyo_param.initialize.get(key, 0)
+                        for key in index_keys(members, pyo_param.indexes)
+                    ],
+                    "within": pyo_param.within,
+                    "source": pyo_param.source,
+                }
+                for pyo_param in llm_pyomo_model.parameters
+            ],
+            variables=[
+                pyo_var.model_dump(exclude={"doc"})
+                for pyo_var in llm_pyomo_model.variables
+            ],
+            constraints=[
+                {
+                    "name": pyo_constr.name,
+                    "idxs": pyo_constr.idxs,
+                    "args": pyo_constr.rule.lambda_arguments,
+                    "body": pyo_constr.rule.lambda_body,
+                }
+                for pyo_constr in llm_pyomo_model.constraints
+            ],
+            objective={
+                "expr": objective.expr or objective.rule,
+                "sense": objective.optimization_sense,
+            },
+        )
+
+
+class LeanLinearOptimizationModelWithFormulation(LeanLinearOptimizationModel):
+    mathematical_formulation: str
+
+
+def index_keys(members: dict[str, list[int]], indexes: list[str]) -> list[Any]:
+    """the keys of a parameter indexed by sets with the given members, in the
+    order its values are listed"""
+    index_members = [members[index.split(".")[-1]] for index in indexes]
+    if len(index_members) == 1:
+        return list(index_members[0])
+    return list(itertools.product(*index_members))
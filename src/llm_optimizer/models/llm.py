@@ -1,8 +1,21 @@
 from enum import Enum
 from typing import Any, Optional, Union
-from pydantic import BaseModel, Field, field_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    field_serializer,
+    field_validator,
+    model_validator,
+)
 from pydantic.json_schema import SkipJsonSchema
 
+from llm_optimizer.models.compact import (
+    DenseParamData,
+    compact_members,
+    dense_param_data,
+)
+
 
 class ValidationAnswer(BaseModel):
     valid: bool
@@ -29,12 +42,52 @@ class Rule(BaseModel):
     )  # , variables must be attributes of the `model` instance and/ or function arguments")
 
 
+class DataSource(BaseModel):
+    file: str = Field(..., description="name of an attached data file")
+    columns: list[str] = Field(
+        default_factory=list,
+        description="table columns: the members column of a set, or one column per index followed by the value column of a parameter, none for a .npy array",
+    )
+    # set by `attach_data_files`, the llm only knows the file name
+    path: SkipJsonSchema[Union[str, None]] = None
+
+
+def check_initialize_or_source(component: BaseModel) -> None:
+    """the schema cannot require one of two fields, a set or parameter
+    without members or values is rejected here, so instructor asks again"""
+    if component.source is None and "initialize" not in component.model_fields_set:
+        raise ValueError("`initialize` or `source` is required")
+    if component.source is not None and component.initialize:
+        raise ValueError("only one of `initialize` and `source` can be given")
+
+
 class PyomoSet(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     name: str
-    initialize: set[int] = Field(
-        ..., description="A list containing the initial members of the Set"
+    # many contiguous members are kept as a range, see `compact_members`
+    initialize: Union[set[int], SkipJsonSchema[range]] = Field(
+        default_factory=set,
+        description="A list containing the initial members of the Set",
     )
     doc: str = Field(..., description="short description")
+    source: Optional[DataSource] = Field(
+        default=None,
+        description="data file the members are read from, instead of `initialize`",
+    )
+
+    @field_validator("initialize")
+    def compact_initialization(cls, members):
+        return compact_members(members)
+
+    @field_serializer("initialize", when_used="json")
+    def serialize_initialization(self, members) -> list[int]:
+        return list(members)
+
+    @model_validator(mode="after")
+    def check_members(self) -> "PyomoSet":
+        check_initialize_or_source(self)
+        return self
 
 
 class PyomoVar(BaseModel):
@@ -50,21 +103,33 @@ class PyomoVar(BaseModel):
 
 
 class PyomoParam(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     name: str
     indexes: list[str] = Field(
         ...,
         min_items=1,
         description="a list of minimum 1 pyomo set name, by which the parameter is indexed.",
     )
-    initialize: dict[Union[int, tuple[int, ...]], Any] = Field(
-        ...,
+    # the values of large dense parameters are kept in an array, see
+    # `LinearOptimizationModel.compact_parameters`
+    initialize: Union[
+        dict[Union[int, tuple[int, ...]], Any], SkipJsonSchema[DenseParamData]
+    ] = Field(
+        default_factory=dict,
         description="data dict for parameter initialization with `index` values as keys.",
     )  # or rule: rule is currently not possible
     within: Optional[str]
     doc: str = Field(..., description="short description")
+    source: Optional[DataSource] = Field(
+        default=None,
+        description="data file the values are read from, instead of `initialize`",
+    )
 
     @field_validator("initialize", mode="before")
     def check_parameter_initialization(cls, init_dict):
+        if isinstance(init_dict, DenseParamData):
+            return init_dict
         if not isinstance(init_dict, dict):
             raise ValueError("must be a dictionary")
         if any((value is None for value in init_dict)):
@@ -73,6 +138,17 @@ class PyomoParam(BaseModel):
             return {cls.convert_key(key): value for key, value in init_dict.items()}
         return init_dict
 
+    @field_serializer("initialize", when_used="json")
+    def serialize_initialization(
+        self, init_dict
+    ) -> dict[Union[int, tuple[int, ...]], Any]:
+        return init_dict if isinstance(init_dict, dict) else dict(init_dict.items())
+
+    @model_validator(mode="after")
+    def check_values(self) -> "PyomoParam":
+        check_initialize_or_source(self)
+        return self
+
     @staticmethod
     def convert_key(key: str) -> int | tuple[int]:
         try:
@@ -112,6 +188,16 @@ class ObjectiveFunction(BaseModel):
     doc: str = Field(..., description="short description")
 
 
+# the field of `LinearOptimizationModel` per kind of component
+COMPONENT_FIELDS = {
+    "set": "sets",
+    "variable": "variables",
+    "parameter": "parameters",
+    "constraint": "constraints",
+    "objective": "objective",
+}
+
+
 class LinearOptimizationModel(BaseModel):
     mathematical_formulation: str = Field(
         ...,
@@ -135,6 +221,54 @@ class LinearOptimizationModel(BaseModel):
     problem_str: SkipJsonSchema[Union[str, None]] = None
     error_message: SkipJsonSchema[Union[str, None]] = None
 
+    @model_validator(mode="after")
+    def compact_parameters(self) -> "LinearOptimizationModel":
+        """the values of large parameters with a number for every key of
+        their index sets as an array, see `dense_param_data`"""
+        members = {
+            pyo_set.name: pyo_set.initialize
+            for pyo_set in self.sets or []
+            if pyo_set.source is None
+        }
+        for pyo_param in self.parameters or []:
+            if pyo_param.source is not None or not isinstance(
+                pyo_param.initialize, dict
+            ):
+                continue
+            index_names = [index.split(".")[-1] for index in pyo_param.indexes or []]
+            if not all(name in members for name in index_names):
+                continue
+            data = dense_param_data(
+                pyo_param.initialize, [members[name] for name in index_names]
+            )
+            if data is not None:
+                pyo_param.initialize = data
+        return self
+
+    def component(self, kind: str, name: str) -> BaseModel:
+        """a component by its kind, as in `COMPONENT_FIELDS`, and name"""
+        if kind == "objective":
+            return self.objective
+        for component in getattr(self, COMPONENT_FIELDS[kind]):
+            if component.name == name:
+                return component
+        raise KeyError(f"no {kind} `{name}`")
+
+    def replace_component(
+        self, kind: str, name: str, component: BaseModel
+    ) -> "LinearOptimizationModel":
+        """a copy with the component of that kind and name replaced"""
+        llm_pyomo_model = self.model_copy(deep=True)
+        if kind == "objective":
+            llm_pyomo_model.objective = component
+            return llm_pyomo_model
+        components = getattr(llm_pyomo_model, COMPONENT_FIELDS[kind])
+        for position, existing in enumerate(components):
+            if existing.name == name:
+                components[position] = component
+                return llm_pyomo_model
+        raise KeyError(f"no {kind} `{name}`")
+
     @classmethod
     def empty(cls) -> "LinearOptimizationModel":  # Self
         return cls(
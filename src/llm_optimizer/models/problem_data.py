@@ -0,0 +1,194 @@
+"""the numeric data of a problem apart from the structure of its model: the
+set members, the parameter values and the number constants in the rules
+
+a model generated for a similar problem is reused with the data of a new
+problem, which a cheap request extracts from the problem text
+
+    data = ProblemData(sets=[...], parameters=[...], constants=[...])
+    llm_pyomo_model = apply_problem_data(similar_llm_pyomo_model, data)
+
+the constants of the rules are numbered in the order of `rule_constants`,
+index literals inside `[...]` are part of the structure"""
+
+import ast
+from dataclasses import dataclass
+
+from pydantic import BaseModel, Field
+
+from llm_optimizer.models.lean import index_keys
+from llm_optimizer.models.llm import LinearOptimizationModel
+
+
+class ProblemSet(BaseModel):
+    name: str
+    members: list[int]
+
+
+class ProblemParam(BaseModel):
+    name: str
+    values: list[float] = Field(
+        ...,
+        description="one value per member of the index sets, in their order, the last index changing fastest",
+    )
+
+
+class ProblemData(BaseModel):
+    sets: list[ProblemSet]
+    parameters: list[ProblemParam]
+    constants: list[float] = Field(
+        default_factory=list,
+        description="the value of every numbered constant of the rules, in the order of their numbers",
+    )
+
+
+@dataclass
+class RuleConstant:
+    # "constraint" or "objective", with the constraint's position
+    kind: str
+    position: int
+    # utf-8 byte offsets in the rule string, as reported by `ast`
+    start: int
+    end: int
+
+
+def _rule_locations(
+    llm_pyomo_model: LinearOptimizationModel,
+) -> list[tuple[str, int]]:
+    constraints = [
+        ("constraint", position) for position in range(len(llm_pyomo_model.constraints))
+    ]
+    return [*constraints, ("objective", 0)]
+
+
+def _rule_string(
+    llm_pyomo_model: LinearOptimizationModel, kind: str, position: int
+) -> str:
+    if kind == "objective":
+        objective = llm_pyomo_model.objective
+        return objective.expr or objective.rule or ""
+    return llm_pyomo_model.constraints[position].rule.lambda_body
+
+
+def _set_rule_string(
+    llm_pyomo_model: LinearOptimizationModel, kind: str, position: int, rule: str
+) -> None:
+    if kind == "constraint":
+        llm_pyomo_model.constraints[position].rule.lambda_body = rule
+    elif llm_pyomo_model.objective.expr:
+        llm_pyomo_model.objective.expr = rule
+    else:
+        llm_pyomo_model.objective.rule = rule
+
+
+def _number_constants(rule: str) -> list[ast.Constant]:
+    """the number literals of a rule outside of subscripts, in source order"""
+    try:
+        tree = ast.parse(rule, mode="eval")
+    except SyntaxError:
+        return []
+    subscripted = {
+        id(node)
+        for subscript in ast.walk(tree)
+        if isinstance(subscript, ast.Subscript)
+        for node in ast.walk(subscript.slice)
+    }
+    constants = [
+        node
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Constant)
+        and isinstance(node.value, (int, float))
+        and not isinstance(node.value, bool)
+        and id(node) not in subscripted
+        # a rule spans one line, anything else keeps its numbers
+        and node.lineno == node.end_lineno == 1
+    ]
+    return sorted(constants, key=lambda node: node.col_offset)
+
+
+def rule_constants(llm_pyomo_model: LinearOptimizationModel) -> list[RuleConstant]:
+    """the number constants of the constraint rules and of the objective"""
+    return [
+        RuleConstant(kind, position, node.col_offset, node.end_col_offset)
+        for kind, position in _rule_locations(llm_pyomo_model)
+        for node in _number_constants(_rule_string(llm_pyomo_model, kind, position))
+    ]
+
+
+def _replace_constants(
+    llm_pyomo_model: LinearOptimizationModel, replacements: list[str]
+) -> LinearOptimizationModel:
+    """a copy with every rule constant replaced by the string of its number"""
+    constants = rule_constants(llm_pyomo_model)
+    if len(replacements) != len(constants):
+        raise ValueError(
+            f"the rules have {len(constants)} constants, got {len(replacements)}"
+        )
+    replaced = llm_pyomo_model.model_copy(deep=True)
+    # from the end, so the offsets of the other constants of a rule still fit
+    for constant, replacement in reversed(list(zip(constants, replacements))):
+        rule = _rule_string(replaced, constant.kind, constant.position).encode()
+        rule = rule[: constant.start] + replacement.encode() + rule[constant.end :]
+        _set_rule_string(replaced, constant.kind, constant.position, rule.decode())
+    return replaced
+
+
+def marked_rules(llm_pyomo_model: LinearOptimizationModel) -> LinearOptimizationModel:
+    """a copy with the rule constants replaced by their numbers `<c1>`, `<c2>`,
+    ... to show the structure of the rules without their data"""
+    count = len(rule_constants(llm_pyomo_model))
+    return _replace_constants(
+        llm_pyomo_model, [f"<c{number}>" for number in range(1, count + 1)]
+    )
+
+
+def _number(value: float) -> str:
+    number = str(int(value)) if float(value).is_integer() else repr(float(value))
+    # a constant may follow a unary minus
+    return f"({number})" if value < 0 else number
+
+
+def apply_problem_data(
+    llm_pyomo_model: LinearOptimizationModel, data: ProblemData
+) -> LinearOptimizationModel:
+    """a copy of the model with the set members, the parameter values and the
+    rule constants of `data`, raises `ValueError` if the data does not fit the
+    model; sets and parameters of data files keep their source"""
+    members = {problem_set.name: problem_set.members for problem_set in data.sets}
+    values = {
+        problem_param.name: problem_param.values for problem_param in data.parameters
+    }
+
+    applied = _replace_constants(
+        llm_pyomo_model, [_number(value) for value in data.constants]
+    )
+    for pyo_set in applied.sets:
+        if pyo_set.source is not None:
+            continue
+        if pyo_set.name not in members:
+            raise ValueError(f"no members for the set `{pyo_set.name}`")
+        pyo_set.initialize = set(members[pyo_set.name])
+
+    set_members = {
+        pyo_set.name: sorted(pyo_set.initialize)
+        for pyo_set in applied.sets
+        if pyo_set.source is None
+    }
+    for pyo_param in applied.parameters:
+        if pyo_param.source is not None:
+            continue
+        if pyo_param.name not in values:
+            raise ValueError(f"no values for the parameter `{pyo_param.name}`")
+        try:
+            keys = index_keys(set_members, pyo_param.indexes)
+        except KeyError as e:
+            raise ValueError(
+                f"the parameter `{pyo_param.name}` is indexed by a set of a data "
+                f"file: {e}"
+            ) from None
+        if len(values[pyo_param.name]) != len(keys):
+            raise ValueError(
+                f"parameter `{pyo_param.name}` needs {len(keys)} values, got "
+                f"{len(values[pyo_param.name])}"
+            )
+        pyo_param.initialize = dict(zip(keys, values[pyo_param.name]))
+    return applied
@@ -0,0 +1,99 @@
+"""repair a generated model that fails to build by asking the llm for just the
+failing component, with its error and its schema, instead of generating the
+whole model again
+
+    model, llm_pyomo_model, repairs = construct_with_repairs(llm_pyomo_model)
+
+only errors raised while building a component are repaired, see
+`failed_component`"""
+
+import functools
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
+
+import pyomo.environ as pyo
+
+from llm_optimizer.calculations.lin_optimization_logic import (
+    construct_pyomo_model,
+    failed_component,
+)
+from llm_optimizer.llm.communication_instructor import (
+    get_client,
+    llm_errors,
+    repair_component,
+)
+from llm_optimizer.models.llm import LinearOptimizationModel
+from llm_optimizer.utils import instrumentation
+
+if TYPE_CHECKING:
+    import instructor
+
+
+MAX_REPAIRS = 2
+
+T = TypeVar("T")
+
+
+@dataclass
+class Repair:
+    kind: str
+    name: str
+    # the error the component failed with
+    error: str
+
+
+def with_repairs(
+    build: Callable[[LinearOptimizationModel], T],
+    llm_pyomo_model: LinearOptimizationModel,
+    max_repairs: int = MAX_REPAIRS,
+    client: "instructor.Instructor | None" = None,
+) -> tuple[T, LinearOptimizationModel, list[Repair]]:
+    """call `build` with the model, if it fails on a component the component
+    is repaired and `build` is called again with the repaired model
+
+    returns what `build` returned, the model it was built from and the
+    repairs, errors of no component and the error after `max_repairs` repairs
+    are raised"""
+    repairs: list[Repair] = []
+    while True:
+        try:
+            return build(llm_pyomo_model), llm_pyomo_model, repairs
+        except Exception as e:
+            component = failed_component(e)
+            if component is None or len(repairs) >= max_repairs:
+                raise
+            build_error = e
+
+        error = f"{type(build_error).__name__}: {build_error}"
+        logging.debug(f"repairing the {component.kind} `{component.name}`: {error}")
+        try:
+            repaired = repair_component(
+                client or get_client(),
+                llm_pyomo_model,
+                component.kind,
+                component.name,
+                error,
+            )
+        except llm_errors() as repair_error:
+            raise build_error from repair_error
+        llm_pyomo_model = llm_pyomo_model.replace_component(
+            component.kind, component.name, repaired
+        )
+        repairs.append(Repair(component.kind, component.name, error))
+        instrumentation.count("component_repairs", kind=component.kind)
+
+
+def construct_with_repairs(
+    llm_pyomo_model: LinearOptimizationModel,
+    max_repairs: int = MAX_REPAIRS,
+    client: "instructor.Instructor | None" = None,
+    **construct_kwargs: Any,
+) -> tuple[pyo.ConcreteModel, LinearOptimizationModel, list[Repair]]:
+    """`construct_pyomo_model` with repairs of the failing components"""
+    return with_repairs(
+        functools.partial(construct_pyomo_model, **construct_kwargs),
+        llm_pyomo_model,
+        max_repairs=max_repairs,
+        client=client,
+    )
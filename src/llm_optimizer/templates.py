@@ -0,0 +1,273 @@
+#  solve a template: llm-optimizer-template solve template.json instances.jsonl results.jsonl
+
+"""a generated model frozen into a template: the sets, variables, rules and
+objective stay, the set members and parameter values are the inputs of every
+instance, which is built and solved without asking the llm
+
+    template = freeze_model(llm_pyomo_model, name="staffing")
+    template.save("staffing.json")
+    llm_pyomo_model = ModelTemplate.load("staffing.json").instantiate(
+        {"sets": {"D": [1, 2, 3]}, "parameters": {"demand": [17, 13, 15]}}
+    )
+
+parameter values are given as a list in the order of the index set members,
+the last index changing fastest, as a dict of index keys as in
+`PyomoParam.initialize`, or as a data file `{"file": ..., "columns": [...]}`,
+which a set can be read from as well, see `data_files`"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from pathlib import Path
+from typing import Any, Iterable, Iterator, TextIO
+
+from pydantic import BaseModel
+
+from llm_optimizer.calculations.lin_optimization_logic import (
+    SOLVER_BACKENDS,
+    build_and_solve,
+)
+from llm_optimizer.models.base import get_log_level
+from llm_optimizer.models.lean import index_keys
+from llm_optimizer.models.llm import DataSource, LinearOptimizationModel, PyomoParam
+
+
+TEMPLATE_FORMAT_VERSION = 1
+
+
+def _data_source(value: Any, data_dir: Path | str) -> DataSource | None:
+    """the data file of an input, `None` if it is given inline"""
+    if not (isinstance(value, dict) and "file" in value):
+        return None
+    source = DataSource.model_validate(value)
+    source.path = str((Path(data_dir) / source.file).resolve())
+    return source
+
+
+class ModelTemplate(BaseModel):
+    format_version: int = TEMPLATE_FORMAT_VERSION
+    name: str = ""
+    # the model without set members and parameter values
+    structure: LinearOptimizationModel
+
+    def inputs(self) -> dict[str, dict[str, str]]:
+        """the set and parameter names an instance needs, with their docs"""
+        return {
+            "sets": {pyo_set.name: pyo_set.doc for pyo_set in self.structure.sets},
+            "parameters": {
+                pyo_param.name: f"{pyo_param.doc} (indexed by "
+                f"{', '.join(pyo_param.indexes)})"
+                for pyo_param in self.structure.parameters
+            },
+        }
+
+    def instantiate(
+        self, data: dict[str, Any], data_dir: Path | str = "."
+    ) -> LinearOptimizationModel:
+        """the model with the set members and parameter values of `data`,
+        data files are relative to `data_dir`, raises `ValueError` for
+        missing, unknown or misshaped inputs"""
+        sets, parameters = data.get("sets", {}), data.get("parameters", {})
+        inputs = self.inputs()
+        for kind in ("sets", "parameters"):
+            given = data.get(kind, {})
+            if missing := inputs[kind].keys() - given.keys():
+                raise ValueError(f"missing {kind}: {', '.join(sorted(missing))}")
+            if unknown := given.keys() - inputs[kind].keys():
+                raise ValueError(f"unknown {kind}: {', '.join(sorted(unknown))}")
+
+        llm_pyomo_model = self.structure.model_copy(deep=True)
+        set_members = {}
+        for pyo_set in llm_pyomo_model.sets:
+            value = sets[pyo_set.name]
+            if (source := _data_source(value, data_dir)) is not None:
+                pyo_set.source = source
+                continue
+            if not isinstance(value, list):
+                raise ValueError(f"set `{pyo_set.name}`: expected a list of members")
+            pyo_set.initialize = set(value)
+            set_members[pyo_set.name] = sorted(pyo_set.initialize)
+
+        for position, pyo_param in enumerate(llm_pyomo_model.parameters):
+            value = parameters[pyo_param.name]
+            if (source := _data_source(value, data_dir)) is not None:
+                pyo_param.source = source
+                continue
+            if isinstance(value, list):
+                try:
+                    keys = index_keys(set_members, pyo_param.indexes)
+                except KeyError as e:
+                    raise ValueError(
+                        f"parameter `{pyo_param.name}`: the values of an index "
+                        f"set of a data file are not known, give a dict: {e}"
+                    ) from None
+                if len(value) != len(keys):
+                    raise ValueError(
+                        f"parameter `{pyo_param.name}` needs {len(keys)} values, "
+                        f"got {len(value)}"
+                    )
+                value = dict(zip(keys, value))
+            # validated like a response, string keys become index keys
+            llm_pyomo_model.parameters[position] = PyomoParam.model_validate(
+                {**pyo_param.model_dump(), "initialize": value}
+            )
+        return llm_pyomo_model
+
+    def save(self, path: Path | str) -> Path:
+        path = Path(path)
+        path.write_text(self.model_dump_json(indent=2))
+        return path
+
+    @classmethod
+    def load(cls, path: Path | str) -> "ModelTemplate":
+        template = cls.model_validate_json(Path(path).read_text())
+        if template.format_version != TEMPLATE_FORMAT_VERSION:
+            raise ValueError(f"unsupported template format {template.format_version}")
+        return template
+
+
+def freeze_model(
+    llm_pyomo_model: LinearOptimizationModel, name: str = ""
+) -> ModelTemplate:
+    """a template of a model, e.g. of a response that solved well"""
+    if llm_pyomo_model.error_message:
+        raise ValueError("Only valid responses can be frozen.")
+    structure = llm_pyomo_model.model_copy(deep=True, update={"problem_str": None})
+    for pyo_set in structure.sets:
+        pyo_set.initialize = set()
+        pyo_set.source = None
+    for pyo_param in structure.parameters:
+        pyo_param.initialize = {}
+        pyo_param.source = None
+    return ModelTemplate(name=name, structure=structure)
+
+
+def read_instances(lines: Iterable[str]) -> Iterator[dict[str, Any]]:
+    """read instances from jsonl lines, objects with `sets`, `parameters` and
+    an optional `id`"""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        instance = json.loads(line)
+        if not isinstance(instance, dict):
+            raise ValueError(f"line {line_number}: expected an object")
+        instance.setdefault("id", line_number)
+        yield instance
+
+
+def solve_instances(
+    template: ModelTemplate,
+    instances: Iterable[dict[str, Any]],
+    output: TextIO,
+    workers: int | None = None,
+    backend: str = "pyomo",
+    time_limit: float | None = None,
+    data_dir: Path | str = ".",
+) -> dict[str, int]:
+    """instantiate the template for every instance and solve it in a pool of
+    `workers` processes, one json line per instance is written to `output` as
+    soon as it is solved"""
+    if backend not in SOLVER_BACKENDS:
+        raise ValueError(f"unknown solver backend `{backend}`")
+
+    counts: dict[str, int] = {}
+
+    def write_result(result: dict[str, Any]) -> None:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+    # bound the number of instantiated models waiting for a solver process
+    max_in_flight = 2 * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: dict[Future, Any] = {}
+
+        def write_done(return_when: str) -> None:
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                write_result({"id": pending.pop(future), **future.result()})
+
+        for instance in instances:
+            try:
+                llm_pyomo_model = template.instantiate(instance, data_dir)
+            except ValueError as e:
+                write_result(
+                    {"id": instance["id"], "status": "input_error", "error": str(e)}
+                )
+                continue
+            if len(pending) >= max_in_flight:
+                write_done(FIRST_COMPLETED)
+            future = executor.submit(
+                build_and_solve,
+                llm_pyomo_model.model_dump_json(),
+                backend=backend,
+                time_limit=time_limit,
+            )
+            pending[future] = instance["id"]
+        write_done(ALL_COMPLETED)
+
+    logging.debug(f"template instances finished: {counts}")
+    return counts
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Freeze a generated model into a template and solve its "
+        "instances without the llm."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    freeze = commands.add_parser("freeze", help="freeze a model json into a template")
+    freeze.add_argument("model", type=Path, help="json of a LinearOptimizationModel")
+    freeze.add_argument("template", type=Path, help="json file for the template")
+    freeze.add_argument("--name", default="")
+
+    inputs = commands.add_parser("inputs", help="print the inputs of a template")
+    inputs.add_argument("template", type=Path)
+
+    solve = commands.add_parser("solve", help="solve a jsonl file of instances")
+    solve.add_argument("template", type=Path)
+    solve.add_argument("input", type=Path, help="jsonl file with the instances")
+    solve.add_argument("output", type=Path, help="jsonl file for the results")
+    solve.add_argument(
+        "--workers", type=int, default=None, help="solver processes (default: cores)"
+    )
+    solve.add_argument("--backend", choices=SOLVER_BACKENDS, default="pyomo")
+    solve.add_argument("--time-limit", type=float, default=None, help="seconds")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=get_log_level())
+
+    if args.command == "freeze":
+        llm_pyomo_model = LinearOptimizationModel.model_validate_json(
+            args.model.read_text()
+        )
+        freeze_model(llm_pyomo_model, name=args.name).save(args.template)
+    elif args.command == "inputs":
+        print(json.dumps(ModelTemplate.load(args.template).inputs(), indent=2))
+    else:
+        template = ModelTemplate.load(args.template)
+        with open(args.input) as input_file, open(args.output, "w") as output_file:
+            counts = solve_instances(
+                template,
+                read_instances(input_file),
+                output_file,
+                workers=args.workers,
+                backend=args.backend,
+                time_limit=args.time_limit,
+                data_dir=args.input.parent,
+            )
+        print(json.dumps(counts))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
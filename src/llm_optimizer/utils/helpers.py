@@ -1,4 +1,5 @@
 import ast
+import functools
 import logging
 from typing import Collection, Any
 
@@ -7,8 +8,14 @@ class ExpressionNotSafeError(Exception):
     pass
 
 
-def check_if_expression_is_safe(expr: str, allowed_vars: Collection[str]) -> bool:
-    allowed_vars = set(allowed_vars)
+def check_if_expression_is_safe(
+    expr: str, allowed_vars: Collection[str], extra_vars: Collection[str] = ()
+) -> bool:
+    # allowed_vars can hold every component key of a large model, so it is only
+    # looked up, never copied
+    if not isinstance(allowed_vars, (set, frozenset, dict)):
+        allowed_vars = set(allowed_vars)
+    extra_vars = {"Constraint.Skip", *extra_vars}
     allowed_math_functions = {"sum", "ord", "range"}
 
     allowed_node_types = {
@@ -41,9 +48,11 @@ def check_if_expression_is_safe(expr: str, allowed_vars: Collection[str]) -> boo
         ast.Subscript,
         ast.IfExp,
     }
-    allowed_vars.add("Constraint.Skip")
     iteration_vars = set()
 
+    def _is_allowed(name):
+        return name in allowed_vars or name in extra_vars
+
     def _check_node(node):
         if type(node) not in allowed_node_types:
             logging.debug(f"Node type '{type(node)}' not allowed.")
@@ -73,7 +82,7 @@ def check_if_expression_is_safe(expr: str, allowed_vars: Collection[str]) -> boo
         if isinstance(node, ast.Name):
             logging.debug("checking variable: ")
             logging.debug(f"{node.id}")
-            return node.id in allowed_vars or node.id in iteration_vars
+            return _is_allowed(node.id) or node.id in iteration_vars
 
         if isinstance(node, ast.Attribute):
             logging.debug("checking attributes: ")
@@ -82,13 +91,13 @@ def check_if_expression_is_safe(expr: str, allowed_vars: Collection[str]) -> boo
             elif isinstance(node.value, ast.Name):
                 full_name = f"{node.value.id}.{node.attr}"
                 # logging.debug(f" {full_name} ...")
-                return full_name in allowed_vars
+                return _is_allowed(full_name)
             logging.debug(f"attibute value {node.value} not allowed")
             return False
 
         if isinstance(node, ast.Constant):
             logging.debug("checking literals: {node.value} ...")
-            return isinstance(node.value, (int, float)) or node.value in allowed_vars
+            return isinstance(node.value, (int, float)) or _is_allowed(node.value)
 
         if isinstance(node, ast.Compare):
             logging.debug("checking comparision ...")
@@ -142,7 +151,7 @@ def check_if_expression_is_safe(expr: str, allowed_vars: Collection[str]) -> boo
 
 def parse_rule(expression: str, allowed_vars: Collection[str]) -> dict[str, Any]:
     """check and eval mathematical expression or lambda function"""
-    logging.debug(f"{expression=}, {allowed_vars=}")
+    logging.debug(f"{expression=}")
 
     if "lambda" in expression:
         expr_left, expr_right = expression.split(":", 1)
@@ -154,13 +163,47 @@ def parse_rule(expression: str, allowed_vars: Collection[str]) -> dict[str, Any]
     else:
         lambda_args = ["model"]
 
+    # the cache is keyed on the allowed names the rule uses, the names of all
+    # components of a model would be kept alive with every cached rule
+    used_vars = frozenset(
+        name for name in _referenced_names(expression) if name in allowed_vars
+    )
+    compiled_rule = compile_rule(expression, tuple(lambda_args), used_vars)
+    return {"func": compiled_rule["func"], "args": set(compiled_rule["args"])}
+
+
+@functools.lru_cache(maxsize=1024)
+def _referenced_names(expression: str) -> frozenset:
+    """the names `check_if_expression_is_safe` looks up in `allowed_vars`:
+    names, attributes of a name and constants other than numbers"""
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        return frozenset()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            names.add(f"{node.value.id}.{node.attr}")
+        elif isinstance(node, ast.Constant) and not isinstance(
+            node.value, (int, float)
+        ):
+            names.add(node.value)
+    return frozenset(names)
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_rule(
+    expression: str, lambda_args: tuple[str, ...], allowed_vars: frozenset
+) -> dict[str, Any]:
     expression_is_safe = check_if_expression_is_safe(
-        expression, set(allowed_vars) | set(lambda_args)
+        expression, allowed_vars, extra_vars=lambda_args
     )
     if not expression_is_safe:
-        raise ExpressionNotSafeError(f"{expression=}, {allowed_vars=}")
+        raise ExpressionNotSafeError(f"{expression=}, {lambda_args=}")
 
-    args = set(lambda_args) - {"model"}
+    args = frozenset(lambda_args) - {"model"}
     logging.debug(f'{args=} { ",".join(lambda_args)}')
     return {
         "func": eval("lambda " + ",".join(lambda_args) + ":" + expression),
@@ -0,0 +1,267 @@
+"""span timers and counters for the pipeline stages
+
+nothing is recorded unless a `Recorder` is active:
+
+    with recording() as recorder:
+        results, solution = construct_and_solve(llm_pyomo_model)
+    recorder.export("metrics.prom")
+
+the recorder is kept in a context variable, so asyncio tasks started inside
+`recording()` record into the same recorder"""
+
+import contextlib
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, TextIO
+
+
+METRIC_PREFIX = "llm_optimizer"
+EXPORT_FORMATS = ("prometheus", "otlp")
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: int
+    parent_id: int | None
+    # wall clock start for the export, the duration is taken with perf_counter
+    start_time: float
+    duration: float = 0.0
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+class Recorder:
+    """collects the spans and counters of one run of the pipeline"""
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self.counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self.trace_id = os.urandom(16).hex()
+        self._span_ids = itertools.count(1)
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted((label, str(v)) for label, v in labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def counter_total(self, name: str, **labels) -> float:
+        """the sum of a counter over the label values, only those with the
+        given `labels`"""
+        wanted = {(label, str(value)) for label, value in labels.items()}
+        return sum(
+            value
+            for (counter_name, counter_labels), value in self.counters.items()
+            if counter_name == name and wanted <= set(counter_labels)
+        )
+
+    def timings(self) -> list[dict[str, Any]]:
+        """the spans in the order they started, nested spans are indented by
+        their depth"""
+        depths: dict[int, int] = {}
+        rows = []
+        for span in sorted(self.spans, key=lambda span: span.span_id):
+            depth = depths[span.span_id] = (
+                depths.get(span.parent_id, -1) + 1 if span.parent_id else 0
+            )
+            rows.append(
+                {
+                    "stage": "  " * depth + span.name,
+                    "duration_ms": round(span.duration * 1000, 3),
+                    **span.attributes,
+                }
+            )
+        return rows
+
+    def to_prometheus(self) -> str:
+        """counters and a summary of the span durations per span name in the
+        prometheus text exposition format"""
+        lines = []
+        counter_names = sorted({name for name, _ in self.counters})
+        for name in counter_names:
+            metric = _metric_name(name) + "_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter_name, labels), value in sorted(self.counters.items()):
+                if counter_name == name:
+                    lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+
+        durations: dict[str, list[float]] = {}
+        for span in self.spans:
+            durations.setdefault(span.name, []).append(span.duration)
+        if durations:
+            metric = _metric_name("span_duration_seconds")
+            lines.append(f"# TYPE {metric} summary")
+            for name, values in sorted(durations.items()):
+                labels = _format_labels((("span", name),))
+                lines.append(f"{metric}_sum{labels} {sum(values):.9g}")
+                lines.append(f"{metric}_count{labels} {len(values)}")
+        return "\n".join(lines) + "\n"
+
+    def to_otlp(self) -> dict[str, Any]:
+        """the spans as an OpenTelemetry (OTLP/JSON) trace export request"""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes({"service.name": METRIC_PREFIX})
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [self._otlp_span(span) for span in self.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def _otlp_span(self, span: Span) -> dict[str, Any]:
+        start = int(span.start_time * 1e9)
+        otlp_span = {
+            "traceId": self.trace_id,
+            "spanId": f"{span.span_id:016x}",
+            "name": span.name,
+            # SPAN_KIND_INTERNAL
+            "kind": 1,
+            "startTimeUnixNano": str(start),
+            "endTimeUnixNano": str(start + int(span.duration * 1e9)),
+            "attributes": _otlp_attributes(span.attributes),
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = f"{span.parent_id:016x}"
+        return otlp_span
+
+    def export(
+        self, destination: str | Path | TextIO | None = None, format="prometheus"
+    ) -> None:
+        """write the prometheus text or the otlp json to a file, a stream or
+        stdout"""
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"unknown export format `{format}`")
+        text = (
+            self.to_prometheus()
+            if format == "prometheus"
+            else json.dumps(self.to_otlp(), indent=2)
+        )
+        if destination is None:
+            sys.stdout.write(text)
+        elif isinstance(destination, (str, Path)):
+            Path(destination).write_text(text)
+        else:
+            destination.write(text)
+
+
+_recorder: ContextVar[Recorder | None] = ContextVar("recorder", default=None)
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+@contextlib.contextmanager
+def recording(recorder: Recorder | None = None) -> Iterator[Recorder]:
+    """record the spans and counters of the pipeline run inside the block"""
+    recorder = recorder or Recorder()
+    recorder_token = _recorder.set(recorder)
+    span_token = _current_span.set(None)
+    try:
+        yield recorder
+    finally:
+        _current_span.reset(span_token)
+        _recorder.reset(recorder_token)
+
+
+def active_recorder() -> Recorder | None:
+    return _recorder.get()
+
+
+@contextlib.contextmanager
+def _record_span(recorder: Recorder, name: str, attributes: dict) -> Iterator[Span]:
+    parent = _current_span.get()
+    span = Span(
+        name,
+        next(recorder._span_ids),
+        parent.span_id if parent else None,
+        time.time(),
+        attributes=attributes,
+    )
+    token = _current_span.set(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        span.duration = time.perf_counter() - start
+        _current_span.reset(token)
+        recorder.spans.append(span)
+        logging.debug(f"span {name}: {span.duration:.6f}s {span.attributes}")
+
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+def span(name: str, **attributes) -> contextlib.AbstractContextManager:
+    """time the block as a span nested in the current one, a no-op without an
+    active recorder"""
+    recorder = _recorder.get()
+    if recorder is None:
+        return _NO_SPAN
+    return _record_span(recorder, name, attributes)
+
+
+def set_attributes(**attributes) -> None:
+    """add attributes to the current span"""
+    if _recorder.get() is not None and (current := _current_span.get()) is not None:
+        current.attributes.update(attributes)
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    if (recorder := _recorder.get()) is not None:
+        recorder.count(name, value, **labels)
+
+
+def record_usage(response: Any, model: str, **labels) -> None:
+    """count the tokens of the openai completion instructor keeps on its
+    response model, streamed responses carry no usage"""
+    usage = getattr(getattr(response, "_raw_response", None), "usage", None)
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if isinstance(tokens, int):
+            count(f"llm_{kind}_tokens", tokens, model=model, **labels)
+            set_attributes(**{f"{kind}_tokens": tokens})
+
+
+def _metric_name(name: str) -> str:
+    return f"{METRIC_PREFIX}_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (label, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for label, value in labels
+    )
+    return "{" + ",".join(f'{label}="{value}"' for label, value in escaped) + "}"
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    def otlp_value(value: Any) -> dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    return [
+        {"key": key, "value": otlp_value(value)} for key, value in attributes.items()
+    ]
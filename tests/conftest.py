@@ -1,4 +1,5 @@
 import instructor
+from instructor import Partial
 import json
 import openai
 import os
@@ -9,11 +10,19 @@ from unittest.mock import MagicMock
 
 from llm_optimizer.models.llm import LinearOptimizationModel
 from llm_optimizer.models.base import AppSettings
+from llm_optimizer.llm.cache import ResponseCache
+from llm_optimizer.llm.communication_instructor import get_client
+
+
+@pytest.fixture
+def app_path() -> str:
+    """the app file, independent of the directory pytest runs in"""
+    return str(Path(__file__).parent.parent / "src" / "llm_optimizer" / "app.py")
 
 
 @pytest.fixture()
-def at():
-    yield AppTest.from_file("src/llm_optimizer/app.py").run()
+def at(app_path):
+    yield AppTest.from_file(app_path).run()
 
 
 @pytest.fixture
@@ -24,6 +33,27 @@ def mock_llm_response():
     return llm_pyomo_model
 
 
+@pytest.fixture
+def mock_llm_response_complex():
+    cwd = Path(__file__).parent
+    with open(cwd / "mock_llm_response_complex.json", "r") as file:
+        return LinearOptimizationModel(**json.load(file))
+
+
+@pytest.fixture
+def partial_llm_responses():
+    """the partial models instructor yields while the json is streamed"""
+
+    def factory(response_json: str, chunk_size: int = 40):
+        chunks = (
+            response_json[start : start + chunk_size]
+            for start in range(0, len(response_json), chunk_size)
+        )
+        return list(Partial[LinearOptimizationModel].model_from_chunks(chunks))
+
+    return factory
+
+
 @pytest.fixture
 def llm_response_format():
     def factory(
@@ -58,6 +88,52 @@ def llm_response_format():
     return factory
 
 
+@pytest.fixture
+def indexed_llm_response():
+    """a model of a demand `d` over the set `I` = {1, 2, 3}, with `constraints`
+    as a dict of name to lambda body of the index `i`"""
+
+    def factory(
+        demand=(2, 4, 6),
+        constraints=None,
+        objective="sum(model.x[i] for i in model.I)",
+    ):
+        return LinearOptimizationModel(
+            mathematical_formulation="",
+            objective={
+                "expr": objective,
+                "optimization_sense": "minimize",
+                "doc": "",
+            },
+            sets=[{"name": "I", "initialize": [1, 2, 3], "doc": ""}],
+            parameters=[
+                {
+                    "name": "d",
+                    "indexes": ["I"],
+                    "initialize": dict(zip((1, 2, 3), demand)),
+                    "within": "NonNegativeReals",
+                    "doc": "",
+                }
+            ],
+            variables=[
+                {"name": "x", "indexes": ["I"], "domain": "NonNegativeReals", "doc": ""}
+            ],
+            constraints=[
+                {
+                    "name": name,
+                    "idxs": ["I"],
+                    "rule": {"lambda_arguments": ["model", "i"], "lambda_body": body},
+                    "doc": "",
+                }
+                for name, body in (
+                    constraints or {"demand": "model.x[i] >= model.d[i]"}
+                ).items()
+            ],
+        )
+
+    return factory
+
+
 @pytest.fixture
 def openai_client():
     SETTINGS = AppSettings()
@@ -68,6 +144,14 @@ def openai_client():
     )
 
 
+@pytest.fixture
+def uncached_client():
+    """`get_client` creates a new client in the test and forgets it after"""
+    get_client.cache_clear()
+    yield
+    get_client.cache_clear()
+
+
 @pytest.fixture
 def mock_openai_chat_completion(llm_response_format):
     def mock_create(**kwargs):
@@ -78,3 +162,8 @@ def mock_openai_chat_completion(llm_response_format):
         return mock_response
 
     return mock_create
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    return ResponseCache(tmp_path / "responses.sqlite3")
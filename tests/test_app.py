@@ -21,7 +21,7 @@ def test_app_no_input(at):
     assert at.error[0].value == "no input given"
 
 
-def test_app_with_input(monkeypatch, mock_llm_response):
+def test_app_with_input(monkeypatch, mock_llm_response, app_path):
     text_input = "The llm will not be called here."
 
     mock_ask_llm = MagicMock(return_value=mock_llm_response)
@@ -30,13 +30,72 @@ def test_app_with_input(monkeypatch, mock_llm_response):
         mock_ask_llm,
     )  # structured_llm_response)
 
-    at_mocked = AppTest.from_file("src/llm_optimizer/app.py").run()
+    at_mocked = AppTest.from_file(app_path).run()
 
     at_mocked.text_area[0].set_value(text_input)
     at_mocked.button[0].click().run()
 
     mock_ask_llm.assert_called_once_with(
-        text_input, validate_input=ANY, max_retries=ANY, mock=False
+        text_input,
+        validate_input=ANY,
+        max_retries=ANY,
+        mock=False,
+        cache=ANY,
+        on_partial=ANY,
+        similar=ANY,
     )
     assert len(at_mocked.markdown) > 0
     assert at_mocked.success[0].value == "Found an optimal solution!"
+
+
+def test_app_reruns_render_cached_result(monkeypatch, mock_llm_response, app_path):
+    mock_ask_llm = MagicMock(return_value=mock_llm_response)
+    monkeypatch.setattr(
+        "llm_optimizer.llm.communication_instructor.ask_llm_for_pyomo_model",
+        mock_ask_llm,
+    )
+
+    at_mocked = AppTest.from_file(app_path).run()
+    at_mocked.text_area[0].set_value("The llm will not be called here.")
+    at_mocked.button[0].click().run()
+    solved_task = at_mocked.session_state["solved_task"]
+
+    # a widget interaction without a submit
+    at_mocked.run()
+    assert at_mocked.success[0].value == "Found an optimal solution!"
+    assert at_mocked.text_area[1].value == solved_task.model_text
+    # the same task submitted again
+    at_mocked.button[0].click().run()
+    assert at_mocked.session_state["solved_task"] is solved_task
+
+    # another backend solves again, with the response of the session
+    at_mocked.sidebar.radio[0].set_value("highs")
+    at_mocked.button[0].click().run()
+
+    mock_ask_llm.assert_called_once()
+    assert at_mocked.session_state["solved_task"].backend == "highs"
+    assert at_mocked.success[0].value == "Found an optimal solution!"
+
+    # other solver options solve again
+    solved_task = at_mocked.session_state["solved_task"]
+    at_mocked.sidebar.number_input[0].set_value(60.0)
+    at_mocked.button[0].click().run()
+    assert at_mocked.session_state["solved_task"] is not solved_task
+    assert at_mocked.session_state["solved_task"].key[3].time_limit == 60.0
+
+
+def test_app_indexed_variables(monkeypatch, mock_llm_response_complex, app_path):
+    monkeypatch.setattr(
+        "llm_optimizer.llm.communication_instructor.ask_llm_for_pyomo_model",
+        MagicMock(return_value=mock_llm_response_complex),
+    )
+
+    at_mocked = AppTest.from_file(app_path).run()
+    at_mocked.text_area[0].set_value("The llm will not be called here.")
+    at_mocked.button[0].click().run()
+
+    assert not at_mocked.exception
+    ((_, _, frame),) = at_mocked.session_state["solved_task"].variables
+    assert list(frame.columns) == ["I", "J", "value"]
+    # the variable table and the timings
+    assert len(at_mocked.dataframe) == 2
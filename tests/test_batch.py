@@ -0,0 +1,89 @@
+import asyncio
+import io
+import json
+import pytest
+
+from llm_optimizer.batch import main, read_problems, run_batch_async
+from llm_optimizer.models.base import get_settings
+
+
+def test_read_problems():
+    lines = ['"first problem"\n', "\n", '{"id": "b", "problem": "second problem"}\n']
+
+    problems = list(read_problems(lines))
+
+    assert problems == [
+        {"problem": "first problem", "id": 1},
+        {"id": "b", "problem": "second problem"},
+    ]
+
+
+def test_read_problems_data_files(tmp_path):
+    lines = ['{"problem": "p", "data_files": ["demand.csv", "/data/costs.npy"]}']
+
+    (problem,) = read_problems(lines, data_dir=tmp_path)
+
+    assert problem["data_files"] == [str(tmp_path / "demand.csv"), "/data/costs.npy"]
+
+
+def test_read_problems_missing_problem():
+    with pytest.raises(ValueError):
+        list(read_problems(['{"id": 1}']))
+
+
+def test_run_batch_async_llm_error():
+    output = io.StringIO()
+
+    counts = asyncio.run(run_batch_async([{"id": 1, "problem": ""}], output, workers=1))
+
+    result = json.loads(output.getvalue())
+    assert counts == {"llm_error": 1}
+    assert result["status"] == "llm_error"
+
+
+@pytest.mark.integration
+def test_run_batch_async_unexpected_error(monkeypatch, mock_llm_response):
+    def ask_llm(problem_formulation, mock):
+        if problem_formulation == "broken":
+            raise ConnectionError("connection reset")
+        return mock_llm_response
+
+    monkeypatch.setattr("llm_optimizer.batch.ask_llm_for_pyomo_model", ask_llm)
+    output = io.StringIO()
+    problems = [{"id": 1, "problem": "broken"}, {"id": 2, "problem": "fine"}]
+
+    counts = asyncio.run(run_batch_async(problems, output, workers=1, mock=True))
+
+    results = {
+        result["id"]: result
+        for result in map(json.loads, output.getvalue().splitlines())
+    }
+    assert counts == {"error": 1, "solved": 1}
+    assert results[1]["error"] == "ConnectionError: connection reset"
+    assert results[2]["status"] == "solved"
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("backend", ["pyomo", "highs"])
+def test_batch_cli_mocked(tmp_path, backend, monkeypatch):
+    # a mocked batch runs without the llm settings
+    monkeypatch.delenv("OPENAI_API_KEY")
+    monkeypatch.delenv("LOG_LEVEL")
+    get_settings.cache_clear()
+    input_path = tmp_path / "problems.jsonl"
+    output_path = tmp_path / "results.jsonl"
+    input_path.write_text('"first problem"\n"second problem"\n')
+
+    args = [str(input_path), str(output_path), "--workers", "2", "--mock"]
+    assert main([*args, "--backend", backend]) == 0
+
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert sorted(result["id"] for result in results) == [1, 2]
+    assert all(result["status"] == "solved" for result in results)
+    assert all(result["optimal"] for result in results)
+    assert "x" in results[0]["variables"]
+
+
+def test_run_batch_async_candidates():
+    with pytest.raises(ValueError):
+        asyncio.run(run_batch_async([], io.StringIO(), workers=1, candidates=0))
@@ -0,0 +1,70 @@
+import pytest
+import time
+
+from llm_optimizer.llm.cache import ResponseCache, make_cache_key
+from llm_optimizer.models.llm import LinearOptimizationModel
+
+
+def test_make_cache_key_normalizes_whitespace():
+    settings = {"temperature": 0.2, "max_tokens": 2048}
+
+    key = make_cache_key("maximize  x\n subject to x <= 1", "gpt-4o", "1", settings)
+    same_key = make_cache_key(" maximize x subject to x <= 1 ", "gpt-4o", "1", settings)
+
+    assert key == same_key
+
+
+def test_make_cache_key_depends_on_model_and_prompt():
+    settings = {"temperature": 0.2, "max_tokens": 2048}
+
+    key = make_cache_key("problem", "gpt-4o", "1", settings)
+
+    assert key != make_cache_key("problem", "gpt-4o-mini", "1", settings)
+    assert key != make_cache_key("problem", "gpt-4o", "2", settings)
+    assert key != make_cache_key("problem", "gpt-4o", "1", {"temperature": 0})
+    assert key != make_cache_key("problem", "gpt-4o", "1", settings, False)
+
+
+def test_response_cache_roundtrip(response_cache, mock_llm_response):
+    assert response_cache.get("key") is None
+
+    response_cache.put("key", mock_llm_response)
+    cached_response = response_cache.get("key")
+
+    assert isinstance(cached_response, LinearOptimizationModel)
+    assert cached_response.objective == mock_llm_response.objective
+    assert cached_response.problem_str is None
+    assert response_cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_response_cache_ttl(tmp_path, mock_llm_response, monkeypatch):
+    response_cache = ResponseCache(tmp_path / "cache.sqlite3", ttl=60)
+    response_cache.put("key", mock_llm_response)
+
+    later = time.time() + 120
+    monkeypatch.setattr(time, "time", lambda: later)
+
+    assert response_cache.get("key") is None
+    assert len(response_cache) == 0
+
+
+def test_response_cache_lru_eviction(tmp_path, mock_llm_response):
+    response_cache = ResponseCache(tmp_path / "cache.sqlite3", max_entries=2)
+    response_cache.put("first", mock_llm_response)
+    response_cache.put("second", mock_llm_response)
+    response_cache.get("first")
+    response_cache.put("third", mock_llm_response)
+
+    assert len(response_cache) == 2
+    assert response_cache.get("second") is None
+    assert response_cache.get("first") is not None
+
+
+def test_response_cache_rejects_error_responses(response_cache):
+    error_response = LinearOptimizationModel.empty()
+    error_response.error_message = "error"
+
+    with pytest.raises(ValueError):
+        response_cache.put("key", error_response)
+
+    assert len(response_cache) == 0
@@ -0,0 +1,140 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from llm_optimizer.candidates import (
+    Candidate,
+    select_candidate,
+    solve_candidates_async,
+)
+from llm_optimizer.models.base import InvalidInputError
+from llm_optimizer.models.llm import ValidationAnswer
+
+
+def solved(objective: float | None) -> Candidate:
+    if objective is None:
+        return Candidate(None, {"status": "build_error", "error": "NameError: y"})
+    return Candidate(
+        None, {"status": "solved", "optimal": True, "objective": objective}
+    )
+
+
+def test_select_candidate():
+    candidates = [solved(None), solved(10), solved(12), solved(12 + 1e-9)]
+
+    selection = select_candidate(candidates)
+
+    assert selection.best is candidates[2]
+    assert selection.agreement == 2
+    assert select_candidate(candidates, criterion="first").best is candidates[1]
+    assert select_candidate(candidates, criterion="first").agreement == 1
+    assert select_candidate([solved(None)]).best is None
+    with pytest.raises(ValueError):
+        select_candidate(candidates, criterion="best")
+
+
+def test_select_candidate_tie():
+    candidates = [solved(10), solved(12)]
+
+    assert select_candidate(candidates).best is candidates[0]
+
+
+@pytest.fixture
+def candidate_client(mock_llm_response):
+    """answers the generation requests with models of the given market demand
+    bounds, `None` fails the request, a response arrives `step` seconds after
+    the one before"""
+
+    def factory(*demands, valid=True, step=0.01):
+        calls = {"generation": 0, "cancelled": 0}
+        responses = iter(demands)
+
+        async def create(response_model, **kwargs):
+            if response_model is ValidationAnswer:
+                return ValidationAnswer(valid=valid, reason="not linear")
+            calls["generation"] += 1
+            demand = next(responses)
+            # the requests are answered in the order they were sent
+            try:
+                await asyncio.sleep(step * calls["generation"])
+            except asyncio.CancelledError:
+                calls["cancelled"] += 1
+                raise
+            if demand is None:
+                raise ValueError("malformed response")
+            llm_response = mock_llm_response.model_copy(deep=True)
+            llm_response.constraints[0].rule.lambda_body = f"model.x <= {demand}"
+            return llm_response
+
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(side_effect=create)
+        return client, calls
+
+    return factory
+
+
+@pytest.mark.integration
+def test_solve_candidates_agreement(candidate_client):
+    client, calls = candidate_client(None, 40, 30, 40, 30)
+
+    with ThreadPoolExecutor(1) as executor:
+        selection = asyncio.run(
+            solve_candidates_async(
+                "problem description", n=5, executor=executor, client=client
+            )
+        )
+
+    assert selection.best.objective == pytest.approx(1600)
+    assert selection.agreement == 2
+    assert len(selection.candidates) == 5
+    assert selection.candidates[0].result["status"] == "llm_error"
+    assert selection.best.llm_pyomo_model.problem_str == "problem description"
+
+
+@pytest.mark.integration
+def test_solve_candidates_stops_early(candidate_client):
+    # slow enough that the third response cannot arrive before two solves
+    client, calls = candidate_client(40, 40, 30, 30, step=1)
+
+    with ThreadPoolExecutor(1) as executor:
+        selection = asyncio.run(
+            solve_candidates_async(
+                "problem description", n=3, executor=executor, client=client
+            )
+        )
+
+    # two of three agree, the third cannot change the selection
+    assert selection.agreement == 2
+    assert len(selection.candidates) == 2
+    assert calls["cancelled"] == 1
+
+
+@pytest.mark.integration
+def test_solve_candidates_first(candidate_client):
+    client, calls = candidate_client(30, 40, 40)
+
+    with ThreadPoolExecutor(1) as executor:
+        selection = asyncio.run(
+            solve_candidates_async(
+                "problem description",
+                n=3,
+                criterion="first",
+                validate_input=False,
+                executor=executor,
+                client=client,
+            )
+        )
+
+    assert len(selection.candidates) == 1
+    assert selection.best.objective != pytest.approx(1600)
+
+
+def test_solve_candidates_invalid_input(candidate_client):
+    client, calls = candidate_client(40, 40, valid=False)
+
+    with pytest.raises(InvalidInputError):
+        asyncio.run(solve_candidates_async("problem description", n=2, client=client))
+    with pytest.raises(ValueError):
+        asyncio.run(solve_candidates_async("problem description", n=0, client=client))
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from llm_optimizer.llm.communication_async import (
+    ask_llm_for_pyomo_model_async,
+    ask_llm_for_pyomo_models,
+    get_llm_pyomo_model_async,
+)
+from llm_optimizer.models.base import InvalidInputError
+from llm_optimizer.models.llm import LinearOptimizationModel, ValidationAnswer
+
+
+@pytest.fixture
+def async_client_factory(llm_response_format):
+    def factory(valid=True, validation_delay=0.0, generation_delay=0.0):
+        calls = {"generation": 0, "cancelled": 0, "running": 0, "max_running": 0}
+
+        async def create(response_model, **kwargs):
+            if response_model is ValidationAnswer:
+                await asyncio.sleep(validation_delay)
+                return ValidationAnswer(valid=valid, reason="not linear")
+
+            calls["generation"] += 1
+            calls["running"] += 1
+            calls["max_running"] = max(calls["max_running"], calls["running"])
+            try:
+                await asyncio.sleep(generation_delay)
+            except asyncio.CancelledError:
+                calls["cancelled"] += 1
+                raise
+            finally:
+                calls["running"] -= 1
+            return LinearOptimizationModel(**json.loads(llm_response_format()))
+
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(side_effect=create)
+        return client, calls
+
+    return factory
+
+
+def test_get_llm_pyomo_model_async_overlaps_validation(async_client_factory):
+    client, calls = async_client_factory(validation_delay=0.05)
+
+    response = asyncio.run(
+        get_llm_pyomo_model_async(client, "problem description", True)
+    )
+
+    assert calls["generation"] == 1
+    assert response.problem_str == "problem description"
+
+
+def test_get_llm_pyomo_model_async_cancels_generation(async_client_factory):
+    client, calls = async_client_factory(valid=False, generation_delay=1)
+
+    async def run():
+        with pytest.raises(InvalidInputError):
+            await get_llm_pyomo_model_async(client, "problem description", True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert calls["cancelled"] == 1
+
+
+def test_get_llm_pyomo_model_async_no_user_input(async_client_factory):
+    client, _ = async_client_factory()
+
+    with pytest.raises(ValueError):
+        asyncio.run(get_llm_pyomo_model_async(client, "", False))
+
+
+def test_ask_llm_for_pyomo_model_async_invalid_problem(async_client_factory):
+    client, _ = async_client_factory(valid=False)
+
+    response = asyncio.run(
+        ask_llm_for_pyomo_model_async("problem description", client=client)
+    )
+
+    assert "not linear" in response.error_message
+
+
+def test_ask_llm_for_pyomo_models_concurrency_limit(async_client_factory):
+    client, calls = async_client_factory(generation_delay=0.01)
+    problems = [f"problem {i}" for i in range(6)]
+
+    responses = asyncio.run(
+        ask_llm_for_pyomo_models(
+            problems, concurrency=2, validate_input=False, client=client
+        )
+    )
+
+    assert [response.problem_str for response in responses] == problems
+    assert calls["generation"] == 6
+    assert calls["max_running"] == 2
+
+
+def test_ask_llm_for_pyomo_models_invalid_concurrency():
+    with pytest.raises(ValueError):
+        asyncio.run(ask_llm_for_pyomo_models(["problem"], concurrency=0))
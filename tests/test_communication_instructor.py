@@ -5,10 +5,18 @@ import pytest
 from unittest.mock import MagicMock, ANY
 
 from llm_optimizer.llm.communication_instructor import (
+    EXTRACTION_MODEL,
+    PROMPT_PROFILES,
+    get_client,
     get_llm_pyomo_model,
     ask_llm_for_pyomo_model,
+    request_characters,
 )
+from llm_optimizer.models.lean import LeanLinearOptimizationModel
+from llm_optimizer.llm.similarity import SimilarityIndex
 from llm_optimizer.models.llm import LinearOptimizationModel
+from llm_optimizer.models.problem_data import ProblemData
+from llm_optimizer.utils.instrumentation import recording
 
 
 def test_get_llm_pyomo_model_add_problem_str(
@@ -33,12 +41,65 @@ def test_get_llm_pyomo_model_add_problem_str(
     assert response.problem_str == "problem description"
 
 
+def test_get_llm_pyomo_model_streamed(
+    openai_client, monkeypatch, llm_response_format, partial_llm_responses
+):
+    partial_responses = partial_llm_responses(llm_response_format())
+    mock_create_partial = MagicMock(return_value=iter(partial_responses))
+    monkeypatch.setattr(
+        openai_client.chat.completions, "create_partial", mock_create_partial
+    )
+    on_partial = MagicMock()
+
+    response = get_llm_pyomo_model(
+        openai_client, "problem description", False, on_partial=on_partial
+    )
+
+    assert on_partial.call_count == len(partial_responses) > 1
+    assert isinstance(response, LinearOptimizationModel)
+    assert response.variables[0].name == "x"
+    assert response.problem_str == "problem description"
+
+
+def test_get_llm_pyomo_model_lean(openai_client, monkeypatch, mock_llm_response):
+    lean_response = LeanLinearOptimizationModel.from_model(mock_llm_response)
+    lean_response._raw_response = MagicMock(
+        usage=MagicMock(prompt_tokens=900, completion_tokens=200)
+    )
+    mock_create = MagicMock(return_value=lean_response)
+    monkeypatch.setattr(openai_client.chat.completions, "create", mock_create)
+
+    with recording() as recorder:
+        response = get_llm_pyomo_model(
+            openai_client,
+            "problem description",
+            False,
+            llm_prompt_settings=PROMPT_PROFILES["lean"],
+        )
+
+    assert mock_create.call_args.kwargs["response_model"] is (
+        LeanLinearOptimizationModel
+    )
+    assert isinstance(response, LinearOptimizationModel)
+    assert response.variables[0].name == mock_llm_response.variables[0].name
+    assert response.problem_str == "problem description"
+    assert recorder.counter_total("llm_completion_tokens", profile="lean") == 200
+    assert recorder.counter_total("llm_completion_tokens", profile="full") == 0
+
+
+def test_request_characters():
+    assert request_characters("task", "lean") < request_characters("task") / 1.5
+    assert request_characters("task", "lean") < request_characters(
+        "task", "lean_formulation"
+    )
+
+
 def test_get_llm_pyomo_model_no_user_input(openai_client):
     with pytest.raises(ValueError):
         get_llm_pyomo_model(openai_client, "", False)
 
 
-def test_ask_llm_for_pyomo_model_invalid_llm_client(monkeypatch):
+def test_ask_llm_for_pyomo_model_invalid_llm_client(monkeypatch, uncached_client):
     invalid_openai_client = MagicMock(
         return_value=instructor.from_openai(
             openai.OpenAI(api_key="wrong_key"),
@@ -53,6 +114,14 @@ def test_ask_llm_for_pyomo_model_invalid_llm_client(monkeypatch):
     assert response.error_message is not None
 
 
+def test_get_client_shared(monkeypatch, uncached_client):
+    from_openai = MagicMock(wraps=instructor.from_openai)
+    monkeypatch.setattr(instructor, "from_openai", from_openai)
+
+    assert get_client() is get_client()
+    from_openai.assert_called_once()
+
+
 def test_ask_llm_for_pyomo_model_no_problem_formulation():
     response = ask_llm_for_pyomo_model(problem_formulation="")
 
@@ -62,3 +131,90 @@ def test_ask_llm_for_pyomo_model_no_problem_formulation():
 def test_ask_llm_for_pyomo_model_negative_retries():
     with pytest.raises(ValueError):
         ask_llm_for_pyomo_model("problem description", max_retries=-1)
+
+
+def test_ask_llm_for_pyomo_model_cache_hit(
+    monkeypatch, response_cache, mock_llm_response
+):
+    mock_get_llm_pyomo_model = MagicMock(return_value=mock_llm_response)
+    monkeypatch.setattr(
+        "llm_optimizer.llm.communication_instructor.get_llm_pyomo_model",
+        mock_get_llm_pyomo_model,
+    )
+
+    first = ask_llm_for_pyomo_model("problem  description", False, cache=response_cache)
+    second = ask_llm_for_pyomo_model("problem description", False, cache=response_cache)
+
+    mock_get_llm_pyomo_model.assert_called_once()
+    assert first.objective == second.objective
+    assert second.problem_str == "problem description"
+    assert response_cache.stats()["hits"] == 1
+
+
+def test_ask_llm_for_pyomo_model_similar(
+    monkeypatch, tmp_path, openai_client, mock_llm_response
+):
+    similar = SimilarityIndex(tmp_path / "problems.sqlite3")
+    mock_get_llm_pyomo_model = MagicMock(return_value=mock_llm_response)
+    monkeypatch.setattr(
+        "llm_optimizer.llm.communication_instructor.get_llm_pyomo_model",
+        mock_get_llm_pyomo_model,
+    )
+    monkeypatch.setattr(
+        "llm_optimizer.llm.communication_instructor.get_client",
+        lambda: openai_client,
+    )
+    data = ProblemData(
+        sets=[], parameters=[], constants=[30, 2, 80, 100, 270, 100, 50, 40]
+    )
+    mock_create = MagicMock(return_value=data)
+    monkeypatch.setattr(openai_client.chat.completions, "create", mock_create)
+
+    ask_llm_for_pyomo_model("Make at most 40 units of x.", False, similar=similar)
+    with recording() as recorder:
+        reused = ask_llm_for_pyomo_model(
+            "Make at most 30 units of x.", False, similar=similar
+        )
+
+    mock_get_llm_pyomo_model.assert_called_once()
+    assert mock_create.call_args.kwargs["model"] == EXTRACTION_MODEL
+    assert "model.x <= <c1>" in mock_create.call_args.kwargs["messages"][0]["content"]
+    assert reused.constraints[0].rule.lambda_body == "model.x <= 30"
+    assert reused.problem_str == "Make at most 30 units of x."
+    assert recorder.counter_total("similar_problem", result="hit") == 1
+
+    # data that does not fit the model falls back to a generated model
+    mock_create.return_value = ProblemData(sets=[], parameters=[])
+    ask_llm_for_pyomo_model("Make at most 20 units of x.", False, similar=similar)
+    assert mock_get_llm_pyomo_model.call_count == 2
+
+
+def test_ask_llm_for_pyomo_model_similar_not_cached_as_validated(
+    monkeypatch, tmp_path, openai_client, mock_llm_response, response_cache
+):
+    similar = SimilarityIndex(tmp_path / "problems.sqlite3")
+    monkeypatch.setattr(
+        "llm_optimizer.llm.communication_instructor.get_llm_pyomo_model",
+        MagicMock(return_value=mock_llm_response),
+    )
+    monkeypatch.setattr(
+        "llm_optimizer.llm.communication_instructor.get_client",
+        lambda: openai_client,
+    )
+    data = ProblemData(
+        sets=[], parameters=[], constants=[30, 2, 80, 100, 270, 100, 50, 40]
+    )
+    mock_create = MagicMock(return_value=data)
+    monkeypatch.setattr(openai_client.chat.completions, "create", mock_create)
+    ask_llm_for_pyomo_model("Make at most 40 units of x.", False, similar=similar)
+
+    for _ in range(2):
+        ask_llm_for_pyomo_model(
+            "Make at most 30 units of x.", True, cache=response_cache, similar=similar
+        )
+    assert mock_create.call_count == 2
+    ask_llm_for_pyomo_model(
+        "Make at most 30 units of x.", False, cache=response_cache, similar=similar
+    )
+    assert mock_create.call_count == 2
+    assert response_cache.stats()["hits"] == 1
@@ -0,0 +1,161 @@
+import numpy as np
+import pyomo.environ as pyo
+import pytest
+
+from llm_optimizer.calculations.lin_optimization_logic import (
+    build_and_solve,
+    construct_pyomo_model,
+)
+from llm_optimizer.calculations.matrix_builder import build_matrix_model
+from llm_optimizer.calculations.model_store import ModelStore
+from llm_optimizer.models import compact
+from llm_optimizer.models.compact import (
+    COMPACT_MIN_SIZE,
+    DenseParamData,
+    compact_members,
+    dense_param_data,
+)
+from llm_optimizer.models.llm import LinearOptimizationModel
+
+
+def large_model(size: int = COMPACT_MIN_SIZE) -> LinearOptimizationModel:
+    """`size` products with a demand and a capacity of 2 resources"""
+    products, resources = range(1, size + 1), (1, 2)
+    return LinearOptimizationModel(
+        mathematical_formulation="",
+        objective={
+            "expr": "sum(model.p[i] * model.x[i] for i in model.I)",
+            "optimization_sense": "maximize",
+            "doc": "",
+        },
+        sets=[
+            {"name": "I", "initialize": list(products), "doc": ""},
+            {"name": "R", "initialize": list(resources), "doc": ""},
+        ],
+        parameters=[
+            {
+                "name": "p",
+                "indexes": ["I"],
+                "initialize": {str(i): 1 + i % 7 for i in products},
+                "within": "NonNegativeReals",
+                "doc": "",
+            },
+            {
+                "name": "a",
+                "indexes": ["R", "I"],
+                "initialize": {
+                    f"{r},{i}": 0.5 + (r * i) % 3 for r in resources for i in products
+                },
+                "within": "NonNegativeReals",
+                "doc": "",
+            },
+        ],
+        variables=[
+            {"name": "x", "indexes": ["I"], "domain": "NonNegativeReals", "doc": ""}
+        ],
+        constraints=[
+            {
+                "name": "capacity",
+                "idxs": ["R"],
+                "rule": {
+                    "lambda_arguments": ["model", "r"],
+                    "lambda_body": "sum(model.a[r, i] * model.x[i] for i in model.I) "
+                    f"<= {size}",
+                },
+                "doc": "",
+            },
+            {
+                "name": "demand",
+                "idxs": ["I"],
+                "rule": {
+                    "lambda_arguments": ["model", "i"],
+                    "lambda_body": "model.x[i] <= 10",
+                },
+                "doc": "",
+            },
+        ],
+    )
+
+
+def test_compact_members():
+    members = set(range(5, COMPACT_MIN_SIZE + 5))
+
+    assert compact_members(members) == range(5, COMPACT_MIN_SIZE + 5)
+    assert compact_members({1, 2, 3}) == {1, 2, 3}
+    members.add(COMPACT_MIN_SIZE + 10)
+    assert compact_members(members) is members
+
+
+def test_dense_param_data():
+    rows, columns = range(1, 3), range(1, COMPACT_MIN_SIZE + 1)
+    initialize = {(r, i): r * i for r in rows for i in columns}
+
+    data = dense_param_data(initialize, [{2, 1}, columns])
+
+    assert isinstance(data, DenseParamData)
+    assert data.array.dtype == np.int64
+    assert data[2, 7] == 14
+    assert data == initialize
+    assert data == dense_param_data(initialize, [[1, 2], list(columns)])
+    assert data.to_dict() == initialize
+    with pytest.raises(KeyError):
+        data[2, COMPACT_MIN_SIZE + 1]
+
+    del initialize[1, 1]
+    assert dense_param_data(initialize, [rows, columns]) is None
+    flags = {i: True for i in columns}
+    assert dense_param_data(flags, [columns]) is None
+
+
+def test_compact_model():
+    llm_pyomo_model = large_model()
+
+    assert llm_pyomo_model.sets[0].initialize == range(1, COMPACT_MIN_SIZE + 1)
+    assert llm_pyomo_model.sets[1].initialize == {1, 2}
+    assert all(
+        isinstance(pyo_param.initialize, DenseParamData)
+        for pyo_param in llm_pyomo_model.parameters
+    )
+    text = llm_pyomo_model.model_dump_json()
+    assert '"initialize":[1,2,3,' in text
+    assert '"1,2":2.5' in text
+    assert LinearOptimizationModel.model_validate_json(text) == llm_pyomo_model
+    assert llm_pyomo_model.model_copy(deep=True) == llm_pyomo_model
+
+
+def test_construct_compact_model():
+    model = construct_pyomo_model(large_model())
+
+    assert model.I.ctype is pyo.Set
+    assert list(model.I) == list(range(1, COMPACT_MIN_SIZE + 1))
+    assert model.a[2, 5] == 1.5
+    assert build_matrix_model(large_model()).num_nonzeros == 3 * COMPACT_MIN_SIZE
+
+
+@pytest.mark.parametrize("backend", ["pyomo", "highs"])
+def test_solve_compact_model(backend, monkeypatch):
+    text = large_model().model_dump_json()
+
+    result = build_and_solve(text, backend=backend)
+    monkeypatch.setattr(compact, "COMPACT_MIN_SIZE", 10 * COMPACT_MIN_SIZE)
+    expected = build_and_solve(text, backend=backend)
+
+    assert result["status"] == expected["status"] == "solved"
+    assert result["objective"] == pytest.approx(expected["objective"])
+
+
+def test_model_store_update_compact_model():
+    llm_pyomo_model = large_model()
+    store = ModelStore()
+    store.update(llm_pyomo_model)
+    values = llm_pyomo_model.parameters[0].initialize
+    assert store._snapshot["parameters"]["p"].initialize is values
+
+    llm_pyomo_model.parameters[0].initialize = DenseParamData(
+        values.array + 1, values.index_members
+    )
+    changes = store.update(llm_pyomo_model)
+
+    assert not changes.rebuilt
+    assert changes.components == ["p"]
+    assert pyo.value(store.model.p[3]) == 5
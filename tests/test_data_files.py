@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from llm_optimizer.calculations.data_files import (
+    DenseParamData,
+    attach_data_files,
+    read_param_data,
+    read_set_members,
+    with_data_files,
+)
+from llm_optimizer.calculations.lin_optimization_logic import (
+    build_and_solve,
+    construct_pyomo_model,
+    failed_component,
+)
+from llm_optimizer.models.llm import DataSource, PyomoParam, PyomoSet
+
+
+@pytest.fixture
+def data_files(tmp_path, mock_llm_response_complex):
+    """the destinations and demands of the complex response as a table, its
+    costs as an array"""
+    parameters = {
+        pyo_param.name: pyo_param for pyo_param in mock_llm_response_complex.parameters
+    }
+    demand = parameters["d"].initialize
+    destinations = sorted(demand)
+    terminals = sorted(mock_llm_response_complex.sets[1].initialize)
+    demand_path = tmp_path / "demand.csv"
+    pd.DataFrame(
+        {"destination": destinations, "demand": [demand[i] for i in destinations]}
+    ).to_csv(demand_path, index=False)
+    costs_path = tmp_path / "costs.npy"
+    np.save(
+        costs_path,
+        np.array(
+            [
+                [parameters["c"].initialize[i, j] for j in terminals]
+                for i in destinations
+            ]
+        ),
+    )
+    return [demand_path, costs_path]
+
+
+@pytest.fixture
+def file_backed_response(mock_llm_response_complex):
+    """the complex response as the llm answers it with the data files"""
+    llm_response = mock_llm_response_complex.model_copy(deep=True)
+    destinations = llm_response.sets[0]
+    destinations.initialize = set()
+    destinations.source = DataSource(file="demand.csv", columns=["destination"])
+    for pyo_param in llm_response.parameters:
+        if pyo_param.name == "d":
+            pyo_param.initialize = {}
+            pyo_param.source = DataSource(
+                file="demand.csv", columns=["destination", "demand"]
+            )
+        elif pyo_param.name == "c":
+            pyo_param.initialize = {}
+            pyo_param.source = DataSource(file="costs.npy")
+    return llm_response
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_read_table(tmp_path, suffix):
+    path = tmp_path / f"costs{suffix}"
+    frame = pd.DataFrame({"i": [1, 1, 2], "j": [1, 2, 1], "cost": [0.5, 1.5, 2.5]})
+    if suffix == ".csv":
+        frame.to_csv(path, index=False)
+    else:
+        frame.to_parquet(path)
+
+    source = DataSource(file=path.name, columns=["i", "j", "cost"], path=str(path))
+
+    assert read_param_data(source, [[1, 2], [1, 2]]) == {
+        (1, 1): 0.5,
+        (1, 2): 1.5,
+        (2, 1): 2.5,
+    }
+    assert read_set_members({**source.model_dump(), "columns": ["j"]}) == [1, 2]
+    with pytest.raises(ValueError, match="index columns and a value column"):
+        read_param_data(source, [[1, 2]])
+
+
+def test_dense_param_data(tmp_path):
+    path = tmp_path / "costs.npy"
+    np.save(path, np.arange(6.0).reshape(2, 3))
+    source = DataSource(file="costs.npy", path=str(path))
+
+    data = read_param_data(source, [[1, 2], [10, 20, 30]])
+
+    assert isinstance(data, DenseParamData)
+    assert isinstance(data.array, np.memmap)
+    assert data[2, 10] == 3.0
+    assert len(data) == 6
+    assert list(data)[:2] == [(1, 10), (1, 20)]
+    with pytest.raises(KeyError):
+        data[3, 10]
+    with pytest.raises(ValueError, match="does not match"):
+        read_param_data(source, [[1, 2]])
+
+
+def test_initialize_or_source_required():
+    source = DataSource(file="demand.csv", columns=["i"])
+
+    assert PyomoSet(name="I", doc="", source=source).initialize == set()
+    assert PyomoParam(name="d", indexes=["I"], within=None, doc="", initialize={})
+    with pytest.raises(ValidationError, match="`initialize` or `source`"):
+        PyomoSet(name="I", doc="")
+    with pytest.raises(ValidationError, match="`initialize` or `source`"):
+        PyomoParam(name="d", indexes=["I"], within=None, doc="")
+    with pytest.raises(ValidationError, match="only one of"):
+        PyomoSet(name="I", doc="", initialize=[1], source=source)
+
+
+def test_with_and_attach_data_files(data_files, file_backed_response):
+    task = with_data_files("deliver the demand", data_files)
+
+    assert "demand.csv: columns destination, demand" in task
+    assert "costs.npy: array of shape (8, 3)" in task
+    assert with_data_files("deliver the demand", []) == "deliver the demand"
+
+    attached = attach_data_files(file_backed_response, data_files[:1])
+
+    assert attached.sets[0].source.path == str(data_files[0].resolve())
+    assert file_backed_response.sets[0].source.path is None
+    with pytest.raises(ValueError, match="`costs.npy` is not attached") as error:
+        construct_pyomo_model(attached)
+    assert failed_component(error.value).name == "c"
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("backend", ["pyomo", "highs"])
+def test_solve_with_data_files(
+    backend, data_files, file_backed_response, mock_llm_response_complex
+):
+    llm_response = attach_data_files(file_backed_response, data_files)
+
+    result = build_and_solve(llm_response.model_dump_json(), backend=backend)
+    expected = build_and_solve(
+        mock_llm_response_complex.model_dump_json(), backend=backend
+    )
+
+    assert result["status"] == "solved"
+    assert result["objective"] == pytest.approx(expected["objective"])
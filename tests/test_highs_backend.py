@@ -0,0 +1,79 @@
+import io
+import pyomo.environ as pyo
+import pytest
+
+from llm_optimizer.calculations.highs_backend import HighsSolution, solve_highs
+from llm_optimizer.calculations.lin_optimization_logic import (
+    build_and_solve,
+    construct_and_solve,
+    is_optimal,
+    summarize_solution,
+)
+from llm_optimizer.calculations.solver_options import SolverOptions
+
+
+@pytest.mark.integration
+def test_solve_highs(mock_llm_response):
+    results, solution = solve_highs(mock_llm_response)
+
+    assert isinstance(solution, HighsSolution)
+    assert results.solver.status == pyo.SolverStatus.ok
+    assert results.solver.termination_condition == pyo.TerminationCondition.optimal
+    assert solution.my_objective() == pytest.approx(1600)
+    assert [str(model_var) for model_var in solution.component_objects(pyo.Var)] == [
+        "x",
+        "A",
+        "B",
+    ]
+    assert solution.x.doc == "Number of units of Product X to produce"
+    assert [idx for idx in solution.x] == [None]
+    assert solution.x[None]() == pytest.approx(40)
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("method", ["simplex", "ipm"])
+def test_solve_highs_iterations(mock_llm_response, method):
+    options = SolverOptions(method=method, presolve=False)
+
+    results, _ = solve_highs(mock_llm_response, options)
+
+    assert results.solver.iterations > 0
+    assert results.solver.mip_nodes == 0
+
+
+@pytest.mark.integration
+def test_solve_highs_infeasible(mock_llm_response):
+    mock_llm_response.constraints[0].rule.lambda_body = "model.x <= -1"
+
+    results, solution = solve_highs(mock_llm_response)
+
+    assert not is_optimal(results)
+    assert results.solver.termination_condition == pyo.TerminationCondition.infeasible
+    assert solution.my_objective() is None
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("fixture", ["mock_llm_response", "mock_llm_response_complex"])
+def test_backends_same_summary(fixture, request):
+    llm_response = request.getfixturevalue(fixture)
+
+    reference = summarize_solution(*construct_and_solve(llm_response, "pyomo"))
+    summary = summarize_solution(*construct_and_solve(llm_response, "highs"))
+
+    assert summary["optimal"] and reference["optimal"]
+    assert summary["objective"] == pytest.approx(reference["objective"])
+    assert summary["variables"].keys() == reference["variables"].keys()
+
+
+@pytest.mark.integration
+def test_highs_solution_pprint(mock_llm_response):
+    _, solution = solve_highs(mock_llm_response)
+
+    with (outstream := io.StringIO()):
+        solution.pprint(ostream=outstream)
+        assert "MarketDemand" in outstream.getvalue()
+
+
+def test_build_and_solve_unknown_backend(mock_llm_response):
+    with pytest.raises(ValueError):
+        build_and_solve(mock_llm_response.model_dump_json(), backend="glpk")
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def imported_modules(*modules: str) -> set[str]:
+    """top level packages loaded by importing `modules` in a fresh interpreter"""
+    code = (
+        "import sys\n"
+        + "".join(f"import {module}\n" for module in modules)
+        + "print(' '.join({name.split('.')[0] for name in sys.modules}))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return set(output.split())
+
+
+@pytest.mark.parametrize(
+    "modules",
+    [
+        (
+            "llm_optimizer.calculations.lin_optimization_logic",
+            "llm_optimizer.calculations.model_store",
+            "llm_optimizer.calculations.highs_backend",
+        ),
+        ("llm_optimizer.batch",),
+        ("llm_optimizer.templates",),
+        ("llm_optimizer.llm.communication_async",),
+    ],
+)
+def test_no_llm_client_imports(modules):
+    assert not imported_modules(*modules) & {"openai", "instructor", "httpx"}
+
+
+@pytest.mark.parametrize(
+    "module", ["llm_optimizer.llm.communication_instructor", "llm_optimizer.app"]
+)
+def test_no_solver_imports_on_start(module):
+    assert not imported_modules(module) & {"pyomo", "highspy", "openai"}
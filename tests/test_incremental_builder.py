@@ -0,0 +1,75 @@
+import pyomo.environ as pyo
+import pytest
+from pathlib import Path
+
+from llm_optimizer.calculations.incremental_builder import IncrementalModelBuilder
+from llm_optimizer.calculations.lin_optimization_logic import solve
+
+
+@pytest.fixture
+def complex_response_json():
+    cwd = Path(__file__).parent
+    return (cwd / "mock_llm_response_complex.json").read_text()
+
+
+def test_builder_builds_complete_components(
+    complex_response_json, partial_llm_responses
+):
+    partial_responses = partial_llm_responses(complex_response_json)
+    builder = IncrementalModelBuilder()
+
+    built = [builder.feed(partial_response) for partial_response in partial_responses]
+
+    first_built = next(index for index, names in enumerate(built) if names)
+    assert first_built < len(partial_responses) // 2
+    assert [name for names in built for name in names] == [
+        "I",
+        "J",
+        "d",
+        "s",
+        "c",
+        "x",
+        "DemandConstraint",
+    ]
+    # the last constraint is only complete with the final response
+    assert not hasattr(builder.model, "SupplyConstraint")
+
+
+@pytest.mark.integration
+def test_builder_finish(
+    complex_response_json, partial_llm_responses, mock_llm_response_complex
+):
+    builder = IncrementalModelBuilder()
+    for partial_response in partial_llm_responses(complex_response_json):
+        builder.feed(partial_response)
+
+    model = builder.finish(mock_llm_response_complex)
+
+    assert model is builder.model
+    results, solution = solve(model)
+    assert results.solver.termination_condition == pyo.TerminationCondition.optimal
+
+
+def test_builder_finish_differing_response(
+    complex_response_json, partial_llm_responses, mock_llm_response_complex
+):
+    builder = IncrementalModelBuilder()
+    for partial_response in partial_llm_responses(complex_response_json):
+        builder.feed(partial_response)
+    mock_llm_response_complex.sets[0].initialize = {1, 2}
+
+    assert builder.finish(mock_llm_response_complex) is None
+
+
+def test_builder_stops_on_failed_component(
+    complex_response_json, partial_llm_responses, mock_llm_response_complex
+):
+    builder = IncrementalModelBuilder()
+    partial_responses = partial_llm_responses(
+        complex_response_json.replace("model.x[i, j]", "model.y[i, j]")
+    )
+    for partial_response in partial_responses:
+        builder.feed(partial_response)
+
+    assert builder.failed
+    assert builder.finish(mock_llm_response_complex) is None
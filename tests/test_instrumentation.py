@@ -0,0 +1,135 @@
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from llm_optimizer.calculations.lin_optimization_logic import (
+    construct_and_solve,
+    construct_pyomo_model,
+)
+from llm_optimizer.models.llm import ValidationAnswer
+from llm_optimizer.utils import instrumentation
+from llm_optimizer.utils.instrumentation import Recorder, recording
+
+
+def test_no_recorder():
+    with instrumentation.span("stage") as span:
+        instrumentation.count("calls")
+        instrumentation.set_attributes(size=1)
+
+    assert span is None
+    assert instrumentation.active_recorder() is None
+
+
+def test_nested_spans():
+    with recording() as recorder:
+        with instrumentation.span("outer", size=2):
+            with instrumentation.span("inner"):
+                instrumentation.set_attributes(iterations=3)
+            instrumentation.count("calls", backend="pyomo")
+            instrumentation.count("calls", 2, backend="pyomo")
+
+    assert instrumentation.active_recorder() is None
+    assert [row["stage"] for row in recorder.timings()] == ["outer", "  inner"]
+    outer, inner = sorted(recorder.spans, key=lambda span: span.span_id)
+    assert inner.parent_id == outer.span_id
+    assert inner.attributes == {"iterations": 3}
+    assert outer.duration >= inner.duration
+    assert recorder.counters == {("calls", (("backend", "pyomo"),)): 3}
+
+
+def test_span_records_errors():
+    with recording() as recorder:
+        with pytest.raises(ValueError):
+            with instrumentation.span("stage"):
+                raise ValueError
+
+    assert recorder.spans[0].attributes == {"error": "ValueError"}
+
+
+def test_construct_pyomo_model_component_spans(mock_llm_response):
+    with recording() as recorder:
+        construct_pyomo_model(mock_llm_response)
+
+    stages = [row["stage"].strip() for row in recorder.timings()]
+    assert stages[0] == "construct_pyomo_model"
+    assert stages.count("build_constraint") == len(mock_llm_response.constraints)
+    assert stages[-1] == "build_objective"
+    assert {row["component"] for row in recorder.timings() if "component" in row} >= {
+        "x",
+        "MarketDemand",
+    }
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("backend", ["pyomo", "highs"])
+def test_solver_statistics(mock_llm_response, backend):
+    with recording() as recorder:
+        construct_and_solve(mock_llm_response, backend=backend)
+
+    (solve_span,) = [span for span in recorder.spans if span.name == "solve"]
+    assert solve_span.attributes["backend"] == backend
+    assert solve_span.attributes["iterations"] >= 0
+    assert ("solver_iterations", (("backend", backend),)) in recorder.counters
+    assert ("solver_mip_nodes", (("backend", backend),)) in recorder.counters
+
+
+def test_record_usage():
+    response = ValidationAnswer(valid=True, reason="")
+    response._raw_response = SimpleNamespace(
+        usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30)
+    )
+
+    with recording() as recorder:
+        with instrumentation.span("validate_optimization_problem"):
+            instrumentation.record_usage(response, "gpt-3.5-turbo")
+        # e.g. a streamed response
+        instrumentation.record_usage(ValidationAnswer(valid=True, reason=""), "gpt")
+
+    assert recorder.counter_total("llm_prompt_tokens") == 120
+    assert recorder.counter_total("llm_completion_tokens") == 30
+    assert recorder.spans[0].attributes == {
+        "prompt_tokens": 120,
+        "completion_tokens": 30,
+    }
+
+
+def test_export():
+    with recording() as recorder:
+        with instrumentation.span("outer"):
+            with instrumentation.span("inner"):
+                instrumentation.count("llm_prompt_tokens", 10, model='gpt "4o"')
+
+    prometheus = recorder.to_prometheus()
+    assert "# TYPE llm_optimizer_llm_prompt_tokens_total counter" in prometheus
+    assert 'llm_optimizer_llm_prompt_tokens_total{model="gpt \\"4o\\""} 10' in (
+        prometheus
+    )
+    assert 'llm_optimizer_span_duration_seconds_count{span="inner"} 1' in prometheus
+
+    outstream = io.StringIO()
+    recorder.export(outstream, format="otlp")
+    spans = json.loads(outstream.getvalue())["resourceSpans"][0]["scopeSpans"][0][
+        "spans"
+    ]
+    inner, outer = spans
+    assert inner["parentSpanId"] == outer["spanId"]
+    assert "parentSpanId" not in outer
+    assert int(outer["endTimeUnixNano"]) >= int(inner["endTimeUnixNano"])
+
+    with pytest.raises(ValueError):
+        recorder.export(outstream, format="csv")
+
+
+def test_export_file(tmp_path):
+    recorder = Recorder()
+    recorder.count("solver_iterations", 4, backend="highs")
+
+    recorder.export(tmp_path / "metrics.prom")
+
+    assert (
+        (tmp_path / "metrics.prom")
+        .read_text()
+        .endswith('llm_optimizer_solver_iterations_total{backend="highs"} 4\n')
+    )
@@ -0,0 +1,149 @@
+import time
+
+import pytest
+
+from llm_optimizer.calculations.solver_options import SolverOptions
+from llm_optimizer.jobs import (
+    CANCELLED,
+    FAILED,
+    FINISHED,
+    QUEUED,
+    RUNNING,
+    TIMED_OUT,
+    SolverQueue,
+)
+
+
+def sleeping_solve(payload: str, backend: str, time_limit: float | None) -> dict:
+    """stands in for `build_and_solve`, ignores the time limit for a while"""
+    if time_limit is not None:
+        time.sleep(time_limit * 100)
+    return {"status": "solved", "backend": backend}
+
+
+def failing_solve(payload: str, backend: str, time_limit: float | None) -> dict:
+    raise RuntimeError("solver crashed")
+
+
+def options_solve(
+    payload: str,
+    backend: str,
+    time_limit: float | None,
+    options: SolverOptions | None = None,
+) -> dict:
+    return {"status": "solved", "time_limit": time_limit, "threads": options.threads}
+
+
+def wait_for_status(queue: SolverQueue, job_id: str, status: str) -> None:
+    deadline = time.monotonic() + 30
+    while queue.status(job_id) != status:
+        assert time.monotonic() < deadline, queue.status(job_id)
+        time.sleep(0.05)
+
+
+def test_submit_and_cancel_queued(tmp_path, mock_llm_response):
+    queue = SolverQueue(tmp_path / "jobs.sqlite3")
+
+    job_id = queue.submit(mock_llm_response, backend="highs")
+
+    assert queue.status(job_id) == QUEUED
+    assert queue.cancel(job_id)
+    assert not queue.cancel(job_id)
+    assert queue.result(job_id) == {"status": CANCELLED, "error": None}
+    with pytest.raises(KeyError):
+        queue.job("unknown")
+    with pytest.raises(ValueError):
+        queue.submit(mock_llm_response, backend="glpk")
+
+
+def test_wait_timeout(tmp_path, mock_llm_response):
+    queue = SolverQueue(tmp_path / "jobs.sqlite3")
+    job_id = queue.submit(mock_llm_response)
+
+    with pytest.raises(TimeoutError):
+        queue.wait(job_id, timeout=0.2)
+
+
+@pytest.mark.integration
+def test_solver_queue_solves(tmp_path, mock_llm_response):
+    with SolverQueue(tmp_path / "jobs.sqlite3", workers=2) as queue:
+        job_ids = [
+            queue.submit(mock_llm_response, backend=backend)
+            for backend in ("pyomo", "highs")
+        ]
+        results = [queue.result(job_id, timeout=60) for job_id in job_ids]
+
+    assert all(queue.status(job_id) == FINISHED for job_id in job_ids)
+    assert [result["objective"] for result in results] == [
+        pytest.approx(1600),
+        pytest.approx(1600),
+    ]
+
+
+def test_solver_queue_cancel_running(tmp_path, mock_llm_response):
+    queue = SolverQueue(tmp_path / "jobs.sqlite3", workers=1, solve_job=sleeping_solve)
+    with queue:
+        job_id = queue.submit(mock_llm_response, time_limit=10)
+        wait_for_status(queue, job_id, RUNNING)
+        (worker,) = queue._processes
+
+        assert queue.cancel(job_id)
+        wait_for_status(queue, job_id, CANCELLED)
+
+        # the stopped worker is replaced and runs the next job
+        assert queue.result(queue.submit(mock_llm_response), timeout=30) == {
+            "status": "solved",
+            "backend": "pyomo",
+        }
+        assert queue._processes[0] is not worker
+
+
+def test_solver_queue_time_limit(tmp_path, mock_llm_response):
+    queue = SolverQueue(
+        tmp_path / "jobs.sqlite3",
+        workers=1,
+        solve_job=sleeping_solve,
+        kill_grace=0.2,
+    )
+    with queue:
+        job_id = queue.submit(mock_llm_response, time_limit=0.1)
+
+        result = queue.result(job_id, timeout=30)
+
+    assert result["status"] == TIMED_OUT
+
+
+def test_solver_queue_failed_job(tmp_path, mock_llm_response):
+    with SolverQueue(
+        tmp_path / "jobs.sqlite3", workers=1, solve_job=failing_solve
+    ) as queue:
+        job_id = queue.submit(mock_llm_response)
+
+        result = queue.result(job_id, timeout=30)
+
+    assert result == {"status": FAILED, "error": "RuntimeError: solver crashed"}
+
+
+def test_solver_queue_requeues_on_close(tmp_path, mock_llm_response):
+    path = tmp_path / "jobs.sqlite3"
+    with SolverQueue(path, workers=1, solve_job=sleeping_solve) as queue:
+        job_id = queue.submit(mock_llm_response, time_limit=10)
+        wait_for_status(queue, job_id, RUNNING)
+
+    assert queue.status(job_id) == QUEUED
+
+
+def test_solver_queue_options(tmp_path, mock_llm_response):
+    with SolverQueue(
+        tmp_path / "jobs.sqlite3", workers=1, solve_job=options_solve
+    ) as queue:
+        job_id = queue.submit(
+            mock_llm_response,
+            time_limit=2,
+            options=SolverOptions(time_limit=10, threads=2),
+        )
+
+        result = queue.result(job_id, timeout=30)
+
+    assert result == {"status": "solved", "time_limit": 2, "threads": 2}
+    assert queue.job(job_id).time_limit == 2
@@ -0,0 +1,102 @@
+import pytest
+from pydantic import ValidationError
+
+from llm_optimizer.models.lean import LeanLinearOptimizationModel
+
+
+def lean_response(**changes) -> LeanLinearOptimizationModel:
+    return LeanLinearOptimizationModel.model_validate(
+        {
+            "sets": [
+                {"name": "I", "members": [1, 2]},
+                {"name": "J", "members": [1, 2, 3]},
+            ],
+            "parameters": [
+                {"name": "c", "indexes": ["I", "J"], "values": [1, 2, 3, 4, 5, 6]},
+                {"name": "d", "indexes": ["model.J"], "values": [7, 8, 9]},
+            ],
+            "variables": [
+                {"name": "x", "indexes": ["I", "J"], "domain": "NonNegativeReals"}
+            ],
+            "constraints": [
+                {
+                    "name": "demand",
+                    "idxs": ["J"],
+                    "args": ["model", "j"],
+                    "body": "sum(model.x[i, j] for i in model.I) >= model.d[j]",
+                }
+            ],
+            "objective": {
+                "expr": "sum(model.c[i, j] * model.x[i, j] for i in model.I "
+                "for j in model.J)",
+                "sense": "minimize",
+            },
+            **changes,
+        }
+    )
+
+
+def test_lean_to_model():
+    llm_pyomo_model = lean_response().to_model()
+
+    cost, demand = llm_pyomo_model.parameters
+    # the last index changes fastest
+    assert cost.initialize == {
+        (1, 1): 1,
+        (1, 2): 2,
+        (1, 3): 3,
+        (2, 1): 4,
+        (2, 2): 5,
+        (2, 3): 6,
+    }
+    assert demand.initialize == {1: 7, 2: 8, 3: 9}
+    assert llm_pyomo_model.constraints[0].rule.lambda_arguments == ["model", "j"]
+    assert llm_pyomo_model.objective.optimization_sense.value == "minimize"
+    assert llm_pyomo_model.mathematical_formulation == ""
+
+
+def test_lean_wrong_number_of_values():
+    with pytest.raises(ValidationError, match="needs 3 values"):
+        lean_response(parameters=[{"name": "d", "indexes": ["J"], "values": [7, 8]}])
+    with pytest.raises(ValidationError, match="unknown set"):
+        lean_response(parameters=[{"name": "d", "indexes": ["K"], "values": [7, 8]}])
+    with pytest.raises(ValidationError, match="at least 1 item"):
+        lean_response(parameters=[{"name": "d", "indexes": [], "values": [7]}])
+
+
+def test_lean_data_file_sources():
+    source = {"file": "demand.csv", "columns": ["j"]}
+    sets = [{"name": "I", "members": [1, 2]}, {"name": "J", "source": source}]
+    demand = {
+        "name": "d",
+        "indexes": ["J"],
+        "source": {**source, "columns": ["j", "demand"]},
+    }
+
+    llm_pyomo_model = lean_response(
+        sets=sets,
+        parameters=[{"name": "c", "indexes": ["I"], "values": [1, 2]}, demand],
+    ).to_model()
+
+    assert llm_pyomo_model.sets[1].source.file == "demand.csv"
+    assert llm_pyomo_model.parameters[1].initialize == {}
+    assert llm_pyomo_model.parameters[1].source.columns == ["j", "demand"]
+    with pytest.raises(ValidationError, match="needs a `source` too"):
+        lean_response(sets=sets, parameters=[{**demand, "source": None}])
+
+
+@pytest.mark.parametrize("fixture", ["mock_llm_response", "mock_llm_response_complex"])
+def test_lean_round_trip(fixture, request):
+    llm_pyomo_model = request.getfixturevalue(fixture)
+
+    lean = LeanLinearOptimizationModel.from_model(llm_pyomo_model)
+    round_trip = lean.to_model()
+
+    assert round_trip.parameters == [
+        pyo_param.model_copy(update={"doc": ""})
+        for pyo_param in llm_pyomo_model.parameters
+    ]
+    assert [pyo_constr.rule for pyo_constr in round_trip.constraints] == [
+        pyo_constr.rule for pyo_constr in llm_pyomo_model.constraints
+    ]
+    assert len(lean.model_dump_json()) < len(llm_pyomo_model.model_dump_json()) / 2
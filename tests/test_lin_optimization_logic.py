@@ -1,16 +1,20 @@
 import json
 import pyomo.environ as pyo
 from pydantic import ValidationError
+from pyomo.core.expr.numeric_expr import LinearExpression
 from unittest.mock import MagicMock
 
 import pytest
 
 from llm_optimizer.models.llm import LinearOptimizationModel
+from llm_optimizer.calculations import lin_optimization_logic
 from llm_optimizer.calculations.lin_optimization_logic import (
+    build_and_solve,
     construct_pyomo_model,
     solve,
     RuleError,
 )
+from llm_optimizer.calculations.solver_options import SolverOptions
 
 
 def test_construct_pyomo_model(mock_llm_response):
@@ -68,6 +72,53 @@ def test_construct_pyomo_model_no_var(llm_response_format):
         construct_pyomo_model(LinearOptimizationModel(**json.loads(input)))
 
 
+def test_construct_pyomo_model_compiled_rules(monkeypatch, mock_llm_response_complex):
+    # the lambda path is not taken for rules the compiler recognizes
+    monkeypatch.setattr(
+        lin_optimization_logic,
+        "create_constraint",
+        MagicMock(side_effect=AssertionError),
+    )
+    llm_response = mock_llm_response_complex.model_copy(deep=True)
+    llm_response.constraints[1].rule.lambda_body = (
+        "sum(2 * model.x[i, j] for i in model.I) <= model.s[j] "
+        "if j < 3 else Constraint.Skip"
+    )
+
+    model = construct_pyomo_model(llm_response)
+
+    demand = model.DemandConstraint[1]
+    assert type(demand.body) is LinearExpression
+    assert [var.name for var in demand.body.linear_vars] == [
+        "x[1,1]",
+        "x[1,2]",
+        "x[1,3]",
+    ]
+    assert demand.equality and demand.upper == 30000
+    supply = model.SupplyConstraint[1]
+    assert set(supply.body.linear_coefs) == {2}
+    assert supply.lower is None and supply.upper == 100000
+    assert list(model.SupplyConstraint) == [1, 2]
+
+
+def test_construct_pyomo_model_lambda_fallback(mock_llm_response_complex):
+    nonlinear = mock_llm_response_complex.model_copy(deep=True)
+    # the rule is linear up to the fifth index
+    nonlinear.constraints[0].rule.lambda_body = (
+        "model.x[i, 1] <= model.d[i] if i < 5 "
+        "else model.x[i, 1] * model.x[i, 2] <= model.d[i]"
+    )
+
+    model = construct_pyomo_model(nonlinear)
+    mutable_model = construct_pyomo_model(mock_llm_response_complex, True)
+
+    assert len(model.DemandConstraint) == 8
+    assert model.DemandConstraint[1].upper == 30000
+    assert model.DemandConstraint[6].body.polynomial_degree() == 2
+    # rules with mutable parameters stay pyomo expressions of the parameters
+    assert "d[1]" in str(mutable_model.DemandConstraint[1].expr)
+
+
 def test_solve_isolated(monkeypatch):
     mock_solver = MagicMock()
     mock_results = MagicMock()
@@ -88,6 +139,37 @@ def test_solve_isolated(monkeypatch):
     assert results == mock_results
 
 
+def test_solve_options_isolated(monkeypatch):
+    mock_solver = MagicMock()
+    monkeypatch.setattr(pyo, "SolverFactory", MagicMock(return_value=mock_solver))
+    model = pyo.ConcreteModel()
+
+    solve(model, options=SolverOptions(mip_gap=0.01, presolve=False), time_limit=5)
+
+    mock_solver.solve.assert_called_once_with(
+        model, options={"presolve": "off", "mip_rel_gap": 0.01}, timelimit=5
+    )
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("backend", ["pyomo", "highs"])
+def test_build_and_solve_options(backend, mock_llm_response):
+    llm_response_json = mock_llm_response.model_dump_json()
+    # another number of threads than the solves before in this process
+    options = SolverOptions(time_limit=30, threads=2, method="ipm", mip_gap=0.01)
+
+    result = build_and_solve(llm_response_json, backend=backend, options=options)
+
+    assert result["optimal"]
+    assert result["objective"] == pytest.approx(1600)
+    assert build_and_solve(llm_response_json, backend=backend)["optimal"]
+    if backend == "highs":
+        with pytest.raises(ValueError, match="cannot solve with cbc"):
+            build_and_solve(
+                llm_response_json, backend=backend, options=SolverOptions(solver="cbc")
+            )
+
+
 @pytest.mark.integration
 def test_solve_integrated(mock_llm_response):
     pyomo_model = construct_pyomo_model(mock_llm_response)
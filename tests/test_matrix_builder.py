@@ -0,0 +1,114 @@
+import pyomo.environ as pyo
+import pytest
+
+from llm_optimizer.calculations.lin_optimization_logic import (
+    construct_pyomo_model,
+    solve,
+)
+from llm_optimizer.calculations.matrix_builder import (
+    NotLinearError,
+    build_matrix_model,
+    matrix_model_from_pyomo,
+    to_highs,
+)
+
+
+def test_build_matrix_model(mock_llm_response_complex):
+    matrix_model = build_matrix_model(mock_llm_response_complex)
+
+    assert matrix_model.num_cols == 8 * 3
+    assert matrix_model.num_rows == 8 + 3
+    assert matrix_model.num_nonzeros == 2 * 8 * 3
+    assert matrix_model.sense == "minimize"
+    assert (matrix_model.col_lower == 0).all()
+    assert not matrix_model.integrality.any()
+    demand_row = matrix_model.row_names.index(("DemandConstraint", 1))
+    assert matrix_model.row_lower[demand_row] == matrix_model.row_upper[demand_row]
+
+
+def test_build_matrix_model_scalar_vars(mock_llm_response):
+    matrix_model = build_matrix_model(mock_llm_response)
+
+    assert matrix_model.column_names == [("x", None), ("A", None), ("B", None)]
+    assert list(matrix_model.objective) == [170, -50, -40]
+    assert matrix_model.sense == "maximize"
+
+
+def test_build_matrix_model_skip_and_shift(indexed_llm_response):
+    llm_response = indexed_llm_response(
+        constraints={
+            "c0": "model.x[i] - model.x[model.I.prev(i)] >= model.d[i] / 2 "
+            "if i > 1 else Constraint.Skip"
+        }
+    )
+
+    matrix_model = build_matrix_model(llm_response)
+
+    assert matrix_model.row_names == [("c0", 2), ("c0", 3)]
+    assert list(matrix_model.row_lower) == [2, 3]
+    assert list(matrix_model.a_value) == [1, -1, 1, -1]
+
+
+def test_build_matrix_model_not_linear(indexed_llm_response):
+    with pytest.raises(NotLinearError):
+        build_matrix_model(
+            indexed_llm_response(
+                constraints={"c0": "model.x[i] * model.x[i] >= model.d[i]"}
+            )
+        )
+
+
+def test_build_matrix_model_fallback(indexed_llm_response):
+    llm_response = indexed_llm_response(
+        constraints={
+            "c0": "model.x[i] >= model.d[i]",
+            "c1": "model.x[i] - model.d[i] >= model.I.at(1)",
+        },
+        objective="model.x[1] * 2 + 3",
+    )
+
+    matrix_model = build_matrix_model(llm_response)
+
+    assert matrix_model.row_names[3:] == [("c1", 1), ("c1", 2), ("c1", 3)]
+    assert list(matrix_model.row_lower[3:]) == [3, 5, 7]
+    assert list(matrix_model.a_index[3:]) == [0, 1, 2]
+    assert list(matrix_model.objective) == [2, 0, 0]
+    assert matrix_model.objective_offset == 3
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("fixture", ["mock_llm_response", "mock_llm_response_complex"])
+def test_matrix_model_from_pyomo(fixture, request):
+    llm_response = request.getfixturevalue(fixture)
+
+    reference = build_matrix_model(llm_response)
+    matrix_model = matrix_model_from_pyomo(construct_pyomo_model(llm_response))
+
+    assert matrix_model.column_names == reference.column_names
+    assert matrix_model.row_names == reference.row_names
+    assert matrix_model.var_docs == reference.var_docs
+    assert matrix_model.sense == reference.sense
+    for name in ("col_lower", "col_upper", "objective"):
+        assert list(getattr(matrix_model, name)) == list(getattr(reference, name))
+    assert list(matrix_model.a_start) == list(reference.a_start)
+    # pyomo may move the terms of a row to the other side
+    highs, reference_highs = to_highs(matrix_model), to_highs(reference)
+    highs.run()
+    reference_highs.run()
+    assert highs.getInfo().objective_function_value == pytest.approx(
+        reference_highs.getInfo().objective_function_value
+    )
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("fixture", ["mock_llm_response", "mock_llm_response_complex"])
+def test_to_highs_same_solution(fixture, request):
+    llm_response = request.getfixturevalue(fixture)
+
+    _, reference = solve(construct_pyomo_model(llm_response))
+    highs = to_highs(build_matrix_model(llm_response))
+    highs.run()
+
+    assert highs.getInfo().objective_function_value == pytest.approx(
+        pyo.value(reference.my_objective)
+    )
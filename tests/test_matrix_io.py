@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from llm_optimizer.calculations.highs_backend import solve_matrix_model
+from llm_optimizer.calculations.lin_optimization_logic import (
+    construct_and_solve,
+    summarize_solution,
+)
+from llm_optimizer.calculations.matrix_builder import (
+    MatrixModel,
+    build_matrix_model,
+)
+from llm_optimizer.calculations.matrix_io import load_matrix_model, save_matrix_model
+
+
+def assert_same_matrix_model(loaded: MatrixModel, matrix_model: MatrixModel):
+    assert loaded.column_names == matrix_model.column_names
+    assert loaded.row_names == matrix_model.row_names
+    assert loaded.objective_offset == matrix_model.objective_offset
+    assert loaded.sense == matrix_model.sense
+    assert loaded.var_docs == matrix_model.var_docs
+    for name in ("col_lower", "col_upper", "row_lower", "row_upper", "a_value"):
+        assert np.array_equal(getattr(loaded, name), getattr(matrix_model, name))
+    assert loaded.integrality.dtype == bool
+    assert loaded.a_start.dtype == np.int64
+
+
+@pytest.mark.parametrize("filename", ["model.npz", "model"])
+def test_save_and_load(tmp_path, mock_llm_response_complex, filename):
+    matrix_model = build_matrix_model(mock_llm_response_complex)
+
+    path = save_matrix_model(matrix_model, tmp_path / filename)
+
+    assert_same_matrix_model(load_matrix_model(path), matrix_model)
+
+
+def test_load_memory_mapped(tmp_path, mock_llm_response):
+    matrix_model = build_matrix_model(mock_llm_response)
+    # tuple keys of multi dimensional indexes survive the json names
+    matrix_model.row_names[0] = ("MarketDemand", (1, "a"))
+    save_matrix_model(matrix_model, tmp_path / "model")
+
+    loaded = load_matrix_model(tmp_path / "model")
+
+    assert isinstance(loaded.a_value, np.memmap)
+    assert not loaded.a_value.flags.writeable
+    assert loaded.row_names[0] == ("MarketDemand", (1, "a"))
+    assert not isinstance(
+        load_matrix_model(tmp_path / "model", mmap=False).a_value, np.memmap
+    )
+
+
+def test_load_unknown_format(tmp_path, mock_llm_response):
+    path = save_matrix_model(build_matrix_model(mock_llm_response), tmp_path / "model")
+    (path / "metadata.json").write_text('{"format_version": 0}')
+
+    with pytest.raises(ValueError):
+        load_matrix_model(path)
+
+
+@pytest.mark.integration
+def test_solve_loaded(tmp_path, mock_llm_response_complex):
+    save_matrix_model(
+        build_matrix_model(mock_llm_response_complex),
+        tmp_path / "model.npz",
+        compressed=True,
+    )
+
+    summary = summarize_solution(
+        *solve_matrix_model(load_matrix_model(tmp_path / "model.npz"))
+    )
+
+    reference = summarize_solution(*construct_and_solve(mock_llm_response_complex))
+    assert summary["objective"] == pytest.approx(reference["objective"])
+    assert summary["variables"].keys() == reference["variables"].keys()
@@ -0,0 +1,129 @@
+import pytest
+
+from llm_optimizer.calculations import lin_optimization_logic
+from llm_optimizer.calculations.lin_optimization_logic import (
+    build_and_solve,
+    check_model,
+)
+from llm_optimizer.calculations.matrix_builder import build_matrix_model
+from llm_optimizer.calculations.model_analysis import (
+    ModelTooLargeError,
+    NonlinearRuleError,
+    SizeLimits,
+    analyze_model,
+    route_backend,
+)
+from llm_optimizer.models.llm import DataSource
+
+
+def with_rule(llm_response, lambda_body: str, objective: str | None = None):
+    """the complex response with another rule of its first constraint"""
+    changed = llm_response.model_copy(deep=True)
+    changed.constraints[0].rule.lambda_body = lambda_body
+    if objective is not None:
+        changed.objective.expr = objective
+    return changed
+
+
+def test_analyze_model_size(mock_llm_response_complex):
+    analysis = analyze_model(mock_llm_response_complex)
+    matrix_model = build_matrix_model(mock_llm_response_complex)
+
+    assert analysis.problem_class == "LP"
+    assert (analysis.rows, analysis.columns, analysis.nonzeros) == (
+        matrix_model.num_rows,
+        matrix_model.num_cols,
+        matrix_model.num_nonzeros,
+    )
+    assert analysis.summary() == "LP, 11 rows, 24 columns, 48 nonzeros"
+
+
+@pytest.mark.parametrize(
+    "lambda_body, objective",
+    [
+        ("sum(model.x[i, j] * model.x[i, j] for j in model.J) == model.d[i]", None),
+        ("sum(model.d[i] / model.x[i, j] for j in model.J) >= 1", None),
+        ("model.x[i, 1] >= 1 if model.x[i, 2] >= 1 else Constraint.Skip", None),
+        ("sum(model.x[i, j] for j in model.J) == model.d[i]", "model.x[1, 1] ** 2"),
+    ],
+)
+def test_analyze_model_nonlinear(mock_llm_response_complex, lambda_body, objective):
+    llm_response = with_rule(mock_llm_response_complex, lambda_body, objective)
+
+    analysis = analyze_model(llm_response)
+
+    assert analysis.problem_class == "nonlinear"
+    assert analysis.nonlinear == [
+        ("objective", "objective")
+        if objective
+        else ("constraint", llm_response.constraints[0].name)
+    ]
+
+
+def test_analyze_model_linear_forms(mock_llm_response_complex):
+    llm_response = with_rule(
+        mock_llm_response_complex,
+        "-(2 ** 3) * sum(model.x[i, j] / model.s[j] for j in model.J) "
+        "== model.d[i] ** 2",
+    )
+    llm_response.variables[0].domain = "NonNegativeIntegers"
+
+    analysis = analyze_model(llm_response)
+
+    assert analysis.problem_class == "MILP"
+    assert analysis.integer_columns == 24
+
+
+def test_analyze_model_unknown_sizes(mock_llm_response_complex):
+    llm_response = mock_llm_response_complex.model_copy(deep=True)
+    llm_response.sets[0].source = DataSource(file="destinations.csv", columns=["i"])
+
+    analysis = analyze_model(llm_response)
+
+    assert analysis.rows is None
+    assert analysis.columns is None
+    assert "? rows" in analysis.summary()
+
+
+def test_check_model(mock_llm_response_complex):
+    nonlinear = with_rule(
+        mock_llm_response_complex,
+        "sum(model.x[i, j] * model.x[i, j] for j in model.J) == model.d[i]",
+    )
+    with pytest.raises(NonlinearRuleError):
+        check_model(nonlinear)
+    with pytest.raises(ModelTooLargeError, match="about 48 nonzeros"):
+        check_model(
+            mock_llm_response_complex, SizeLimits(rows=100, columns=100, nonzeros=10)
+        )
+
+    result = build_and_solve(nonlinear.model_dump_json())
+
+    assert result["status"] == "build_error"
+    assert result["component"] == {
+        "kind": "constraint",
+        "name": nonlinear.constraints[0].name,
+    }
+
+
+def test_check_model_given_analysis(mock_llm_response_complex, monkeypatch):
+    analysis = analyze_model(mock_llm_response_complex)
+    monkeypatch.setattr(lin_optimization_logic, "analyze_model", None)
+
+    assert check_model(mock_llm_response_complex, analysis=analysis) is analysis
+    with pytest.raises(ModelTooLargeError):
+        check_model(
+            mock_llm_response_complex,
+            SizeLimits(rows=100, columns=100, nonzeros=10),
+            analysis,
+        )
+
+
+def test_route_backend(mock_llm_response_complex):
+    analysis = analyze_model(mock_llm_response_complex)
+
+    assert route_backend(analysis, "pyomo") == "pyomo"
+    analysis.nonzeros = 10_000_000
+    assert route_backend(analysis, "pyomo") == "highs"
+    analysis.nonzeros = None
+    assert route_backend(analysis, "pyomo") == "pyomo"
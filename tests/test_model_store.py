@@ -0,0 +1,103 @@
+import pyomo.environ as pyo
+import pytest
+
+from llm_optimizer.calculations.lin_optimization_logic import construct_pyomo_model
+from llm_optimizer.calculations.model_store import ModelStore, referenced_components
+from llm_optimizer.utils.helpers import ExpressionNotSafeError
+
+
+def test_referenced_components():
+    assert referenced_components("model.x[i] >= model.d[i] + 1") == {"x", "d"}
+    assert referenced_components(None) == set()
+
+
+def test_model_store_update_params_in_place(indexed_llm_response):
+    store = ModelStore()
+    assert store.update(indexed_llm_response()).rebuilt
+    model, demand = store.model, store.model.demand
+
+    changes = store.update(indexed_llm_response(demand=(1, 1, 1)))
+
+    assert not changes.rebuilt
+    assert changes.components == ["d"]
+    assert store.model is model and store.model.demand is demand
+    assert pyo.value(store.model.d[2]) == 1
+
+
+def test_model_store_update_constraints(indexed_llm_response):
+    store = ModelStore()
+    store.update(indexed_llm_response())
+
+    changes = store.update(
+        indexed_llm_response(
+            constraints={"limit": "model.x[i] <= model.d[i] + 1"},
+        )
+    )
+
+    assert changes.components == ["demand", "limit"]
+    assert store.model.component("demand") is None
+    assert len(store.model.limit) == 3
+
+
+def test_model_store_prebuilt(indexed_llm_response):
+    llm_response = indexed_llm_response()
+    prebuilt = construct_pyomo_model(llm_response, mutable_params=True)
+    store = ModelStore()
+
+    store.update(llm_response, prebuilt=prebuilt)
+    changes = store.update(indexed_llm_response(demand=(1, 1, 1)))
+
+    assert store.model is prebuilt
+    assert changes.components == ["d"]
+
+
+def test_model_store_rebuilds_on_changed_sets(indexed_llm_response):
+    store = ModelStore()
+    store.update(indexed_llm_response())
+    llm_response = indexed_llm_response()
+    llm_response.sets[0].initialize = [1, 2, 3, 4]
+    llm_response.parameters[0].initialize[4] = 8
+
+    assert store.update(llm_response).rebuilt
+    assert len(store.model.x) == 4
+
+
+def test_model_store_immutable_params_fallback(indexed_llm_response):
+    constraints = {
+        "demand": "model.x[i] >= model.d[i] if model.d[i] > 3 else model.x[i] >= 3"
+    }
+    store = ModelStore()
+    store.update(indexed_llm_response(constraints=constraints))
+    assert not store.model.d.mutable
+
+    changes = store.update(
+        indexed_llm_response(demand=(4, 4, 4), constraints=constraints)
+    )
+
+    assert changes.components == ["d", "demand"]
+    assert store.model.demand[1].lower == 4
+
+
+def test_model_store_failed_update_resets(indexed_llm_response):
+    store = ModelStore()
+    store.update(indexed_llm_response())
+
+    with pytest.raises(ExpressionNotSafeError):
+        store.update(indexed_llm_response(constraints={"bad": "model.y[i] >= 0"}))
+
+    assert store.model is None
+    assert store.update(indexed_llm_response()).rebuilt
+
+
+@pytest.mark.integration
+def test_model_store_resolve(indexed_llm_response):
+    store = ModelStore()
+    store.update(indexed_llm_response())
+    _, solution = store.solve()
+    assert solution.my_objective() == pytest.approx(12)
+
+    store.update(indexed_llm_response(demand=(1, 2, 3)))
+    results, solution = store.solve()
+
+    assert results.solver.termination_condition == pyo.TerminationCondition.optimal
+    assert solution.my_objective() == pytest.approx(6)
@@ -0,0 +1,51 @@
+import pytest
+
+from llm_optimizer.calculations.portfolio import default_portfolio, race
+from llm_optimizer.calculations.solver_options import SolverOptions
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("backend", ["pyomo", "highs"])
+def test_race(backend, mock_llm_response_complex):
+    portfolio = [SolverOptions(method="simplex"), SolverOptions(method="ipm")]
+
+    result = race(
+        mock_llm_response_complex.model_dump_json(),
+        portfolio,
+        backend=backend,
+        time_limit=60,
+        base_options=SolverOptions(threads=1, method="pdlp"),
+    )
+
+    assert result["optimal"]
+    assert result["objective"] == pytest.approx(2611350)
+    assert result["options"]["method"] in ("simplex", "ipm")
+    assert result["options"]["time_limit"] == 60
+    assert result["options"]["threads"] == 1
+
+
+@pytest.mark.integration
+def test_race_relaxed_mip_gap(mock_llm_response_complex):
+    llm_response = mock_llm_response_complex.model_copy(deep=True)
+    llm_response.variables[0].domain = "NonNegativeIntegers"
+
+    result = race(llm_response.model_dump_json(), [SolverOptions(mip_gap=0.5)])
+
+    assert result["status"] == "solved"
+    assert not result["optimal"]
+    assert result["options"]["mip_gap"] == 0.5
+
+
+def test_race_build_error(mock_llm_response):
+    llm_response = mock_llm_response.model_copy(deep=True)
+    llm_response.constraints[0].rule.lambda_body = "model.unknown <= 40"
+
+    result = race(llm_response.model_dump_json(), [SolverOptions(), SolverOptions()])
+
+    assert result["status"] == "build_error"
+    assert result["component"]["name"] == llm_response.constraints[0].name
+
+
+def test_default_portfolio():
+    assert all(options.solver == "highs" for options in default_portfolio("highs"))
+    assert len(default_portfolio("pyomo")) >= len(default_portfolio("highs"))
@@ -0,0 +1,86 @@
+import pytest
+
+from llm_optimizer.models.problem_data import (
+    ProblemData,
+    apply_problem_data,
+    marked_rules,
+    rule_constants,
+)
+
+
+def changed(data: ProblemData, **fields) -> ProblemData:
+    return ProblemData.model_validate({**data.model_dump(), **fields})
+
+
+def test_marked_rules(mock_llm_response):
+    marked = marked_rules(mock_llm_response)
+
+    assert [pyo_constr.rule.lambda_body for pyo_constr in marked.constraints] == [
+        "model.x <= <c1>",
+        "model.A >= model.x",
+        "model.B >= <c2> * model.x",
+        "model.A <= <c3>",
+        "model.B <= <c4>",
+    ]
+    assert marked.objective.expr.startswith("<c5> * model.x - <c6> * model.x")
+    assert len(rule_constants(mock_llm_response)) == 8
+    # the original is not changed
+    assert mock_llm_response.constraints[0].rule.lambda_body == "model.x <= 40"
+
+
+def test_index_literals_are_structure(mock_llm_response_complex):
+    llm_response = mock_llm_response_complex.model_copy(deep=True)
+    llm_response.constraints[0].rule.lambda_body = "model.x[i, 1] + 2 <= -3"
+
+    constants = rule_constants(llm_response)
+
+    assert marked_rules(llm_response).constraints[0].rule.lambda_body == (
+        "model.x[i, 1] + <c1> <= -<c2>"
+    )
+    data = ProblemData(
+        sets=[{"name": "I", "members": [1]}, {"name": "J", "members": [1]}],
+        parameters=[
+            {"name": "d", "values": [1]},
+            {"name": "s", "values": [2]},
+            {"name": "c", "values": [3]},
+        ],
+        constants=[4, -5.5, *([1] * (len(constants) - 2))],
+    )
+    applied = apply_problem_data(llm_response, data)
+    assert applied.constraints[0].rule.lambda_body == "model.x[i, 1] + 4 <= -(-5.5)"
+    assert applied.parameters[2].initialize == {(1, 1): 3}
+
+
+def test_apply_problem_data(mock_llm_response_complex):
+    data = ProblemData(
+        sets=[{"name": "I", "members": [1, 2]}, {"name": "J", "members": [1]}],
+        parameters=[
+            {"name": "d", "values": [10, 20]},
+            {"name": "s", "values": [50]},
+            {"name": "c", "values": [1.5, 2.5]},
+        ],
+    )
+
+    applied = apply_problem_data(mock_llm_response_complex, data)
+
+    assert applied.sets[0].initialize == {1, 2}
+    assert applied.parameters[0].initialize == {1: 10, 2: 20}
+    assert applied.parameters[2].initialize == {(1, 1): 1.5, (2, 1): 2.5}
+    assert applied.constraints == mock_llm_response_complex.constraints
+    with pytest.raises(ValueError, match="needs 2 values"):
+        apply_problem_data(
+            mock_llm_response_complex,
+            changed(
+                data,
+                parameters=[
+                    *data.model_dump()["parameters"][:2],
+                    {"name": "c", "values": [1.5]},
+                ],
+            ),
+        )
+    with pytest.raises(ValueError, match="no members for the set `J`"):
+        apply_problem_data(
+            mock_llm_response_complex, changed(data, sets=data.model_dump()["sets"][:1])
+        )
+    with pytest.raises(ValueError, match="constants"):
+        apply_problem_data(mock_llm_response_complex, changed(data, constants=[1]))
@@ -0,0 +1,127 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from llm_optimizer import batch
+from llm_optimizer.calculations.lin_optimization_logic import (
+    build_and_solve,
+    construct_pyomo_model,
+    failed_component,
+)
+from llm_optimizer.models.llm import PyomoConstraint, Rule
+from llm_optimizer.repair import construct_with_repairs
+from llm_optimizer.utils.helpers import ExpressionNotSafeError
+
+
+@pytest.fixture
+def broken_llm_response(mock_llm_response):
+    mock_llm_response.constraints[1].rule.lambda_body = "model.A >= model.y"
+    return mock_llm_response
+
+
+def fixed_constraint(name="other") -> PyomoConstraint:
+    return PyomoConstraint(
+        name=name,
+        idxs=[],
+        rule=Rule(lambda_arguments=["model"], lambda_body="model.A >= model.x"),
+        doc="",
+    )
+
+
+def repair_client(*components):
+    client = MagicMock()
+    client.chat.completions.create.side_effect = list(components)
+    return client
+
+
+def test_failed_component(broken_llm_response):
+    with pytest.raises(ExpressionNotSafeError) as error:
+        construct_pyomo_model(broken_llm_response)
+
+    component = failed_component(error.value)
+    assert (component.kind, component.name) == (
+        "constraint",
+        broken_llm_response.constraints[1].name,
+    )
+    assert failed_component(ValueError()) is None
+
+
+def test_build_and_solve_failed_component(broken_llm_response):
+    result = build_and_solve(broken_llm_response.model_dump_json())
+
+    assert result["status"] == "build_error"
+    assert result["component"] == {
+        "kind": "constraint",
+        "name": broken_llm_response.constraints[1].name,
+    }
+
+
+def test_construct_with_repairs(broken_llm_response):
+    name = broken_llm_response.constraints[1].name
+    client = repair_client(fixed_constraint())
+
+    model, repaired, repairs = construct_with_repairs(
+        broken_llm_response, client=client
+    )
+
+    assert [(repair.kind, repair.name) for repair in repairs] == [("constraint", name)]
+    assert "ExpressionNotSafeError" in repairs[0].error
+    # the fix keeps the name and only that component is replaced
+    assert repaired.constraints[1] == fixed_constraint(name)
+    assert repaired.constraints[0] == broken_llm_response.constraints[0]
+    assert broken_llm_response.constraints[1].rule.lambda_body == "model.A >= model.y"
+    assert model.component(name) is not None
+
+    (request,) = client.chat.completions.create.call_args_list
+    assert request.kwargs["response_model"] is PyomoConstraint
+    prompt = request.kwargs["messages"][0]["content"]
+    assert "model.A >= model.y" in prompt
+    assert "var model.x" in prompt
+    assert broken_llm_response.constraints[0].rule.lambda_body not in prompt
+
+
+def test_construct_with_repairs_gives_up(broken_llm_response):
+    broken = broken_llm_response.constraints[1]
+    client = repair_client(broken, broken)
+
+    with pytest.raises(ExpressionNotSafeError):
+        construct_with_repairs(broken_llm_response, max_repairs=2, client=client)
+    assert client.chat.completions.create.call_count == 2
+
+    client = repair_client()
+    with pytest.raises(ValueError):
+        construct_with_repairs(
+            broken_llm_response.model_copy(update={"variables": []}), client=client
+        )
+    client.chat.completions.create.assert_not_called()
+
+
+def test_batch_repairs(broken_llm_response, monkeypatch):
+    async def repair_component_async(client, llm_pyomo_model, kind, name, error):
+        return fixed_constraint(name)
+
+    monkeypatch.setattr(batch, "get_async_client", MagicMock())
+    monkeypatch.setattr(batch, "repair_component_async", repair_component_async)
+    monkeypatch.setattr(
+        batch, "ask_llm_for_pyomo_model", lambda *args, **kwargs: broken_llm_response
+    )
+
+    with ThreadPoolExecutor(1) as executor:
+        result = asyncio.run(
+            batch._process_problem(
+                {"id": 1, "problem": "problem"},
+                asyncio.Semaphore(1),
+                executor,
+                validate_input=False,
+                max_retries=1,
+                cache=None,
+                mock=True,
+                backend="highs",
+                max_repairs=1,
+            )
+        )
+
+    assert result["status"] == "solved"
+    assert result["repairs"] == 1
@@ -0,0 +1,52 @@
+from llm_optimizer.llm.similarity import SimilarityIndex, problem_terms
+
+
+POST_OFFICE = (
+    "A post office requires a different number of full-time employees on each "
+    "day of the week: Monday= 17, Tuesday= 13, Wednesday= 15, Thursday= 19, "
+    "Friday= 14, Saturday= 16, Sunday= 11. Each employee works 5 consecutive "
+    "days. Minimize the number of employees."
+)
+PIE_EATING = (
+    "Max is in a pie eating contest that lasts 1 hour. Each torte takes 2 "
+    "minutes, each apple pie 3 minutes. He receives 4 points for each torte and "
+    "5 points for each pie. What should Max eat to get the most points?"
+)
+
+
+def mock_llm_response_with_name(llm_response, name):
+    renamed = llm_response.model_copy(deep=True)
+    renamed.variables[0].name = name
+    return renamed
+
+
+def test_problem_terms():
+    terms = problem_terms("Monday= 17, Tuesday= 13.5")
+
+    assert terms["<number>"] == 2
+    assert terms["monday <number>"] == 1
+
+
+def test_similarity_index(tmp_path, mock_llm_response):
+    index = SimilarityIndex(tmp_path / "problems.sqlite3")
+    assert index.lookup(POST_OFFICE) is None
+
+    index.add(POST_OFFICE, mock_llm_response)
+    index.add(PIE_EATING, mock_llm_response_with_name(mock_llm_response, "pie"))
+    similar = index.lookup(POST_OFFICE.replace("17", "21").replace("= 11", "= 9"))
+
+    assert similar.similarity > 0.99
+    assert similar.problem_str == POST_OFFICE
+    assert similar.llm_pyomo_model.variables == mock_llm_response.variables
+    assert index.lookup("Maximize the profit of a bakery selling bread.") is None
+    assert index.lookup(PIE_EATING).llm_pyomo_model.variables[0].name == "pie"
+
+
+def test_similarity_index_max_entries(tmp_path, mock_llm_response):
+    index = SimilarityIndex(tmp_path / "problems.sqlite3", max_entries=1)
+
+    index.add(POST_OFFICE, mock_llm_response)
+    index.add(PIE_EATING, mock_llm_response)
+
+    assert len(index) == 1
+    assert index.lookup(POST_OFFICE) is None
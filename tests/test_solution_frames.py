@@ -0,0 +1,73 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as pyo
+import pytest
+
+from llm_optimizer.calculations.highs_backend import SolutionVar
+from llm_optimizer.calculations.lin_optimization_logic import construct_and_solve
+from llm_optimizer.calculations.solution_frames import (
+    frame_to_csv,
+    frame_to_parquet,
+    index_column_names,
+    solution_frames,
+    variable_frame,
+)
+
+
+def test_index_column_names():
+    assert index_column_names(["model.I", "J"], 2) == ["I", "J"]
+    assert index_column_names(["I", "I"], 2) == ["I", "I_2"]
+    assert index_column_names(["value"], 1) == ["value_2"]
+    # the names of the response do not match the keys
+    assert index_column_names(["I"], 2) == ["index_1", "index_2"]
+
+
+def test_variable_frame_pyomo_var():
+    model = pyo.ConcreteModel()
+    model.I = pyo.Set(initialize=[1, 2])
+    model.J = pyo.Set(initialize=["a", "b"])
+    model.x = pyo.Var(model.I, model.J, initialize=lambda model, i, j: i)
+    model.y = pyo.Var()
+
+    frame = variable_frame(model.x, ["I", "J"])
+
+    assert list(frame.columns) == ["I", "J", "value"]
+    assert frame.to_dict("records")[1] == {"I": 1, "J": "b", "value": 1.0}
+    assert list(variable_frame(model.y).columns) == ["value"]
+    assert np.isnan(variable_frame(model.y)["value"][0])
+
+
+def test_variable_frame_solution_var():
+    solution_var = SolutionVar("x", "", [1, 2, 3], np.array([1.0, 2.0, 3.0]))
+
+    frame = variable_frame(solution_var, ["I"])
+
+    assert frame["I"].tolist() == [1, 2, 3]
+    assert frame["value"].tolist() == [1.0, 2.0, 3.0]
+    assert variable_frame(SolutionVar("x", "", [1, 2]))["value"].isna().all()
+
+
+@pytest.mark.integration
+def test_solution_frames_backends(mock_llm_response_complex):
+    frames = {
+        backend: solution_frames(
+            construct_and_solve(mock_llm_response_complex, backend)[1],
+            mock_llm_response_complex,
+        )
+        for backend in ("pyomo", "highs")
+    }
+
+    assert list(frames["pyomo"]) == ["x"]
+    assert list(frames["pyomo"]["x"].columns) == ["I", "J", "value"]
+    pd.testing.assert_frame_equal(frames["pyomo"]["x"], frames["highs"]["x"])
+
+
+def test_frame_downloads():
+    frame = pd.DataFrame({"I": [1, "a"], "value": [1.5, 2.0]})
+
+    assert frame_to_csv(frame) == b"I,value\n1,1.5\na,2.0\n"
+    parquet_frame = pd.read_parquet(io.BytesIO(frame_to_parquet(frame)))
+    assert parquet_frame["I"].tolist() == ["1", "a"]
+    assert parquet_frame["value"].tolist() == [1.5, 2.0]
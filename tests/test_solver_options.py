@@ -0,0 +1,35 @@
+import pytest
+
+from llm_optimizer.calculations.solver_options import SolverOptions, with_time_limit
+
+
+def test_solver_options():
+    options = SolverOptions(threads=4, presolve=True, mip_gap=0.05, method="simplex")
+
+    assert SolverOptions().highs_options() == {}
+    assert options.highs_options() == {
+        "threads": 4,
+        "presolve": "on",
+        "mip_rel_gap": 0.05,
+        "solver": "simplex",
+    }
+    assert SolverOptions(solver="cbc", mip_gap=0.05, method="ipm").solver_options() == {
+        "ratioGap": 0.05
+    }
+    assert with_time_limit(options, 10).time_limit == 10
+    assert with_time_limit(None, None) == SolverOptions()
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"solver": "gurobi"},
+        {"method": "barrier"},
+        {"time_limit": 0},
+        {"threads": 0},
+        {"mip_gap": 2},
+    ],
+)
+def test_invalid_solver_options(fields):
+    with pytest.raises(ValueError):
+        SolverOptions(**fields)
@@ -0,0 +1,128 @@
+import json
+
+import pytest
+
+from llm_optimizer.calculations.lin_optimization_logic import build_and_solve
+from llm_optimizer.models.base import get_settings
+from llm_optimizer.templates import ModelTemplate, freeze_model, main
+
+
+@pytest.fixture
+def instance_data(mock_llm_response_complex):
+    """the data of the complex response as the input of its template"""
+    parameters = {
+        pyo_param.name: pyo_param.initialize
+        for pyo_param in mock_llm_response_complex.parameters
+    }
+    return {
+        "sets": {
+            pyo_set.name: sorted(pyo_set.initialize)
+            for pyo_set in mock_llm_response_complex.sets
+        },
+        "parameters": {
+            "d": [parameters["d"][i] for i in sorted(parameters["d"])],
+            "s": {str(j): value for j, value in parameters["s"].items()},
+            "c": {f"{i},{j}": value for (i, j), value in parameters["c"].items()},
+        },
+    }
+
+
+def test_freeze_and_instantiate(mock_llm_response_complex, instance_data):
+    template = freeze_model(mock_llm_response_complex, name="transport")
+
+    assert template.inputs()["parameters"].keys() == {"d", "s", "c"}
+    assert "indexed by I, J" in template.inputs()["parameters"]["c"]
+    assert all(not pyo_set.initialize for pyo_set in template.structure.sets)
+    assert template.structure.problem_str is None
+
+    llm_pyomo_model = template.instantiate(instance_data)
+
+    assert llm_pyomo_model.sets == mock_llm_response_complex.sets
+    assert llm_pyomo_model.parameters == mock_llm_response_complex.parameters
+    assert llm_pyomo_model.constraints == mock_llm_response_complex.constraints
+
+
+def test_instantiate_invalid_data(mock_llm_response_complex, instance_data):
+    template = freeze_model(mock_llm_response_complex)
+
+    with pytest.raises(ValueError, match="missing parameters: c"):
+        template.instantiate(
+            {**instance_data, "parameters": {"d": [1] * 8, "s": [1] * 3}}
+        )
+    with pytest.raises(ValueError, match="unknown sets: K"):
+        template.instantiate(
+            {**instance_data, "sets": {**instance_data["sets"], "K": [1]}}
+        )
+    with pytest.raises(ValueError, match="`d` needs 8 values, got 2"):
+        template.instantiate(
+            {
+                **instance_data,
+                "parameters": {**instance_data["parameters"], "d": [1, 2]},
+            }
+        )
+
+
+def test_save_and_load(tmp_path, mock_llm_response_complex):
+    template = freeze_model(mock_llm_response_complex)
+
+    assert ModelTemplate.load(template.save(tmp_path / "template.json")) == template
+
+    path = tmp_path / "future.json"
+    path.write_text(template.model_copy(update={"format_version": 2}).model_dump_json())
+    with pytest.raises(ValueError, match="unsupported template format"):
+        ModelTemplate.load(path)
+
+    invalid = mock_llm_response_complex.model_copy(update={"error_message": "no"})
+    with pytest.raises(ValueError, match="Only valid responses"):
+        freeze_model(invalid)
+
+
+@pytest.mark.integration
+def test_template_cli(tmp_path, mock_llm_response_complex, instance_data, monkeypatch):
+    # templates are solved without the llm and its settings
+    monkeypatch.delenv("OPENAI_API_KEY")
+    monkeypatch.delenv("LOG_LEVEL")
+    get_settings.cache_clear()
+    model_path = tmp_path / "model.json"
+    model_path.write_text(mock_llm_response_complex.model_dump_json())
+    template_path = tmp_path / "template.json"
+    doubled = json.loads(json.dumps(instance_data))
+    doubled["parameters"]["c"] = {
+        key: 2 * value for key, value in doubled["parameters"]["c"].items()
+    }
+    input_path = tmp_path / "instances.jsonl"
+    input_path.write_text(
+        "\n".join(
+            json.dumps(instance)
+            for instance in [
+                {"id": "same", **instance_data},
+                {"id": "doubled", **doubled},
+                {"id": "broken", "sets": instance_data["sets"]},
+            ]
+        )
+    )
+    output_path = tmp_path / "results.jsonl"
+
+    assert main(["freeze", str(model_path), str(template_path)]) == 0
+    assert (
+        main(
+            [
+                "solve",
+                str(template_path),
+                str(input_path),
+                str(output_path),
+                "--workers",
+                "1",
+            ]
+        )
+        == 0
+    )
+
+    results = {
+        result["id"]: result
+        for result in map(json.loads, output_path.read_text().splitlines())
+    }
+    expected = build_and_solve(mock_llm_response_complex.model_dump_json())
+    assert results["same"]["objective"] == pytest.approx(expected["objective"])
+    assert results["doubled"]["objective"] == pytest.approx(2 * expected["objective"])
+    assert results["broken"]["status"] == "input_error"
@@ -1,7 +1,11 @@
 import pytest
 import types
 
-from llm_optimizer.utils.helpers import parse_rule, ExpressionNotSafeError
+from llm_optimizer.utils.helpers import (
+    check_if_expression_is_safe,
+    parse_rule,
+    ExpressionNotSafeError,
+)
 
 
 def test_parse_rule_expression():
@@ -56,3 +60,43 @@ def test_parse_rule_unallowed_operation():
 
     with pytest.raises(ExpressionNotSafeError):
         parse_rule(expr_str, allowed_vars)
+
+
+def test_parse_rule_reuses_compiled_rule():
+    func_str = "lambda model, i: model.x[i] >= 1"
+    allowed_vars = frozenset({"model.x"})
+
+    rule = parse_rule(func_str, allowed_vars)
+    same_rule = parse_rule(func_str, allowed_vars)
+
+    assert rule["func"] is same_rule["func"]
+    assert rule["args"] == {"i"}
+    assert rule["args"] is not same_rule["args"]
+
+
+def test_parse_rule_cached_on_used_names():
+    func_str = "lambda model, i: model.x[i] >= model.d['a']"
+
+    rule = parse_rule(func_str, {"model.x", "model.d", "a", "model.y"})
+    same_rule = parse_rule(func_str, {"model.x", "model.d", "a", *range(1, 1000)})
+
+    assert rule["func"] is same_rule["func"]
+    with pytest.raises(ExpressionNotSafeError):
+        parse_rule(func_str, {"model.x", "model.d"})
+
+
+def test_parse_rule_compiled_per_allowed_vars():
+    expr_str = "x + 2"
+
+    parse_rule(expr_str, {"x"})
+
+    with pytest.raises(ExpressionNotSafeError):
+        parse_rule(expr_str, {"y"})
+
+
+def test_check_if_expression_is_safe_extra_vars():
+    allowed_vars = frozenset({"model.x"})
+
+    assert check_if_expression_is_safe("model.x[i] + 1", allowed_vars, ("i",))
+    assert not check_if_expression_is_safe("model.x[i] + 1", allowed_vars)
+    assert "i" not in allowed_vars